@@ -4,25 +4,82 @@ Intègre Fuseki et le linking dynamique.
 """
 
 import os
-import time
+import sys
 import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Dict, List, Tuple, Optional, Callable
 
 from rdflib import Graph
 
-from config import OUTPUT_DIR, CATEGORIES, FUSEKI_URL, FUSEKI_DATASET
-from wiki import WikiClient
-from rdf_generator import RDFGenerator, create_graph, extract_infobox
-from ontology import create_ontology, create_shacl_shapes
-from enrichment import enrich_all, load_metw_cards, enrich_with_metw
+from config import (
+    OUTPUT_DIR, CATEGORIES, FUSEKI_URL, FUSEKI_DATASET, FETCH_WORKERS, PARSE_WORKERS,
+    STREAM_SERIALIZE_THRESHOLD
+)
+from wiki import get_wiki_client, MAX_TITLES_PER_QUERY
+from rdf_generator import (
+    RDFGenerator, Triple, create_graph, graph_format, write_turtle, write_ntriples,
+    parse_and_generate, parse_pages
+)
+from ontology import create_ontology, create_shacl_shapes, save_turtle_cached
+from enrichment import enrich_all, load_metw_cards, enrich_with_metw, ENRICHMENT_INPUT_PREDICATES
+
+try:
+    from rdflib_hdt import HDTStore
+    HDT_AVAILABLE = True
+except ImportError:
+    HDT_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def is_fresh(candidate: str, *others: str) -> bool:
+    """candidate existe et n'est plus ancien qu'aucun des autres fichiers présents."""
+    return os.path.exists(candidate) and all(
+        not os.path.exists(other) or os.path.getmtime(candidate) >= os.path.getmtime(other)
+        for other in others)
+
+
+def load_graph_file(path: str, graph: Optional[Graph] = None) -> Tuple[Graph, str]:
+    """
+    Charge un graphe sauvegardé, en préférant pour un même nom de base: le .hdt
+    (si rdflib-hdt est installé, ex: produit par rdf2hdt), puis le .nt, s'ils
+    sont au moins aussi récents que les fichiers suivants, sinon le .ttl.
+    
+    Args:
+        path: Fichier du graphe
+        graph: Graphe à compléter. Si None, un graphe de create_graph est créé,
+               ou le store HDT est utilisé tel quel (lecture seule, sans copie)
+    
+    Returns:
+        (graphe, fichier lu)
+    """
+    base = os.path.splitext(path)[0]
+    hdt_path, nt_path, ttl_path = base + ".hdt", base + ".nt", base + ".ttl"
+    
+    if HDT_AVAILABLE and is_fresh(hdt_path, nt_path, ttl_path):
+        hdt_graph = Graph(store=HDTStore(hdt_path))
+        if graph is None:
+            return hdt_graph, hdt_path
+        graph.addN((s, p, o, graph) for s, p, o in hdt_graph)
+        return graph, hdt_path
+    
+    if graph is None:
+        graph = create_graph()
+    if is_fresh(nt_path, ttl_path):
+        graph.parse(nt_path, format=graph_format('nt'))
+        return graph, nt_path
+    if not os.path.exists(ttl_path):
+        raise FileNotFoundError(ttl_path)
+    graph.parse(ttl_path, format=graph_format('turtle'))
+    return graph, ttl_path
+
+
 class KGBuilder:
     def __init__(self, output_dir: str = None, use_fuseki: bool = True, 
-                 progress_callback: Callable = None, cancel_check: Callable = None):
+                 progress_callback: Callable = None, cancel_check: Callable = None,
+                 stream: bool = False):
         """
         Initialise le constructeur de KG.
         
@@ -32,11 +89,15 @@ class KGBuilder:
             progress_callback: Fonction appelée pour reporter la progression
                                Signature: callback(step, message, progress_percent, details)
             cancel_check: Fonction qui retourne True si le build doit être annulé
+            stream: Si True, les triplets des pages sont écrits au fil du build
+                    dans tolkien_kg.nt au lieu d'être gardés dans le graphe
+                    (pas de Turtle; seuls les types, labels, genres et races
+                    des pages restent en mémoire, pour l'enrichissement)
         """
         self.output_dir = output_dir or OUTPUT_DIR
         os.makedirs(self.output_dir, exist_ok=True)
-        self.wiki = WikiClient()
-        self.generator = RDFGenerator()
+        self.wiki = get_wiki_client()
+        self.generator = RDFGenerator(self.wiki)
         self.graph = create_graph()
         self.use_fuseki = use_fuseki
         self._fuseki_client = None
@@ -46,6 +107,20 @@ class KGBuilder:
         # Set pour tracker les pages déjà traitées (évite les doublons)
         self._processed_pages = set()
         
+        # Triplets en attente d'insertion (un seul addN par catégorie)
+        self._pending_quads = []
+        
+        # Processus de parsing, ouverts pendant build() si PARSE_WORKERS > 1
+        self._parse_pool = None
+        
+        # Mode flux: fichier N-Triples ouvert au premier build(), fermé par save()
+        self.stream = stream
+        self._stream_path = os.path.join(self.output_dir, "tolkien_kg.nt")
+        self._stream_file = None
+        # Triplets des pages lus par l'enrichissement (types, labels, genre, race),
+        # gardés en mémoire en mode flux
+        self._stream_index = create_graph()
+        
         self.stats = {
             'processed': 0,
             'success': 0,
@@ -77,22 +152,37 @@ class KGBuilder:
                 self._fuseki_client = None
         return self._fuseki_client
 
-    def process_page(self, title: str) -> Tuple[Optional[Graph], str]:
+    def _flush_pending(self):
+        """Insère en une fois les triplets accumulés dans le graphe principal."""
+        if self._pending_quads:
+            self.graph.addN(self._pending_quads)
+            self._pending_quads = []
+
+    def process_page(self, title: str) -> Tuple[Optional[List[Triple]], str]:
         try:
             wikitext = self.wiki.get_page_wikitext(title)
-            if not wikitext:
-                return None, "no_page"
-            infobox = extract_infobox(wikitext)
-            if not infobox:
-                return None, "no_infobox"
-            g = self.generator.process(title, infobox)
-            return g, "success"
         except Exception as e:
             logger.debug(f"Error for {title}: {e}")
             return None, f"error: {str(e)[:50]}"
+        return self.process_wikitext(title, wikitext)
+
+    def process_wikitext(self, title: str, wikitext: Optional[str]) -> Tuple[Optional[List[Triple]], str]:
+        """Convertit le wikitext déjà récupéré d'une page en triplets."""
+        return parse_and_generate(title, wikitext, self.generator)
+
+    def _fetch_and_parse(self, titles: List[str]) -> Dict[str, Tuple[Optional[List[Triple]], str]]:
+        """
+        Récupère un lot de pages puis le fait parser par un processus du pool.
+        Les triplets reviennent en listes de termes rdflib picklées: bien plus
+        compactes et rapides à relire qu'un texte N-Triples à reparser ici.
+        """
+        wikitexts = self.wiki.get_pages_wikitext(titles)
+        results = self._parse_pool.submit(parse_pages, [(t, wikitexts.get(t)) for t in titles]).result()
+        return dict(zip(titles, results))
 
     def process_category(self, category: str, limit: int = 100, verbose: bool = True,
-                         base_progress: float = 0, progress_range: float = 100) -> Dict[str, int]:
+                         base_progress: float = 0, progress_range: float = 100,
+                         pages: List[str] = None) -> Dict[str, int]:
         """
         Traite une catégorie.
         
@@ -102,75 +192,153 @@ class KGBuilder:
             verbose: Afficher les messages
             base_progress: Progression de base (pour le calcul du pourcentage global)
             progress_range: Plage de progression pour cette catégorie
+            pages: Titres de la catégorie déjà récupérés (sinon lus en flux depuis le wiki)
         """
         cat_stats = {'processed': 0, 'success': 0, 'skipped': 0, 'errors': 0, 'duplicates': 0}
         if verbose:
             print(f"\nCategory: {category}")
             print("-" * 50)
         
-        self._report_progress("fetch", f"Fetching pages from '{category}'...", base_progress, 
-                             {"category": category})
-        
-        # Vérifier l'annulation avant de fetch
-        self._check_cancelled()
-        
-        pages = self.wiki.get_category_members(category, limit=limit)
-        if verbose:
-            print(f"Pages found: {len(pages)}")
-        
-        for i, title in enumerate(pages, 1):
-            # Vérifier l'annulation à chaque page
-            self._check_cancelled()
-            
-            # Calculer la progression
-            page_progress = base_progress + (i / len(pages)) * progress_range if pages else base_progress
-            
-            # Vérifier si la page a déjà été traitée
-            if title in self._processed_pages:
-                cat_stats['duplicates'] += 1
-                self.stats['duplicates_skipped'] += 1
-                if verbose:
-                    print(f"  [{i}/{len(pages)}] {title[:40].ljust(40)} SKIP (duplicate)")
-                continue
-            
-            self.stats['processed'] += 1
-            cat_stats['processed'] += 1
+        if pages is None:
+            self._report_progress("fetch", f"Fetching pages from '{category}'...", base_progress, 
+                                 {"category": category})
             
-            # Reporter la progression
-            self._report_progress("process", f"Processing: {title}", page_progress,
-                                 {"page": title, "current": i, "total": len(pages), 
-                                  "category": category, "stats": self.stats.copy()})
-            
-            if verbose:
-                print(f"  [{i}/{len(pages)}] {title[:40].ljust(40)}", end=" ")
-            
-            g, status = self.process_page(title)
-            
-            if status == "success" and g:
-                triples = len(g)
-                self.stats['success'] += 1
-                self.stats['triples'] += triples
-                cat_stats['success'] += 1
-                self.graph += g
-                self._processed_pages.add(title)  # Marquer comme traité
-                if verbose:
-                    print(f"OK ({triples} triples)")
-            elif status == "no_infobox":
-                self.stats['no_infobox'] += 1
-                cat_stats['skipped'] += 1
-                self._processed_pages.add(title)  # Marquer même sans infobox
-                if verbose:
-                    print("SKIP (no infobox)")
-            else:
-                self.stats['errors'] += 1
-                cat_stats['errors'] += 1
-                if verbose:
-                    print(f"ERROR ({status})")
+            # Vérifier l'annulation avant de fetch
+            self._check_cancelled()
             
-            time.sleep(1.5 if i % 10 == 0 else 0.8)
+            # Les titres arrivent au fil de la continuation: chaque lot complet
+            # part au fetch pendant que la liste se poursuit
+            pages = self.wiki.iter_category_members(category, limit=limit)
+        
+        # Les pages sont récupérées par lots de 50 titres, les lots en parallèle (I/O).
+        # Avec un pool de processus, chaque lot y est parsé dès sa réception (CPU);
+        # sinon chaque lot est parsé d'un coup dans le thread courant (liens et
+        # images résolus par lot). La fusion reste ici.
+        parse_pool = self._parse_pool
+        fetch = self._fetch_and_parse if parse_pool else self.wiki.get_pages_wikitext
+        pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        batches = {}
+        
+        # Écarter les doublons avant toute requête: titres répétés et pages
+        # déjà traitées dans une catégorie précédente
+        found = 0
+        chunk = []
+        try:
+            for title in pages:
+                found += 1
+                if title in batches or title in self._processed_pages:
+                    continue
+                batches[title] = None
+                chunk.append(title)
+                if len(chunk) == MAX_TITLES_PER_QUERY:
+                    future = pool.submit(fetch, chunk)
+                    batches.update(dict.fromkeys(chunk, future))
+                    chunk = []
+            if chunk:
+                future = pool.submit(fetch, chunk)
+                batches.update(dict.fromkeys(chunk, future))
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        
+        pages = list(batches)
+        cat_stats['duplicates'] = found - len(pages)
+        self.stats['duplicates_skipped'] += cat_stats['duplicates']
+        if verbose:
+            print(f"Pages found: {found}")
+            if cat_stats['duplicates']:
+                print(f"Duplicates skipped: {cat_stats['duplicates']}")
+        
+        # Résolus une fois: sans callback, la boucle ne construit ni message ni copie des stats
+        callback = self.progress_callback
+        cancel_check = self.cancel_check
+        total = len(pages)
+        # Lignes par page bufferisées (une écriture tous les 50 pages); omises
+        # quand un callback reçoit déjà la progression
+        page_log = [] if verbose and not callback else None
+        parsed = {}
+        try:
+            for i, title in enumerate(pages, 1):
+                # Vérifier l'annulation à chaque page
+                if cancel_check and cancel_check():
+                    raise InterruptedError("Build cancelled by user")
+                
+                self.stats['processed'] += 1
+                cat_stats['processed'] += 1
+                
+                # Reporter la progression
+                if callback:
+                    page_progress = base_progress + (i / total) * progress_range
+                    callback("process", f"Processing: {title}", page_progress,
+                             {"page": title, "current": i, "total": total,
+                              "category": category, "stats": self.stats.copy()})
+                
+                try:
+                    result = batches[title].result()
+                except Exception as e:
+                    logger.debug(f"Error for {title}: {e}")
+                    page_triples, status = None, f"error: {str(e)[:50]}"
+                else:
+                    if parse_pool:
+                        page_triples, status = result[title]
+                    else:
+                        if title not in parsed:
+                            # Premier titre du lot (les lots sont contigus dans pages)
+                            future = batches[title]
+                            chunk = [t for t in pages[i - 1:i - 1 + MAX_TITLES_PER_QUERY]
+                                     if batches[t] is future]
+                            parsed = dict(zip(chunk, parse_pages([(t, result.get(t)) for t in chunk],
+                                                                 self.generator)))
+                        page_triples, status = parsed[title]
+                
+                if status == "success" and page_triples:
+                    triples = len(page_triples)
+                    self.stats['success'] += 1
+                    self.stats['triples'] += triples
+                    cat_stats['success'] += 1
+                    if self._stream_file is not None:
+                        write_ntriples(page_triples, self._stream_file)
+                        self._stream_index.addN((s, p, o, self._stream_index) for s, p, o in page_triples
+                                                if p in ENRICHMENT_INPUT_PREDICATES)
+                    else:
+                        self._pending_quads.extend((s, p, o, self.graph) for s, p, o in page_triples)
+                    self._processed_pages.add(title)  # Marquer comme traité
+                    outcome = f"OK ({triples} triples)"
+                elif status == "no_infobox":
+                    self.stats['no_infobox'] += 1
+                    cat_stats['skipped'] += 1
+                    self._processed_pages.add(title)  # Marquer même sans infobox
+                    outcome = "SKIP (no infobox)"
+                else:
+                    self.stats['errors'] += 1
+                    cat_stats['errors'] += 1
+                    outcome = f"ERROR ({status})"
+                
+                if page_log is not None:
+                    page_log.append(f"  [{i}/{total}] {title[:40]:<40} {outcome}\n")
+                    if len(page_log) >= 50:
+                        sys.stdout.write("".join(page_log))
+                        page_log.clear()
+        finally:
+            if page_log:
+                sys.stdout.write("".join(page_log))
+            # En cas d'annulation, ne pas attendre les requêtes restantes
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._flush_pending()
         
         return cat_stats
 
+    def _fetch_all_category_members(self, categories: List[Tuple[str, int]]) -> Dict[str, List[str]]:
+        """Liste les pages de toutes les catégories en parallèle."""
+        self._report_progress("fetch", f"Fetching pages from {len(categories)} categories...", 0,
+                             {"categories": [cat for cat, _ in categories]})
+        self._check_cancelled()
+        
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            futures = {cat: pool.submit(self.wiki.get_category_members, cat, limit=limit)
+                       for cat, limit in categories}
+            return {cat: future.result() for cat, future in futures.items()}
+
     def build(self, categories: List[Tuple[str, int]] = None, verbose: bool = True):
         if categories is None:
             categories = []
@@ -190,13 +358,29 @@ class KGBuilder:
         # Calculer la progression par catégorie (60% du total pour l'extraction)
         progress_per_cat = 60 / len(categories) if categories else 0
         
-        for idx, (cat, limit) in enumerate(categories, 1):
-            if verbose:
-                print(f"\n[{idx}/{len(categories)}] ", end="")
-            
-            base_progress = (idx - 1) * progress_per_cat
-            self.process_category(cat, limit=limit, verbose=verbose,
-                                 base_progress=base_progress, progress_range=progress_per_cat)
+        # Lister toutes les catégories avant de traiter les pages
+        members = self._fetch_all_category_members(categories)
+        
+        if self.stream and self._stream_file is None:
+            self._stream_file = open(self._stream_path, "wb", buffering=1 << 20)
+        
+        # "spawn": le build peut tourner dans un thread du serveur, où fork est risqué
+        if PARSE_WORKERS > 1:
+            self._parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS,
+                                                   mp_context=multiprocessing.get_context("spawn"))
+        try:
+            for idx, (cat, limit) in enumerate(categories, 1):
+                if verbose:
+                    print(f"\n[{idx}/{len(categories)}] ", end="")
+                
+                base_progress = (idx - 1) * progress_per_cat
+                self.process_category(cat, limit=limit, verbose=verbose,
+                                     base_progress=base_progress, progress_range=progress_per_cat,
+                                     pages=members[cat])
+        finally:
+            if self._parse_pool:
+                self._parse_pool.shutdown(wait=False, cancel_futures=True)
+                self._parse_pool = None
         
         if verbose:
             print("\n" + "-" * 60)
@@ -234,8 +418,16 @@ class KGBuilder:
             self._report_progress("multilingual", "Fetching multilingual labels...", 75,
                                  {"languages": languages})
         
+        # Mode flux: enrichissement sur l'index des pages, seuls les triplets
+        # ajoutés rejoignent le graphe en mémoire (écrit par _close_stream)
+        target = self.graph
+        if self.stream:
+            target = create_graph()
+            target += self._stream_index
+            target += self.graph
+        
         enrich_all(
-            self.graph,
+            target,
             csv_path=csv_path,
             enable_metw=enable_metw,
             enable_csv=enable_csv,
@@ -244,12 +436,28 @@ class KGBuilder:
             languages=languages,
             verbose=verbose
         )
+        
+        if target is not self.graph:
+            self.graph.addN((s, p, o, self.graph) for s, p, o in target
+                            if (s, p, o) not in self._stream_index)
 
     def save(self, filename: str = "tolkien_kg.ttl", verbose: bool = True) -> str:
-        """Sauvegarde le graphe en fichier Turtle."""
+        """
+        Sauvegarde le graphe en fichier Turtle, plus une copie N-Triples
+        (même nom, extension .nt) que load() relit bien plus vite.
+        En mode flux, complète et ferme le N-Triples écrit pendant le build.
+        """
         self._report_progress("save", "Saving graph to file...", 90)
+        if self._stream_file is not None:
+            return self._close_stream(verbose)
         path = os.path.join(self.output_dir, filename)
-        self.graph.serialize(destination=path, format='turtle')
+        if len(self.graph) > STREAM_SERIALIZE_THRESHOLD:
+            # Gros graphe: écriture en flux plutôt que le Turtle "joli" d'rdflib
+            write_turtle(self.graph, path)
+        else:
+            self.graph.serialize(destination=path, format='turtle')
+        self.graph.serialize(destination=os.path.splitext(path)[0] + ".nt", format=graph_format('nt'),
+                             encoding='utf-8')
         if verbose:
             size = os.path.getsize(path) / 1024
             print(f"\nGraph saved: {path}")
@@ -257,6 +465,37 @@ class KGBuilder:
             print(f"Total triples: {len(self.graph)}")
         return path
 
+    def _close_stream(self, verbose: bool = True) -> str:
+        """Mode flux: ajoute le graphe en mémoire (ontologie, enrichissements) au fichier et le ferme."""
+        fh, self._stream_file = self._stream_file, None
+        with fh:
+            write_ntriples(self.graph, fh)
+        if verbose:
+            size = os.path.getsize(self._stream_path) / 1024
+            print(f"\nGraph streamed: {self._stream_path}")
+            print(f"Size: {size:.1f} KB")
+            print(f"Page triples: {self.stats['triples']}, in memory: {len(self.graph)}")
+        return self._stream_path
+
+    @classmethod
+    def load(cls, path: str = None, **kwargs) -> "KGBuilder":
+        """
+        Crée un builder à partir d'un graphe déjà sauvegardé (voir load_graph_file).
+        
+        Args:
+            path: Fichier du graphe (défaut: output/tolkien_kg.ttl)
+            **kwargs: Arguments passés au constructeur
+        """
+        path = path or os.path.join(OUTPUT_DIR, "tolkien_kg.ttl")
+        kwargs.setdefault("output_dir", os.path.dirname(os.path.abspath(path)))
+        builder = cls(**kwargs)
+        
+        # Store HDT en lecture seule: copie en mémoire pour pouvoir l'enrichir
+        _, source = load_graph_file(path, builder.graph)
+        
+        logger.info(f"Loaded {len(builder.graph)} triples from {source}")
+        return builder
+
     def load_to_fuseki(self, clear_first: bool = True, verbose: bool = True) -> bool:
         """
         Charge le graphe dans Fuseki.
@@ -289,7 +528,15 @@ class KGBuilder:
         if verbose:
             print(f"\nLoading graph into Fuseki ({FUSEKI_URL}/{FUSEKI_DATASET})...")
         
-        success = fuseki.load_graph(self.graph, clear_first=clear_first)
+        if self.stream:
+            # Les pages ne sont que dans le fichier: envoyé tel quel après save()
+            if self._stream_file is not None:
+                self._close_stream(verbose=False)
+            success = fuseki.load_file(self._stream_path, format="nt", clear_first=clear_first)
+        else:
+            success = fuseki.load_graph_parallel(self.graph, clear_first=clear_first)
+        if success:
+            fuseki.materialize_link_flags()
         
         if verbose:
             if success:
@@ -303,15 +550,14 @@ class KGBuilder:
         return success
 
     def save_ontology(self, filename: str = "tolkien_ontology.ttl") -> str:
-        onto = create_ontology()
+        # Réécrit seulement si ontology.py / config.py ont changé
         path = os.path.join(self.output_dir, filename)
-        onto.serialize(destination=path, format='turtle')
+        save_turtle_cached(create_ontology, path)
         return path
 
     def save_shapes(self, filename: str = "tolkien_shapes.ttl") -> str:
-        shapes = create_shacl_shapes()
         path = os.path.join(self.output_dir, filename)
-        shapes.serialize(destination=path, format='turtle')
+        save_turtle_cached(create_shacl_shapes, path)
         return path
 
     def full_build(self, categories: List[Tuple[str, int]] = None,
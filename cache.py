@@ -0,0 +1,164 @@
+"""
+Cache clé/valeur persistant (SQLite) pour les réponses des APIs externes.
+
+Les valeurs sont stockées en JSON avec leur date d'écriture, ce qui permet
+de les faire expirer et de conserver les résultats d'un lancement à l'autre.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_TABLE_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Connexions partagées par fichier dans un processus: les caches d'un même
+# fichier écrivent dans la même transaction au lieu de se bloquer entre eux
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+class _Connection:
+    """Connexion SQLite, son verrou et le nombre d'écritures non validées."""
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.pid = os.getpid()
+        self.closed = False
+
+    def commit(self):
+        if self.pending:
+            self.conn.commit()
+            self.pending = 0
+
+
+class SQLiteCache:
+    """
+    Dictionnaire persistant {clé: valeur JSON} avec expiration.
+
+    Partageable entre threads (une connexion par fichier et par processus, protégée
+    par un verrou). path=":memory:" donne un cache non persistant avec la même interface.
+    """
+
+    def __init__(self, path: str, table: str = "cache", ttl: Optional[float] = None,
+                 commit_every: int = 1):
+        """
+        Args:
+            path: Fichier SQLite (créé si besoin) ou ":memory:"
+            table: Nom de la table (plusieurs caches peuvent partager un fichier)
+            ttl: Durée de validité des entrées en secondes (None: sans expiration)
+            commit_every: Écritures regroupées par transaction (les dernières sont
+                validées par flush() ou close())
+        """
+        if not _TABLE_RE.match(table):
+            raise ValueError(f"Invalid cache table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.commit_every = max(1, commit_every)
+        self._shared = None
+
+    def _open(self) -> _Connection:
+        # Une connexion SQLite ne doit pas traverser un fork
+        shared = self._shared
+        if shared is None or shared.pid != os.getpid() or shared.closed:
+            if self.path == ":memory:":
+                shared = _Connection(self.path)
+            else:
+                key = (os.path.abspath(self.path), os.getpid())
+                with _shared_lock:
+                    shared = _shared.get(key)
+                    if shared is None:
+                        shared = _shared[key] = _Connection(self.path)
+            with shared.lock:
+                shared.conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, ts REAL NOT NULL)"
+                )
+                shared.conn.commit()
+                shared.pending = 0
+            self._shared = shared
+        return shared
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Valeur associée à la clé, ou default si absente ou expirée."""
+        try:
+            shared = self._open()
+            with shared.lock:
+                row = shared.conn.execute(
+                    f"SELECT value, ts FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Cache read error ({self.table}): {e}")
+            return default
+        if row is None or (self.ttl is not None and time.time() - row[1] > self.ttl):
+            return default
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        """Enregistre une valeur (sérialisable en JSON)."""
+        try:
+            shared = self._open()
+            with shared.lock:
+                shared.conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, ts) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), time.time())
+                )
+                shared.pending += 1
+                if shared.pending >= self.commit_every:
+                    shared.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"Cache write error ({self.table}): {e}")
+
+    def flush(self):
+        """Valide les écritures en attente (de tous les caches du même fichier)."""
+        shared = self._shared
+        if shared is None or shared.pid != os.getpid() or shared.closed:
+            return
+        try:
+            with shared.lock:
+                shared.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"Cache flush error ({self.table}): {e}")
+
+    def __contains__(self, key: str) -> bool:
+        missing = object()
+        return self.get(key, missing) is not missing
+
+    def clear(self):
+        """Supprime toutes les entrées."""
+        try:
+            shared = self._open()
+            with shared.lock:
+                shared.conn.execute(f"DELETE FROM {self.table}")
+                shared.pending += 1
+                shared.commit()
+        except sqlite3.Error as e:
+            logger.debug(f"Cache clear error ({self.table}): {e}")
+
+    def close(self):
+        """Valide les écritures en attente et ferme la connexion (partagée) du fichier."""
+        self.flush()
+        shared, self._shared = self._shared, None
+        if shared is None or shared.pid != os.getpid() or shared.closed:
+            return
+        key = (os.path.abspath(self.path), shared.pid)
+        with _shared_lock:
+            if _shared.get(key) is shared:
+                del _shared[key]
+        with shared.lock:
+            shared.conn.close()
+            shared.closed = True
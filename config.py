@@ -3,6 +3,7 @@ Configuration et namespaces pour le Knowledge Graph Tolkien.
 """
 
 import os
+from importlib.util import find_spec
 from rdflib import Namespace
 
 # Repertoire de travail (utilise le dossier courant)
@@ -12,6 +13,12 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "output")
 # API
 TOLKIEN_GATEWAY_API = "https://tolkiengateway.net/w/api.php"
 
+# Store rdflib du graphe principal: 'auto' choisit Oxigraph (paquet oxrdflib,
+# store en Rust) s'il est installe, sinon le store memoire par defaut d'rdflib
+RDF_STORE = os.environ.get("RDF_STORE", "auto")
+if RDF_STORE == "auto":
+    RDF_STORE = "Oxigraph" if find_spec("oxrdflib") else "default"
+
 # ============================================================================
 # FUSEKI TRIPLESTORE CONFIGURATION
 # ============================================================================
@@ -23,6 +30,14 @@ FUSEKI_SPARQL_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/sparql"
 FUSEKI_UPDATE_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/update"
 FUSEKI_DATA_ENDPOINT = f"{FUSEKI_URL}/{FUSEKI_DATASET}/data"
 
+# Index texte Jena (text:TextIndexLucene sur rdfs:label) configuré sur le dataset
+FUSEKI_TEXT_INDEX = os.environ.get("FUSEKI_TEXT_INDEX", "0") == "1"
+
+# Cache des résultats SELECT/ASK (par texte de requête), vidé à chaque écriture
+FUSEKI_QUERY_CACHE_SIZE = 512
+FUSEKI_QUERY_CACHE_TTL = 60  # secondes (0: cache désactivé)
+FUSEKI_QUERY_CACHE_MAX_ROWS = 2000  # Résultats plus gros jamais mis en cache
+
 # Mode de stockage: 'fuseki' ou 'file'
 # Si Fuseki n'est pas disponible, le système bascule automatiquement sur fichier
 STORAGE_MODE = os.environ.get("STORAGE_MODE", "fuseki")
@@ -68,6 +83,25 @@ PREFIXES = {
 HTTP_HEADERS = {"User-Agent": "TolkienKGBot/1.0 (Semantic Web Project)"}
 REQUEST_DELAY = 0.5  # Delai entre requetes en secondes
 REQUEST_TIMEOUT = 30
+FETCH_WORKERS = 8  # Requetes wiki simultanees pendant le build
+# Processus de parsing (1: aucun). Chacun a ses propres limites de debit vers
+# Wikipedia, Wikidata et Tolkien Gateway: N processus font N fois plus de requetes
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", 1))
+STREAM_SERIALIZE_THRESHOLD = 50_000  # Au-dela, le Turtle est ecrit en flux
+
+# Cache HTTP des reponses wiki (actif si requests-cache est installe)
+WIKI_CACHE_ENABLED = os.environ.get("WIKI_CACHE", "1") != "0"
+WIKI_CACHE_FILE = os.path.join(OUTPUT_DIR, "wiki_cache")
+WIKI_CACHE_EXPIRE = 86400  # 24h
+
+# Cache disque des URLs directes des images (desactive avec WIKI_CACHE=0)
+IMAGE_CACHE_FILE = os.path.join(OUTPUT_DIR, "image_urls_cache.sqlite")
+IMAGE_CACHE_EXPIRE = 30 * 86400  # 30 jours
+
+# Cache disque des recherches Fandom (enrichissement multilingue)
+FANDOM_CACHE_ENABLED = os.environ.get("FANDOM_CACHE", "1") != "0"
+FANDOM_CACHE_FILE = os.path.join(OUTPUT_DIR, "fandom_cache.json")
+FANDOM_CACHE_EXPIRE = 7 * 86400  # 7 jours
 
 # ============================================================================
 # CATEGORIES DISPONIBLES
@@ -108,7 +142,14 @@ CATEGORIES = {
 
 # Configuration du linking dynamique
 ENABLE_DYNAMIC_LINKING = True
-LINKING_CACHE_FILE = os.path.join(OUTPUT_DIR, "external_links_cache.json")
+# Cache SQLite des liens decouverts (conserve entre deux builds)
+LINKING_CACHE_ENABLED = os.environ.get("LINKING_CACHE", "1") != "0"
+LINKING_CACHE_FILE = os.path.join(OUTPUT_DIR, "external_links_cache.sqlite")
+LINKING_CACHE_EXPIRE = 30 * 86400  # 30 jours
+LINKING_CACHE_COMMIT_EVERY = 100  # Ecritures du cache regroupees par transaction
+LINKING_WORKERS = 8  # Entites liees simultanement par discover_links_batch
+# Index LMDB hors ligne du dump Wikidata (linking_offline.py), consulte avant les APIs
+WIKIDATA_LITE_PATH = os.environ.get("WIKIDATA_LITE_PATH", "")
 
 # Seuil de similarité pour le matching de noms
 LINKING_SIMILARITY_THRESHOLD = 0.9
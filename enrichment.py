@@ -6,22 +6,37 @@ Enrichissement avec donnees externes:
 """
 
 import os
+import re
 import csv
 import json
+import pickle
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional, List, Dict, Tuple
 from difflib import SequenceMatcher
 from io import StringIO
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 from rdflib import Graph, URIRef, Literal, RDF, RDFS, XSD
 
+from ratelimit import TokenBucket
 from config import (
     TOLKIEN_RESOURCE, TOLKIEN_ONTOLOGY, TOLKIEN_PROPERTY,
-    SCHEMA, OUTPUT_DIR, HTTP_HEADERS, REQUEST_TIMEOUT
+    SCHEMA, OUTPUT_DIR, HTTP_HEADERS, REQUEST_TIMEOUT,
+    FANDOM_CACHE_ENABLED, FANDOM_CACHE_FILE, FANDOM_CACHE_EXPIRE
 )
 
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # URLs des sources externes
@@ -44,30 +59,161 @@ LOTR_FANDOM_API = {
 METW = "http://tolkien-kg.org/metw/"
 
 
+# Apostrophes supprimées et tirets remplacés par un espace, en une passe
+_NORM_TABLE = str.maketrans({"'": None, "\u2019": None, "-": " "})
+
+
+@lru_cache(maxsize=1 << 16)
 def normalize_name(name: str) -> str:
-    """Normalise un nom pour la comparaison."""
+    """Normalise un nom pour la comparaison (mis en cache: les mêmes noms reviennent souvent)."""
     if not name:
         return ""
-    name = name.lower().strip()
-    name = name.replace("'", "").replace("'", "").replace("-", " ")
-    return " ".join(name.split())
+    return " ".join(name.lower().translate(_NORM_TABLE).split())
 
 
 def similarity(a: str, b: str) -> float:
     """Calcule la similarite entre deux chaines."""
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(normalize_name(a), normalize_name(b)) / 100
     return SequenceMatcher(None, normalize_name(a), normalize_name(b)).ratio()
 
 
+# Seuls prédicats lus par les enrichissements (index du build en mode flux)
+ENRICHMENT_INPUT_PREDICATES = frozenset((RDF.type, RDFS.label, SCHEMA.gender, TOLKIEN_PROPERTY.raceLabel))
+
+
+def _labelled_subjects(graph: Graph, rdf_type: URIRef) -> List[Tuple[URIRef, Optional[str]]]:
+    """
+    Entités d'un type avec leur rdfs:label (None si absent), de préférence
+    anglais ou sans langue quand l'entité a déjà des labels traduits.
+    Les labels sont lus en une seule passe plutôt qu'un graph.objects() par entité.
+    """
+    labels, english = {}, set()
+    for entity_uri, label in graph.subject_objects(RDFS.label):
+        if entity_uri in english:
+            continue
+        if getattr(label, 'language', None) in ('en', None, ''):
+            english.add(entity_uri)
+            labels[entity_uri] = str(label)
+        else:
+            labels.setdefault(entity_uri, str(label))
+    return [(entity_uri, labels.get(entity_uri)) for entity_uri in graph.subjects(RDF.type, rdf_type)]
+
+
 # =============================================================================
 # METW CARDS
 # =============================================================================
 
-def load_metw_cards(source: str = None) -> List[Dict]:
+# Cache disque de la forme déjà aplatie/indexée des cartes
+METW_CARDS_PICKLE = os.path.join(OUTPUT_DIR, "metw_cards.pickle")
+_CARDS_PICKLE_VERSION = 4
+
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+# Index {nom normalisé: carte} de la dernière liste de cartes vue
+_cards_index_cache: Dict[str, object] = {'cards': None, 'index': {}, 'choices': []}
+
+
+def _english(value) -> str:
+    if isinstance(value, dict):
+        return value.get('en', '')
+    return str(value) if value else ''
+
+
+def _normalize_card(card: Dict):
+    """
+    Résout une fois les champs lus par l'enrichissement (nom et texte anglais
+    sans HTML, type, prowess, body, set), quelle que soit la casse des clés source.
+    """
+    card['_name_en'] = _english(card.get('_name_en') or card.get('name') or card.get('Name'))
+    card_text = _english(card.get('_text_en') or card.get('text') or card.get('Text'))
+    card['_text_en'] = _HTML_TAG_RE.sub('', card_text)
+    card['_type'] = card.get('type') or card.get('Type') or card.get('Primary')
+    card['_prowess'] = card.get('_prowess') or card.get('prowess') or card.get('Prowess')
+    card['_body'] = card.get('_body') or card.get('body') or card.get('Body')
+    card['_set'] = card.get('set') or card.get('Set')
+
+
+def _build_cards_index(cards: List[Dict]) -> Dict[str, Dict]:
+    cards_index = {}
+    for card in cards:
+        _normalize_card(card)
+        if card['_name_en']:
+            cards_index[normalize_name(card['_name_en'])] = card
+    return cards_index
+
+
+def _set_cards_index(cards: List[Dict], cards_index: Dict[str, Dict]):
+    _cards_index_cache['cards'] = cards
+    _cards_index_cache['index'] = cards_index
+    _cards_index_cache['choices'] = list(cards_index)
+
+
+def _get_cards_index(cards: List[Dict]) -> Dict[str, Dict]:
+    """Index des cartes par nom normalisé, calculé une seule fois par liste."""
+    if _cards_index_cache['cards'] is not cards:
+        _set_cards_index(cards, _build_cards_index(cards))
+    return _cards_index_cache['index']
+
+
+def _flatten_cards(raw_data: Dict) -> List[Dict]:
     """
-    Charge les cartes METW depuis l'URL ou un fichier local.
     Le format JSON est imbriqué: {set_id: {cards: {card_id: card_data}}}
     On extrait toutes les cartes dans une liste plate.
     """
+    cards = []
+    for set_id, set_data in raw_data.items():
+        if isinstance(set_data, dict) and 'cards' in set_data:
+            # format: {set_id: {cards: {card_id: card_data}}}
+            for card_id, card_data in set_data.get('cards', {}).items():
+                if isinstance(card_data, dict):
+                    # Le nom et le texte anglais sont résolus par _normalize_card
+                    # Extraire les attributs
+                    attrs = card_data.get('attributes', {})
+                    if isinstance(attrs, dict):
+                        card_data['_prowess'] = attrs.get('prowess')
+                        card_data['_body'] = attrs.get('body')
+                        card_data['_race'] = attrs.get('race')
+                    
+                    cards.append(card_data)
+        elif isinstance(set_data, dict):
+            # liste directe de cartes
+            cards.append(set_data)
+    return cards
+
+
+def _read_cards_pickle(source: str) -> Optional[List[Dict]]:
+    """Relit le cache pickle s'il correspond au fichier JSON source."""
+    try:
+        with open(METW_CARDS_PICKLE, 'rb') as f:
+            data = pickle.load(f)
+        if (data.get('version') != _CARDS_PICKLE_VERSION
+                or data.get('source') != os.path.abspath(source)
+                or data.get('mtime') != os.path.getmtime(source)):
+            return None
+    except Exception:
+        return None
+    _set_cards_index(data['cards'], data['index'])
+    return data['cards']
+
+
+def _write_cards_pickle(source: str, cards: List[Dict]):
+    try:
+        data = {
+            'version': _CARDS_PICKLE_VERSION,
+            'source': os.path.abspath(source),
+            'mtime': os.path.getmtime(source),
+            'cards': cards,
+            'index': _get_cards_index(cards),
+        }
+        with open(METW_CARDS_PICKLE, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        logger.debug(f"Could not write METW cards cache: {e}")
+
+
+@lru_cache(maxsize=2)
+def _load_metw_cards(source: str = None) -> List[Dict]:
     local_file = os.path.join(OUTPUT_DIR, "metw_cards.json")
     
     if source is None:
@@ -76,57 +222,40 @@ def load_metw_cards(source: str = None) -> List[Dict]:
         else:
             source = METW_CARDS_URL
     
+    if source.startswith('http'):
+        logger.info(f"Downloading METW cards from {source}")
+        response = requests.get(source, headers=HTTP_HEADERS, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        raw_data = response.json()
+        # Sauvegarder localement
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        with open(local_file, 'w', encoding='utf-8') as f:
+            json.dump(raw_data, f, indent=2, ensure_ascii=False)
+        logger.info(f"Saved raw data to {local_file}")
+        source = local_file
+    else:
+        cards = _read_cards_pickle(source)
+        if cards is not None:
+            logger.info(f"Loaded {len(cards)} METW cards from cache")
+            return cards
+        logger.info(f"Loading METW cards from {source}")
+        with open(source, 'r', encoding='utf-8') as f:
+            raw_data = json.load(f)
+    
+    cards = _flatten_cards(raw_data)
+    _write_cards_pickle(source, cards)
+    logger.info(f"Loaded {len(cards)} METW cards")
+    return cards
+
+
+def load_metw_cards(source: str = None) -> List[Dict]:
+    """
+    Charge les cartes METW depuis l'URL ou un fichier local.
+    Le résultat est gardé en mémoire pour le processus, et sa forme aplatie
+    est mise en cache dans output/metw_cards.pickle entre deux lancements.
+    """
     try:
-        if source.startswith('http'):
-            logger.info(f"Downloading METW cards from {source}")
-            response = requests.get(source, headers=HTTP_HEADERS, timeout=REQUEST_TIMEOUT)
-            response.raise_for_status()
-            raw_data = response.json()
-            # Sauvegarder localement
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            with open(local_file, 'w', encoding='utf-8') as f:
-                json.dump(raw_data, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved raw data to {local_file}")
-        else:
-            logger.info(f"Loading METW cards from {source}")
-            with open(source, 'r', encoding='utf-8') as f:
-                raw_data = json.load(f)
-        
-        # Extraire toutes les cartes du format imbriqué
-        cards = []
-        for set_id, set_data in raw_data.items():
-            if isinstance(set_data, dict) and 'cards' in set_data:
-                # format: {set_id: {cards: {card_id: card_data}}}
-                for card_id, card_data in set_data.get('cards', {}).items():
-                    if isinstance(card_data, dict):
-                        # Extraire le nom en anglais
-                        name_data = card_data.get('name', {})
-                        if isinstance(name_data, dict):
-                            card_data['_name_en'] = name_data.get('en', '')
-                        else:
-                            card_data['_name_en'] = str(name_data) if name_data else ''
-                        
-                        # Extraire le texte en anglais
-                        text_data = card_data.get('text', {})
-                        if isinstance(text_data, dict):
-                            card_data['_text_en'] = text_data.get('en', '')
-                        else:
-                            card_data['_text_en'] = str(text_data) if text_data else ''
-                        
-                        # Extraire les attributs
-                        attrs = card_data.get('attributes', {})
-                        if isinstance(attrs, dict):
-                            card_data['_prowess'] = attrs.get('prowess')
-                            card_data['_body'] = attrs.get('body')
-                            card_data['_race'] = attrs.get('race')
-                        
-                        cards.append(card_data)
-            elif isinstance(set_data, dict):
-                # liste directe de cartes
-                cards.append(set_data)
-        
-        logger.info(f"Loaded {len(cards)} METW cards")
-        return cards
+        return _load_metw_cards(source)
     except Exception as e:
         logger.error(f"Failed to load METW cards: {e}")
         return []
@@ -134,20 +263,30 @@ def load_metw_cards(source: str = None) -> List[Dict]:
 
 def find_matching_card(name: str, cards: List[Dict], threshold: float = 0.85) -> Optional[Dict]:
     """Trouve la carte correspondant le mieux a un nom."""
+    cards_index = _get_cards_index(cards)
+    norm_name = normalize_name(name)
+    if norm_name in cards_index:
+        return cards_index[norm_name]
+    
+    choices = _cards_index_cache['choices']
+    if RAPIDFUZZ_AVAILABLE:
+        # Un seul appel C sur tous les noms de l'index
+        match = fuzz_process.extractOne(norm_name, choices, scorer=fuzz.ratio,
+                                        score_cutoff=threshold * 100)
+        return cards_index[match[0]] if match else None
+    
     best_match = None
     best_score = 0
-    
-    for card in cards:
-        card_name = card.get('_name_en') or card.get('name') or card.get('Name') or ''
-        if isinstance(card_name, dict):
-            card_name = card_name.get('en', '')
-        if not card_name:
+    matcher = SequenceMatcher(None, norm_name)
+    for card_name in choices:
+        matcher.set_seq2(card_name)
+        # Bornes supérieures peu coûteuses avant le calcul complet
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
             continue
-        
-        score = similarity(name, card_name)
+        score = matcher.ratio()
         if score > best_score and score >= threshold:
             best_score = score
-            best_match = card
+            best_match = cards_index[card_name]
     
     return best_match
 
@@ -163,23 +302,15 @@ def enrich_with_metw(graph: Graph, cards: List[Dict], verbose: bool = True) -> D
         print("\nEnriching with METW cards...")
     
     # Index des cartes par nom normalise
-    cards_index = {}
-    for card in cards:
-        card_name = card.get('_name_en') or card.get('name') or card.get('Name') or ''
-        if isinstance(card_name, dict):
-            card_name = card_name.get('en', '')
-        if card_name:
-            cards_index[normalize_name(card_name)] = card
+    cards_index = _get_cards_index(cards)
+    
+    # Triplets accumulés puis ajoutés en un seul addN
+    quads = []
     
     # Parcourir les entites
-    for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character):
+    for entity_uri, name in _labelled_subjects(graph, TOLKIEN_ONTOLOGY.Character):
         stats['checked'] += 1
         
-        name = None
-        for label in graph.objects(entity_uri, RDFS.label):
-            name = str(label)
-            break
-        
         if not name:
             continue
         
@@ -197,59 +328,53 @@ def enrich_with_metw(graph: Graph, cards: List[Dict], verbose: bool = True) -> D
             card_uri = URIRef(f"{METW}card/{card_id}")
             
             # Lien entite -> carte
-            graph.add((entity_uri, TOLKIEN_PROPERTY.metwCard, card_uri))
+            quads.append((entity_uri, TOLKIEN_PROPERTY.metwCard, card_uri, graph))
+            quads.append((entity_uri, TOLKIEN_PROPERTY.hasMetwCard, Literal(True), graph))
             
             # Infos de la carte
-            graph.add((card_uri, RDF.type, TOLKIEN_ONTOLOGY.METWCard))
+            quads.append((card_uri, RDF.type, TOLKIEN_ONTOLOGY.METWCard, graph))
             
             # Nom de la carte
-            card_name = card.get('_name_en') or card.get('name') or card.get('Name')
-            if isinstance(card_name, dict):
-                card_name = card_name.get('en', '')
+            card_name = card['_name_en']
             if card_name:
-                graph.add((card_uri, RDFS.label, Literal(card_name, lang="en")))
+                quads.append((card_uri, RDFS.label, Literal(card_name, lang="en"), graph))
             
             # Type de carte
-            card_type = card.get('type') or card.get('Type') or card.get('Primary')
+            card_type = card['_type']
             if card_type:
-                graph.add((card_uri, TOLKIEN_PROPERTY.cardType, Literal(card_type)))
+                quads.append((card_uri, TOLKIEN_PROPERTY.cardType, Literal(card_type), graph))
             
-            # Texte de la carte
-            card_text = card.get('_text_en') or card.get('text') or card.get('Text')
-            if isinstance(card_text, dict):
-                card_text = card_text.get('en', '')
+            # Texte de la carte (HTML déjà retiré au chargement)
+            card_text = card['_text_en']
             if card_text:
-                # Nettoyer le HTML
-                import re
-                card_text = re.sub(r'<[^>]+>', '', card_text)
-                graph.add((card_uri, SCHEMA.description, Literal(card_text, lang="en")))
+                quads.append((card_uri, SCHEMA.description, Literal(card_text, lang="en"), graph))
             
             # Prowess
-            prowess = card.get('_prowess') or card.get('prowess') or card.get('Prowess')
+            prowess = card['_prowess']
             if prowess:
                 try:
-                    graph.add((card_uri, TOLKIEN_PROPERTY.prowess, 
-                               Literal(int(prowess), datatype=XSD.integer)))
+                    quads.append((card_uri, TOLKIEN_PROPERTY.prowess,
+                                  Literal(int(prowess), datatype=XSD.integer), graph))
                 except (ValueError, TypeError):
                     pass
             
             # Body
-            body = card.get('_body') or card.get('body') or card.get('Body')
+            body = card['_body']
             if body:
                 try:
-                    graph.add((card_uri, TOLKIEN_PROPERTY.body, 
-                               Literal(int(body), datatype=XSD.integer)))
+                    quads.append((card_uri, TOLKIEN_PROPERTY.body,
+                                  Literal(int(body), datatype=XSD.integer), graph))
                 except (ValueError, TypeError):
                     pass
             
-            card_set = card.get('set') or card.get('Set')
+            card_set = card['_set']
             if card_set:
-                graph.add((card_uri, TOLKIEN_PROPERTY.cardSet, Literal(card_set)))
+                quads.append((card_uri, TOLKIEN_PROPERTY.cardSet, Literal(card_set), graph))
             
             if verbose and stats['linked'] <= 20:
-                display_name = card_name if isinstance(card_name, str) else str(card_name)
-                print(f"  {name} -> {display_name}")
+                print(f"  {name} -> {card_name}")
     
+    graph.addN(quads)
     stats['triples'] = stats['linked'] * 5  
     
     if verbose:
@@ -262,15 +387,28 @@ def enrich_with_metw(graph: Graph, cards: List[Dict], verbose: bool = True) -> D
 # CSV DATA
 # =============================================================================
 
-def load_csv_characters(filepath: str) -> List[Dict]:
-    """Charge les personnages depuis le fichier CSV."""
+# Colonnes du CSV utilisées pour l'enrichissement (ordre des tuples retournés)
+CSV_FIELDS = ('name', 'gender', 'race', 'hair', 'height', 'realm')
+
+
+def load_csv_characters(filepath: str) -> List[Tuple[str, ...]]:
+    """
+    Charge les personnages depuis le fichier CSV.
+    Chaque personnage est un tuple de valeurs dans l'ordre de CSV_FIELDS
+    ('' pour une colonne absente); les lignes sans nom sont ignorées.
+    """
     characters = []
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            columns = [header.index(field) if field in header else None for field in CSV_FIELDS]
+            if columns[0] is None:
+                raise ValueError("missing 'name' column")
             for row in reader:
-                if row.get('name'):
-                    characters.append(row)
+                values = tuple(row[i] if i is not None and i < len(row) else '' for i in columns)
+                if values[0]:
+                    characters.append(values)
         logger.info(f"Loaded {len(characters)} characters from CSV")
     except Exception as e:
         logger.error(f"Failed to load CSV: {e}")
@@ -289,58 +427,63 @@ def enrich_with_csv(graph: Graph, csv_path: str, verbose: bool = True) -> Dict[s
         print("\nEnriching with CSV data...")
     
     # Index par nom normalise
-    csv_index = {}
-    for char in characters:
-        name = char.get('name', '')
-        if name:
-            csv_index[normalize_name(name)] = char
+    csv_index = {normalize_name(char[0]): char for char in characters}
     
-    # Parcourir les entites
-    for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character):
+    # Entites ayant deja un genre / une race: une passe par predicat
+    # au lieu d'un graph.objects() par entite
+    has_gender = set(graph.subjects(SCHEMA.gender))
+    has_race = set(graph.subjects(TOLKIEN_PROPERTY.raceLabel))
+    
+    # Triplets accumulés puis ajoutés en un seul addN
+    quads = []
+    
+    # Entites regroupees par nom normalise: seuls les noms presents a la fois
+    # dans le graphe et dans le CSV sont parcourus
+    entities_by_name = {}
+    for entity_uri, name in _labelled_subjects(graph, TOLKIEN_ONTOLOGY.Character):
         stats['checked'] += 1
-        
-        name = None
-        for label in graph.objects(entity_uri, RDFS.label):
-            name = str(label)
-            break
-        
-        if not name:
-            continue
-        
-        csv_data = csv_index.get(normalize_name(name))
-        if not csv_data:
-            continue
-        
+        if name:
+            entities_by_name.setdefault(normalize_name(name), []).append(entity_uri)
+    
+    matches = [(entity_uri, csv_index[key])
+               for key in entities_by_name.keys() & csv_index.keys()
+               for entity_uri in entities_by_name[key]]
+    
+    for entity_uri, csv_data in matches:
         stats['enriched'] += 1
         added = 0
+        _, gender, race, hair, height, realm = csv_data
         
         # Ajouter les donnees manquantes
-        if csv_data.get('gender'):
-            existing = list(graph.objects(entity_uri, SCHEMA.gender))
-            if not existing:
-                graph.add((entity_uri, SCHEMA.gender, Literal(csv_data['gender'].lower())))
+        if gender:
+            if entity_uri not in has_gender:
+                quads.append((entity_uri, SCHEMA.gender, Literal(gender.lower()), graph))
                 added += 1
         
-        if csv_data.get('race'):
-            existing = list(graph.objects(entity_uri, TOLKIEN_PROPERTY.raceLabel))
-            if not existing:
-                graph.add((entity_uri, TOLKIEN_PROPERTY.raceLabel, Literal(csv_data['race'])))
+        if race:
+            if entity_uri not in has_race:
+                quads.append((entity_uri, TOLKIEN_PROPERTY.raceLabel, Literal(race), graph))
                 added += 1
         
-        if csv_data.get('hair'):
-            graph.add((entity_uri, TOLKIEN_PROPERTY.hairColor, Literal(csv_data['hair'])))
+        if hair:
+            quads.append((entity_uri, TOLKIEN_PROPERTY.hairColor, Literal(hair), graph))
             added += 1
         
-        if csv_data.get('height'):
-            graph.add((entity_uri, TOLKIEN_PROPERTY.height, Literal(csv_data['height'])))
+        if height:
+            quads.append((entity_uri, TOLKIEN_PROPERTY.height, Literal(height), graph))
             added += 1
         
-        if csv_data.get('realm'):
-            graph.add((entity_uri, TOLKIEN_PROPERTY.realm, Literal(csv_data['realm'])))
+        if hair or height:
+            quads.append((entity_uri, TOLKIEN_PROPERTY.hasCsvData, Literal(True), graph))
+        
+        if realm:
+            quads.append((entity_uri, TOLKIEN_PROPERTY.realm, Literal(realm), graph))
             added += 1
         
         stats['triples'] += added
     
+    graph.addN(quads)
+    
     if verbose:
         print(f"  Checked: {stats['checked']}, Enriched: {stats['enriched']}, Triples: {stats['triples']}")
     
@@ -369,13 +512,79 @@ LANGUAGE_NAMES = {
 # Import du namespace SKOS pour les labels alternatifs
 from rdflib.namespace import SKOS
 
+# Débit par hôte (requêtes/s), à la place de l'ancien sleep(0.5) global: les
+# wikis de langue partagent lotr.fandom.com, donc un seul budget
+FANDOM_HOST_RATE = 2.0
+_fandom_buckets = {host: TokenBucket(rate=FANDOM_HOST_RATE, capacity=FANDOM_HOST_RATE)
+                   for host in {urlparse(url).netloc for url in LOTR_FANDOM_API.values()}}
+# Recherches Fandom simultanées: de quoi tenir le débit avec des réponses
+# d'environ une seconde, au-delà les threads ne font qu'attendre le bucket
+FANDOM_WORKERS = max(1, int(FANDOM_HOST_RATE)) * len(_fandom_buckets)
+
+
+# Session partagée: les connexions TLS keep-alive vers Fandom sont réutilisées
+# par toutes les recherches (un pool de connexions assez grand pour les threads)
+_fandom_session = requests.Session()
+_fandom_session.headers.update(HTTP_HEADERS)
+_fandom_session.mount("https://", HTTPAdapter(pool_connections=len(_fandom_buckets),
+                                              pool_maxsize=FANDOM_WORKERS))
+
+
+# Résultats des recherches Fandom: "lang:nom normalisé" -> [titre ou None, horodatage].
+# Les absences (None) sont aussi gardées pour ne pas redemander les pages inexistantes.
+_fandom_cache: Optional[Dict[str, list]] = None
+_fandom_cache_dirty = False
+_fandom_cache_lock = threading.Lock()
+
+
+def _get_fandom_cache() -> Dict[str, list]:
+    global _fandom_cache
+    with _fandom_cache_lock:
+        if _fandom_cache is None:
+            _fandom_cache = {}
+            if FANDOM_CACHE_ENABLED and os.path.exists(FANDOM_CACHE_FILE):
+                try:
+                    with open(FANDOM_CACHE_FILE, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    now = time.time()
+                    _fandom_cache = {k: v for k, v in data.items()
+                                     if now - v[1] < FANDOM_CACHE_EXPIRE}
+                except (OSError, ValueError, TypeError, IndexError) as e:
+                    logger.debug(f"Fandom cache ignored: {e}")
+        return _fandom_cache
+
+
+def save_fandom_cache():
+    """Écrit le cache des recherches Fandom sur disque s'il a changé."""
+    global _fandom_cache_dirty
+    if not FANDOM_CACHE_ENABLED or not _fandom_cache_dirty:
+        return
+    with _fandom_cache_lock:
+        data = dict(_fandom_cache)
+        _fandom_cache_dirty = False
+    try:
+        os.makedirs(os.path.dirname(FANDOM_CACHE_FILE), exist_ok=True)
+        tmp_path = FANDOM_CACHE_FILE + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, FANDOM_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"Could not write Fandom cache: {e}")
+
 
 def search_fandom_wiki(query: str, lang: str = 'fr') -> Optional[str]:
-    """Recherche une page sur le wiki Fandom."""
+    """Recherche une page sur le wiki Fandom (résultat mis en cache par langue et nom)."""
+    global _fandom_cache_dirty
     api_url = LOTR_FANDOM_API.get(lang)
     if not api_url:
         return None
     
+    cache = _get_fandom_cache()
+    key = f"{lang}:{normalize_name(query)}"
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0]
+    
     try:
         params = {
             'action': 'query',
@@ -384,14 +593,19 @@ def search_fandom_wiki(query: str, lang: str = 'fr') -> Optional[str]:
             'srlimit': 1,
             'format': 'json'
         }
-        response = requests.get(api_url, params=params, headers=HTTP_HEADERS, timeout=10)
+        _fandom_buckets[urlparse(api_url).netloc].acquire()
+        response = _fandom_session.get(api_url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
         results = data.get('query', {}).get('search', [])
-        if results:
-            return results[0].get('title')
+        title = results[0].get('title') if results else None
+        with _fandom_cache_lock:
+            cache[key] = [title, time.time()]
+            _fandom_cache_dirty = True
+        return title
     except Exception as e:
+        # Erreur réseau: pas d'entrée en cache, la recherche sera retentée
         logger.debug(f"Fandom search error: {e}")
     
     return None
@@ -424,60 +638,59 @@ def enrich_multilingual(graph: Graph, languages: List[str] = None,
         print(f"\nAdding multilingual labels ({', '.join(languages)})...")
         print(f"  Source: LOTR Fandom Wiki (lotr.fandom.com)")
     
+    # Labels lus en une passe: premier label anglais (ou sans langue) et
+    # langues déjà présentes, par entité
+    english_labels, known_langs = {}, {}
+    for entity_uri, label in graph.subject_objects(RDFS.label):
+        lang = getattr(label, 'language', None)
+        if lang in ('en', None, ''):
+            english_labels.setdefault(entity_uri, str(label))
+        if lang:
+            known_langs.setdefault(entity_uri, set()).add(lang)
+    
     # Collecter toutes les entités (Characters, Locations, Artifacts)
     entities = []
-    
-    # Characters
-    for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character):
-        for label in graph.objects(entity_uri, RDFS.label):
-            if not hasattr(label, 'language') or label.language in ['en', None, '']:
-                entities.append((entity_uri, str(label), 'Character'))
-                break
-    
-    # Locations
-    for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Location):
-        for label in graph.objects(entity_uri, RDFS.label):
-            if not hasattr(label, 'language') or label.language in ['en', None, '']:
-                entities.append((entity_uri, str(label), 'Location'))
-                break
-    
-    # Artifacts
-    for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Artifact):
-        for label in graph.objects(entity_uri, RDFS.label):
-            if not hasattr(label, 'language') or label.language in ['en', None, '']:
-                entities.append((entity_uri, str(label), 'Artifact'))
-                break
+    for entity_type in ('Character', 'Location', 'Artifact'):
+        for entity_uri in graph.subjects(RDF.type, TOLKIEN_ONTOLOGY[entity_type]):
+            name = english_labels.get(entity_uri)
+            if name is not None:
+                entities.append((entity_uri, name, entity_type))
     
     entities = entities[:max_entities]
     
     if verbose:
         print(f"  Processing {len(entities)} entities...")
     
-    for i, (entity_uri, name, entity_type) in enumerate(entities):
-        stats['checked'] += 1
-        entity_had_new_labels = False
+    # Toutes les recherches (entité, langue) partent en parallèle; les résultats
+    # sont ensuite appliqués dans l'ordre des entités
+    pool = ThreadPoolExecutor(max_workers=FANDOM_WORKERS)
+    quads = []
+    try:
+        pending = []
+        for entity_uri, name, entity_type in entities:
+            # Langues ayant déjà un label (ou une recherche en cours) pour cette
+            # entité: une même entité peut apparaître sous plusieurs types
+            known = known_langs.setdefault(entity_uri, set())
+            searches = [(lang, pool.submit(search_fandom_wiki, name, lang))
+                        for lang in languages if lang not in known]
+            known.update(lang for lang, _ in searches)
+            pending.append((entity_uri, name, searches))
         
-        for lang in languages:
-            # Vérifier si un label existe déjà pour cette langue
-            has_label = False
-            for lbl in graph.objects(entity_uri, RDFS.label):
-                if hasattr(lbl, 'language') and lbl.language == lang:
-                    has_label = True
-                    break
-            
-            if has_label:
-                continue
+        for i, (entity_uri, name, searches) in enumerate(pending):
+            stats['checked'] += 1
+            entity_had_new_labels = False
             
-            # Rechercher sur Fandom Wiki
-            found_title = search_fandom_wiki(name, lang)
-            
-            if found_title and found_title != name:
+            for lang, future in searches:
+                found_title = future.result()
+                if not found_title or found_title == name:
+                    continue
+                
                 # Ajouter comme rdfs:label avec tag de langue
-                graph.add((entity_uri, RDFS.label, Literal(found_title, lang=lang)))
+                quads.append((entity_uri, RDFS.label, Literal(found_title, lang=lang), graph))
                 
                 # Ajouter le lien vers la page Fandom (seulement une fois par entité/langue)
                 fandom_url = f"https://lotr.fandom.com/{lang}/wiki/{found_title.replace(' ', '_')}"
-                graph.add((entity_uri, RDFS.seeAlso, URIRef(fandom_url)))
+                quads.append((entity_uri, RDFS.seeAlso, URIRef(fandom_url), graph))
                 
                 stats['labels_added'] += 1
                 entity_had_new_labels = True
@@ -485,13 +698,15 @@ def enrich_multilingual(graph: Graph, languages: List[str] = None,
                 if verbose and stats['labels_added'] <= 15:
                     print(f"  {name} [{lang}] -> {found_title}")
             
-            time.sleep(0.5)  # Rate limiting pour respecter l'API
-        
-        if entity_had_new_labels:
-            stats['entities_enriched'] += 1
-        
-        if verbose and (i + 1) % 20 == 0:
-            print(f"  Progress: {i + 1}/{len(entities)} ({stats['labels_added']} labels added)")
+            if entity_had_new_labels:
+                stats['entities_enriched'] += 1
+            
+            if verbose and (i + 1) % 20 == 0:
+                print(f"  Progress: {i + 1}/{len(entities)} ({stats['labels_added']} labels added)")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        graph.addN(quads)
+        save_fandom_cache()
     
     if verbose:
         print(f"\n  Summary:")
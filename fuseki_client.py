@@ -5,13 +5,30 @@ Ce module gère la communication avec le triplestore Apache Jena Fuseki.
 Il permet de charger, interroger et mettre à jour le graphe RDF.
 """
 
+import time
 import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlencode
 
 import requests
-from rdflib import Graph
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from rdflib import Graph, BNode, Literal
 
-from config import PREFIXES
+from config import (
+    PREFIXES, FUSEKI_TEXT_INDEX,
+    FUSEKI_QUERY_CACHE_SIZE, FUSEKI_QUERY_CACHE_TTL, FUSEKI_QUERY_CACHE_MAX_ROWS
+)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
@@ -19,22 +36,142 @@ logger = logging.getLogger(__name__)
 DEFAULT_FUSEKI_URL = "http://localhost:3030"
 DEFAULT_DATASET = "tolkien"
 
+# Au-delà (requête encodée), les SELECT/ASK sont envoyés en POST plutôt qu'en GET
+MAX_GET_QUERY_LENGTH = 4096
+
+# Au-delà, le Turtle à envoyer est écrit sur disque plutôt qu'en mémoire
+UPLOAD_SPOOL_SIZE = 64 * 1024 * 1024
+
+# Types MIME des formats que Fuseki lit et écrit nativement (Graph Store Protocol)
+RDF_MIME_TYPES = {
+    "turtle": "text/turtle",
+    "ttl": "text/turtle",
+    "xml": "application/rdf+xml",
+    "nt": "application/n-triples",
+    "json-ld": "application/ld+json",
+}
+
+
+def _nt_term(term) -> str:
+    """Forme N-Triples d'un terme (Literal.n3() peut produire des chaînes longues Turtle)."""
+    if isinstance(term, Literal):
+        value = (term.replace("\\", "\\\\").replace('"', '\\"')
+                 .replace("\n", "\\n").replace("\r", "\\r"))
+        if term.language:
+            return f'"{value}"@{term.language}'
+        if term.datatype:
+            return f'"{value}"^^<{term.datatype}>'
+        return f'"{value}"'
+    return term.n3()
+
+
+def _sparql_string(value: str) -> str:
+    """Littéral chaîne SPARQL correctement échappé (guillemets compris)."""
+    return _nt_term(Literal(value))
+
+
+# Caractères spéciaux de la syntaxe de requête Lucene
+_LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+
+def _lucene_escape(term: str) -> str:
+    return "".join("\\" + c if c in _LUCENE_SPECIAL else c for c in term)
+
+
+TEXT_PREFIX = "PREFIX text: <http://jena.apache.org/text#>\n"
+
+# Candidats demandés à l'index texte avant le filtre CONTAINS d'une recherche
+TEXT_SEARCH_CANDIDATES = 1000
+
+
+def text_query_pattern(var: str, search_term: str, limit: int) -> str:
+    """
+    Motif text:query (index Lucene de rdfs:label) liant var aux entités
+    dont un label a un mot commençant par chaque mot du terme.
+    
+    La requête doit déclarer TEXT_PREFIX.
+    """
+    lucene_query = " AND ".join(_lucene_escape(word) + "*" for word in search_term.split())
+    return f"{var} text:query (rdfs:label {_sparql_string(lucene_query)} {int(limit)}) ."
+
+
+class QueryCache:
+    """
+    Cache LRU à durée de vie des résultats de requêtes, partagé par le processus.
+    
+    La clé inclut une génération incrémentée à chaque écriture: les résultats
+    antérieurs ne sont plus servis, y compris ceux d'une requête encore en cours
+    au moment de l'écriture.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float, max_rows: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.generation = 0
+        self._entries = OrderedDict()  # clé -> (date d'expiration, résultat)
+        self._lock = threading.Lock()
+    
+    def key(self, endpoint: str, sparql_query: str, format: str) -> Tuple:
+        """Clé d'une requête (espaces normalisés) pour la génération courante."""
+        return (self.generation, endpoint, format, " ".join(sparql_query.split()))
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+    
+    def put(self, key: Tuple, value: Dict):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        # Mémoire bornée: les gros résultats (et le texte brut XML) ne sont pas gardés
+        if "raw" in value or len(value.get("results", {}).get("bindings", ())) > self.max_rows:
+            return
+        with self._lock:
+            if key[0] != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self):
+        """Oublie tous les résultats (après une écriture dans un dataset)."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+# Commun à tous les clients du processus (serveur, builder)
+_query_cache = QueryCache(FUSEKI_QUERY_CACHE_SIZE, FUSEKI_QUERY_CACHE_TTL, FUSEKI_QUERY_CACHE_MAX_ROWS)
+
 
 class FusekiClient:
     """
     Client pour interagir avec Apache Jena Fuseki.
     """
     
-    def __init__(self, fuseki_url: str = None, dataset: str = None):
+    def __init__(self, fuseki_url: str = None, dataset: str = None, text_index: bool = None):
         """
         Initialise le client Fuseki.
         
         Args:
             fuseki_url: URL de base de Fuseki (ex: http://localhost:3030)
             dataset: Nom du dataset (ex: tolkien)
+            text_index: Le dataset a un index texte Jena sur rdfs:label
+                        (par défaut: FUSEKI_TEXT_INDEX)
         """
         self.fuseki_url = (fuseki_url or DEFAULT_FUSEKI_URL).rstrip('/')
         self.dataset = dataset or DEFAULT_DATASET
+        self.text_index = FUSEKI_TEXT_INDEX if text_index is None else text_index
+        # Préfixes SPARQL ajoutés à chaque requête (PREFIXES est constant)
+        self._prefixes = self._build_prefixes()
         
         # Endpoints
         self.sparql_endpoint = f"{self.fuseki_url}/{self.dataset}/sparql"
@@ -44,10 +181,20 @@ class FusekiClient:
         
         self.timeout = 30
         
+        # Session partagée: les connexions HTTP keep-alive sont réutilisées
+        # d'une requête à l'autre (et entre les threads de load_graph_parallel).
+        # Les GET (ping, infos dataset, requêtes) sont retentés sur les erreurs
+        # passagères; les POST ne sont jamais rejoués.
+        retry = Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504],
+                      raise_on_status=False)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry))
+        
     def is_available(self) -> bool:
         """Vérifie si le serveur Fuseki est disponible."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.fuseki_url}/$/ping",
                 timeout=5
             )
@@ -59,7 +206,7 @@ class FusekiClient:
     def dataset_exists(self) -> bool:
         """Vérifie si le dataset existe."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.fuseki_url}/$/datasets/{self.dataset}",
                 timeout=5
             )
@@ -70,7 +217,7 @@ class FusekiClient:
     def get_dataset_info(self) -> Optional[Dict]:
         """Récupère les informations sur le dataset."""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.fuseki_url}/$/datasets/{self.dataset}",
                 timeout=self.timeout
             )
@@ -80,6 +227,27 @@ class FusekiClient:
             logger.error(f"Error getting dataset info: {e}")
         return None
     
+    def detect_text_index(self) -> bool:
+        """
+        Active text_index si le dataset répond à text:query (index Lucene configuré).
+        
+        Le test cherche par l'index un mot d'un label existant: sans index,
+        Jena ne renvoie aucun résultat ou une erreur.
+        """
+        if self.text_index:
+            return True
+        
+        results = self.query("SELECT ?label WHERE { ?s rdfs:label ?label } LIMIT 1")
+        bindings = (results or {}).get("results", {}).get("bindings", [])
+        label = bindings[0].get("label", {}).get("value", "") if bindings else ""
+        word = next((w for w in label.split() if w.isalnum()), None)
+        if word is None:
+            return False
+        
+        probe = self.query(TEXT_PREFIX + f"ASK {{ {text_query_pattern('?s', word, 1)} }}")
+        self.text_index = bool(probe and probe.get("boolean", False))
+        return self.text_index
+    
     def count_triples(self) -> int:
         """Compte le nombre de triplets dans le dataset."""
         query = "SELECT (COUNT(*) as ?count) WHERE { ?s ?p ?o }"
@@ -88,42 +256,68 @@ class FusekiClient:
             return int(results["results"]["bindings"][0]["count"]["value"])
         return 0
     
-    def query(self, sparql_query: str, format: str = "json") -> Optional[Dict]:
+    def query(self, sparql_query: str, format: str = "json", cache: bool = True) -> Optional[Dict]:
         """
         Exécute une requête SPARQL SELECT/ASK.
         
+        Les résultats sont mis en cache (FUSEKI_QUERY_CACHE_TTL, au plus
+        FUSEKI_QUERY_CACHE_MAX_ROWS lignes) et partagés entre les appels: ils ne
+        doivent pas être modifiés.
+        
         Args:
             sparql_query: Requête SPARQL
             format: Format de réponse (json, xml)
+            cache: False pour les requêtes libres (RAND(), NOW(), gros SELECT *)
             
         Returns:
             Résultats de la requête ou None en cas d'erreur
         """
+        cache_key = _query_cache.key(self.sparql_endpoint, sparql_query, format) if cache else None
+        cached = _query_cache.get(cache_key) if cache else None
+        if cached is not None:
+            return cached
+        
         try:
             # Ajouter les préfixes standards
-            prefixes = self._build_prefixes()
-            full_query = prefixes + sparql_query
+            full_query = self._prefixes + sparql_query
             
             headers = {
                 "Accept": "application/sparql-results+json" if format == "json" else "application/sparql-results+xml"
             }
             
-            response = requests.post(
-                self.sparql_endpoint,
-                data={"query": full_query},
-                headers=headers,
-                timeout=self.timeout
-            )
+            # Requêtes courtes en GET (URL raisonnable), les autres en POST
+            form = urlencode({"query": full_query})
+            if len(form) <= MAX_GET_QUERY_LENGTH:
+                response = self.session.get(
+                    f"{self.sparql_endpoint}?{form}",
+                    headers=headers,
+                    timeout=self.timeout
+                )
+            else:
+                response = self.session.post(
+                    self.sparql_endpoint,
+                    data=form,
+                    headers={**headers, "Content-Type": "application/x-www-form-urlencoded"},
+                    timeout=self.timeout
+                )
             
             response.raise_for_status()
             
             if format == "json":
-                return response.json()
-            return {"raw": response.text}
+                if ORJSON_AVAILABLE:
+                    result = orjson.loads(response.content)
+                else:
+                    result = response.json()
+            else:
+                result = {"raw": response.text}
             
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             logger.error(f"SPARQL query error: {e}")
             return None
+        
+        if cache:
+            _query_cache.put(cache_key, result)
+        return result
     
     def construct(self, sparql_query: str) -> Optional[Graph]:
         """
@@ -136,10 +330,9 @@ class FusekiClient:
             Graph RDFLib avec les résultats
         """
         try:
-            prefixes = self._build_prefixes()
-            full_query = prefixes + sparql_query
+            full_query = self._prefixes + sparql_query
             
-            response = requests.post(
+            response = self.session.post(
                 self.sparql_endpoint,
                 data={"query": full_query},
                 headers={"Accept": "text/turtle"},
@@ -167,10 +360,9 @@ class FusekiClient:
             True si succès, False sinon
         """
         try:
-            prefixes = self._build_prefixes()
-            full_query = prefixes + sparql_update
+            full_query = self._prefixes + sparql_update
             
-            response = requests.post(
+            response = self.session.post(
                 self.update_endpoint,
                 data={"update": full_query},
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
@@ -183,6 +375,9 @@ class FusekiClient:
         except Exception as e:
             logger.error(f"SPARQL UPDATE error: {e}")
             return False
+        finally:
+            # Écriture (même partielle): les résultats en cache sont périmés
+            _query_cache.invalidate()
     
     def load_graph(self, graph: Graph, clear_first: bool = False) -> bool:
         """
@@ -199,15 +394,18 @@ class FusekiClient:
             if clear_first:
                 self.clear()
             
-            # Sérialiser en Turtle
-            turtle_data = graph.serialize(format="turtle")
-            
-            response = requests.post(
-                self.data_endpoint,
-                data=turtle_data.encode('utf-8'),
-                headers={"Content-Type": "text/turtle; charset=utf-8"},
-                timeout=120  # Timeout plus long pour les gros graphes
-            )
+            # Sérialiser en N-Triples (écrit triplet par triplet, sans la mise en
+            # forme du Turtle, et plus rapide à parser pour Fuseki) dans un fichier
+            # temporaire (en mémoire tant qu'il est petit), puis l'envoyer en flux
+            with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE) as tmp:
+                graph.serialize(destination=tmp, format="nt", encoding="utf-8")
+                tmp.seek(0)
+                response = self.session.post(
+                    self.data_endpoint,
+                    data=tmp,
+                    headers={"Content-Type": "application/n-triples; charset=utf-8"},
+                    timeout=120  # Timeout plus long pour les gros graphes
+                )
             
             response.raise_for_status()
             logger.info(f"Loaded {len(graph)} triples into Fuseki")
@@ -216,6 +414,63 @@ class FusekiClient:
         except Exception as e:
             logger.error(f"Error loading graph to Fuseki: {e}")
             return False
+        finally:
+            _query_cache.invalidate()
+    
+    def load_graph_parallel(self, graph: Graph, clear_first: bool = False,
+                            batch_size: int = 10000, dop: int = 4) -> bool:
+        """
+        Charge un graphe dans Fuseki par lots N-Triples envoyés en parallèle.
+        
+        Args:
+            graph: Graphe RDFLib à charger
+            clear_first: Si True, vide le dataset avant de charger
+            batch_size: Nombre de triplets par requête
+            dop: Nombre de requêtes simultanées
+            
+        Returns:
+            True si tous les lots ont été chargés
+        """
+        if clear_first and not self.clear():
+            return False
+        
+        # Les blank nodes ne sont valables qu'au sein d'une requête:
+        # les triplets qui en contiennent partent ensemble dans le dernier lot
+        batches, current, with_bnodes = [], [], []
+        for s, p, o in graph:
+            line = f"{_nt_term(s)} {_nt_term(p)} {_nt_term(o)} .\n"
+            if isinstance(s, BNode) or isinstance(o, BNode):
+                with_bnodes.append(line)
+                continue
+            current.append(line)
+            if len(current) >= batch_size:
+                batches.append(current)
+                current = []
+        if current:
+            batches.append(current)
+        if with_bnodes:
+            batches.append(with_bnodes)
+        
+        def post(lines: List[str]):
+            response = self.session.post(
+                self.data_endpoint,
+                data="".join(lines).encode('utf-8'),
+                headers={"Content-Type": "application/n-triples; charset=utf-8"},
+                timeout=120
+            )
+            response.raise_for_status()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=dop) as pool:
+                for future in [pool.submit(post, batch) for batch in batches]:
+                    future.result()
+            logger.info(f"Loaded {len(graph)} triples into Fuseki ({len(batches)} batches)")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading graph to Fuseki: {e}")
+            return False
+        finally:
+            _query_cache.invalidate()
     
     def load_file(self, filepath: str, format: str = "turtle", clear_first: bool = False) -> bool:
         """
@@ -229,13 +484,46 @@ class FusekiClient:
         Returns:
             True si succès
         """
+        mime = RDF_MIME_TYPES.get(format)
         try:
-            g = Graph()
-            g.parse(filepath, format=format)
-            return self.load_graph(g, clear_first=clear_first)
+            if mime is None:
+                # Format non lu par Fuseki: passage par rdflib
+                g = Graph()
+                g.parse(filepath, format=format)
+                return self.load_graph(g, clear_first=clear_first)
+            
+            if clear_first and not self.clear():
+                return False
+            
+            # Le fichier est envoyé tel quel, en flux, sans être parsé ici
+            with open(filepath, 'rb') as f:
+                response = self.session.post(
+                    self.data_endpoint,
+                    data=f,
+                    headers={"Content-Type": f"{mime}; charset=utf-8"},
+                    timeout=600
+                )
+            response.raise_for_status()
+            logger.info(f"Loaded {filepath} into Fuseki")
+            return True
         except Exception as e:
             logger.error(f"Error loading file: {e}")
             return False
+        finally:
+            _query_cache.invalidate()
+    
+    def materialize_link_flags(self) -> bool:
+        """
+        Ajoute tprop:hasMetwCard / tprop:hasCsvData aux entités qui ont une carte
+        METW ou des données CSV (graphes chargés avant que l'enrichissement ne les écrive).
+        """
+        return self.update("""
+        INSERT { ?e tprop:hasMetwCard true }
+        WHERE { ?e tprop:metwCard ?card FILTER NOT EXISTS { ?e tprop:hasMetwCard true } } ;
+        INSERT { ?e tprop:hasCsvData true }
+        WHERE { { ?e tprop:hairColor ?hc } UNION { ?e tprop:height ?ht }
+                FILTER NOT EXISTS { ?e tprop:hasCsvData true } }
+        """)
     
     def clear(self) -> bool:
         """Vide complètement le dataset."""
@@ -275,29 +563,44 @@ class FusekiClient:
         Returns:
             Liste de dictionnaires {uri, label, type}
         """
-        # Échapper les caractères spéciaux pour SPARQL
-        search_term_escaped = search_term.replace("'", "\\'").replace('"', '\\"')
+        def label_query(text_clause: str = "") -> str:
+            return f"""
+            SELECT DISTINCT ?entity ?label ?type
+            WHERE {{
+                {text_clause}
+                ?entity rdfs:label ?label .
+                FILTER(CONTAINS(LCASE(STR(?label)), LCASE({_sparql_string(search_term)})))
+                OPTIONAL {{ ?entity a ?type }}
+            }}
+            LIMIT {int(limit)}
+            """
         
-        query = f"""
-        SELECT DISTINCT ?entity ?label ?type
-        WHERE {{
-            ?entity rdfs:label ?label .
-            FILTER(CONTAINS(LCASE(STR(?label)), LCASE("{search_term_escaped}")))
-            OPTIONAL {{ ?entity a ?type }}
-        }}
-        LIMIT {limit}
-        """
+        # Index texte: ses résultats (mots commençant par le terme) passent en
+        # tête; le CONTAINS complet garde les sous-chaînes internes à un mot
+        bindings = []
+        if self.text_index:
+            candidates = max(TEXT_SEARCH_CANDIDATES, int(limit))
+            results = self.query(TEXT_PREFIX + label_query(
+                text_query_pattern("?entity", search_term, candidates)))
+            bindings.extend((results or {}).get("results", {}).get("bindings", []))
+        results = self.query(label_query())
+        bindings.extend((results or {}).get("results", {}).get("bindings", []))
         
-        results = self.query(query)
         entities = []
-        
-        if results and "results" in results:
-            for binding in results["results"]["bindings"]:
-                entities.append({
-                    "uri": binding.get("entity", {}).get("value", ""),
-                    "label": binding.get("label", {}).get("value", ""),
-                    "type": binding.get("type", {}).get("value", "")
-                })
+        seen = set()
+        for binding in bindings:
+            entity = {
+                "uri": binding.get("entity", {}).get("value", ""),
+                "label": binding.get("label", {}).get("value", ""),
+                "type": binding.get("type", {}).get("value", "")
+            }
+            key = tuple(entity.values())
+            if key in seen:
+                continue
+            seen.add(key)
+            entities.append(entity)
+            if len(entities) == limit:
+                break
         
         return entities
     
@@ -354,6 +657,9 @@ class FusekiClient:
         """
         Exporte le contenu du dataset vers un fichier.
         
+        Le graphe par défaut est téléchargé via le Graph Store Protocol et écrit
+        en flux sur le disque; la requête CONSTRUCT ne sert qu'en repli.
+        
         Args:
             filepath: Chemin du fichier de sortie
             format: Format (turtle, xml, nt)
@@ -361,6 +667,25 @@ class FusekiClient:
         Returns:
             True si succès
         """
+        mime = RDF_MIME_TYPES.get(format)
+        if mime:
+            try:
+                with self.session.get(
+                    self.data_endpoint,
+                    params={"default": ""},
+                    headers={"Accept": mime},
+                    stream=True,
+                    timeout=self.timeout
+                ) as response:
+                    response.raise_for_status()
+                    with open(filepath, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=1 << 16):
+                            f.write(chunk)
+                logger.info(f"Exported dataset to {filepath}")
+                return True
+            except Exception as e:
+                logger.warning(f"Graph store export failed, falling back to CONSTRUCT: {e}")
+        
         try:
             query = "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"
             graph = self.construct(query)
@@ -395,4 +720,6 @@ def get_fuseki_client(fuseki_url: str = None, dataset: str = None) -> FusekiClie
 def reset_fuseki_client():
     """Réinitialise le client Fuseki."""
     global _fuseki_client
+    if _fuseki_client is not None:
+        _fuseki_client.session.close()
     _fuseki_client = None
@@ -4,14 +4,31 @@ approche dynamique qui découvre les liens via l'API Wikipedia/Wikidata.
 """
 
 import re
-import time
+import atexit
 import logging
-from typing import Optional, Dict, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import wraps
+from typing import Optional, Dict, List, Set, Tuple
 from urllib.parse import quote, unquote
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from config import HTTP_HEADERS, REQUEST_TIMEOUT
+import linking_offline
+from cache import SQLiteCache
+from ratelimit import TokenBucket
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+from config import (
+    HTTP_HEADERS, REQUEST_TIMEOUT, LINKING_WORKERS,
+    LINKING_CACHE_ENABLED, LINKING_CACHE_FILE, LINKING_CACHE_EXPIRE, LINKING_CACHE_COMMIT_EVERY
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,58 +36,157 @@ logger = logging.getLogger(__name__)
 WIKIPEDIA_API = "https://en.wikipedia.org/w/api.php"
 WIKIDATA_API = "https://www.wikidata.org/w/api.php"
 WIKIDATA_SPARQL = "https://query.wikidata.org/sparql"
+DBPEDIA_SPARQL = "http://dbpedia.org/sparql"
+
+# Session partagée (connexions keep-alive réutilisées par tous les appels et threads),
+# avec nouvelle tentative sur les erreurs passagères et le rate limiting (429)
+_session = requests.Session()
+_session.headers.update(HTTP_HEADERS)
+_retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+for _prefix in ("https://en.wikipedia.org", "https://www.wikidata.org", "https://query.wikidata.org",
+                "http://dbpedia.org"):
+    _session.mount(_prefix, HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_retry))
+
+# Cache persistant pour éviter les requêtes répétées (entité -> liens);
+# écritures validées par lots, le reste à la fin d'un batch ou du processus
+_link_cache = SQLiteCache(
+    LINKING_CACHE_FILE if LINKING_CACHE_ENABLED else ":memory:",
+    table="links", ttl=LINKING_CACHE_EXPIRE, commit_every=LINKING_CACHE_COMMIT_EVERY
+)
+
+# Résultats intermédiaires, mis en cache séparément (même fichier): un lien
+# ajouté ou construit autrement réutilise les recherches déjà faites
+_title_cache = SQLiteCache(
+    LINKING_CACHE_FILE if LINKING_CACHE_ENABLED else ":memory:",
+    table="wiki_titles", ttl=LINKING_CACHE_EXPIRE, commit_every=LINKING_CACHE_COMMIT_EVERY
+)
+_wikidata_id_cache = SQLiteCache(
+    LINKING_CACHE_FILE if LINKING_CACHE_ENABLED else ":memory:",
+    table="wikidata_ids", ttl=LINKING_CACHE_EXPIRE, commit_every=LINKING_CACHE_COMMIT_EVERY
+)
+_wikidata_search_cache = SQLiteCache(
+    LINKING_CACHE_FILE if LINKING_CACHE_ENABLED else ":memory:",
+    table="wikidata_search", ttl=LINKING_CACHE_EXPIRE, commit_every=LINKING_CACHE_COMMIT_EVERY
+)
+
+
+def _flush_caches():
+    for c in (_link_cache, _title_cache, _wikidata_id_cache, _wikidata_search_cache):
+        c.flush()
+
+
+atexit.register(_flush_caches)
+
+# Marque, par thread, qu'une requête a échoué pendant la découverte en cours:
+# un résultat vide dû au réseau ne doit pas être conservé dans le cache
+_lookup_state = threading.local()
+
+
+def _json(response: requests.Response):
+    """Décode une réponse JSON (orjson si disponible, directement depuis les octets)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def _lookup_failed():
+    _lookup_state.failed = True
+
+
+_MISSING = object()
+
+
+def _memoized(cache: SQLiteCache):
+    """
+    Met en cache le résultat (y compris None) d'une recherche à un argument,
+    sauf si une de ses requêtes a échoué.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(arg: str):
+            hit = cache.get(arg, _MISSING)
+            if hit is not _MISSING:
+                return hit
+            outer = getattr(_lookup_state, "failed", False)
+            _lookup_state.failed = False
+            result = func(arg)
+            failed = _lookup_state.failed
+            _lookup_state.failed = outer or failed
+            if not failed:
+                cache.put(arg, result)
+            return result
+        return wrapper
+    return decorator
 
-# Cache pour éviter les requêtes répétées
-_link_cache: Dict[str, Dict[str, str]] = {}
+# Résultats examinés par recherche Wikipedia
+SEARCH_LIMIT = 20
 
-# Délai entre requêtes (rate limiting)
-REQUEST_DELAY = 0.5
-_last_request_time = 0
+# Variantes qualifiées, essayées dans l'ordre seulement si la recherche du nom
+# seul ne donne aucun résultat Tolkien
+SEARCH_VARIANTS = (
+    "{} (Middle-earth)",
+    "{} (character)",
+    "{} Tolkien",
+    "{} Lord of the Rings",
+)
 
+# Nombre maximum de titres par requête MediaWiki (titles=A|B|...)
+MAX_TITLES_PER_QUERY = 50
 
-def _rate_limit():
-    """Respecte le rate limiting."""
-    global _last_request_time
-    elapsed = time.time() - _last_request_time
-    if elapsed < REQUEST_DELAY:
-        time.sleep(REQUEST_DELAY - elapsed)
-    _last_request_time = time.time()
+# Nombre maximum d'URIs par requête VALUES sur l'endpoint DBpedia
+MAX_URIS_PER_QUERY = 100
 
+# Longueur minimale d'un nom recherché par discover_links_batch
+MIN_NAME_LENGTH = 3
 
+# Débit par API (requêtes/s en moyenne, rafale maximale): chaque hôte a son
+# propre budget, les appels vers l'un n'attendent plus ceux vers l'autre
+API_RATES = {
+    WIKIPEDIA_API: (5.0, 5),
+    WIKIDATA_API: (5.0, 5),
+    DBPEDIA_SPARQL: (2.0, 2),
+}
+_buckets = {api: TokenBucket(rate, capacity) for api, (rate, capacity) in API_RATES.items()}
+
+
+def _rate_limit(api: str):
+    """Respecte le rate limiting de l'API (partagé entre threads)."""
+    _buckets[api].acquire()
+
+
+def _search_terms(query: str) -> List[str]:
+    """Nom seul puis ses variantes qualifiées, dans l'ordre d'essai."""
+    return [query] + [variant.format(query) for variant in SEARCH_VARIANTS]
+
+
+@_memoized(_title_cache)
 def search_wikipedia(query: str) -> Optional[str]:
     """
     Recherche une page Wikipedia correspondant à une entité Tolkien.
     Retourne le titre de la page Wikipedia ou None.
+    
+    Une recherche du nom seul avec plus de résultats, classés localement par
+    _is_tolkien_related; les variantes qualifiées (SEARCH_VARIANTS) ne servent
+    que si aucun résultat ne correspond.
     """
-    _rate_limit()
-    
-    # Stratégie de recherche : essayer plusieurs variantes
-    search_queries = [
-        query,
-        f"{query} (Middle-earth)",
-        f"{query} (character)",
-        f"{query} Tolkien",
-        f"{query} Lord of the Rings",
-    ]
-    
-    for search_term in search_queries:
+    for search_term in _search_terms(query):
+        _rate_limit(WIKIPEDIA_API)
         try:
             params = {
                 "action": "query",
                 "list": "search",
                 "srsearch": search_term,
-                "srlimit": 5,
+                "srlimit": SEARCH_LIMIT,
                 "format": "json",
             }
             
-            response = requests.get(
+            response = _session.get(
                 WIKIPEDIA_API,
                 params=params,
-                headers=HTTP_HEADERS,
                 timeout=REQUEST_TIMEOUT
             )
             response.raise_for_status()
-            data = response.json()
+            data = _json(response)
             
             results = data.get("query", {}).get("search", [])
             
@@ -82,11 +198,75 @@ def search_wikipedia(query: str) -> Optional[str]:
                     
         except Exception as e:
             logger.debug(f"Wikipedia search error for '{search_term}': {e}")
+            _lookup_failed()
             continue
     
     return None
 
 
+def search_wikipedia_with_wikidata(query: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Comme search_wikipedia, mais récupère l'ID Wikidata des résultats dans la
+    même requête (generator=search + prop=pageprops).
+    
+    Returns:
+        (titre Wikipedia ou None, ID Wikidata ou None)
+    """
+    title = _title_cache.get(query, _MISSING)
+    if title is not _MISSING:
+        if title is None:
+            return None, None
+        return title, get_wikidata_id_from_wikipedia(title)
+    
+    failed = False
+    found = None, None
+    for search_term in _search_terms(query):
+        _rate_limit(WIKIPEDIA_API)
+        try:
+            params = {
+                "action": "query",
+                "generator": "search",
+                "gsrsearch": search_term,
+                "gsrlimit": SEARCH_LIMIT,
+                "prop": "pageprops",
+                "ppprop": "wikibase_item",
+                "format": "json",
+            }
+            
+            response = _session.get(
+                WIKIPEDIA_API,
+                params=params,
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            data = _json(response)
+            
+            # Les pages ne sont pas ordonnées: "index" donne le rang dans la recherche
+            pages = sorted(data.get("query", {}).get("pages", {}).values(),
+                           key=lambda page: page.get("index", 0))
+            match = next((page for page in pages if _is_tolkien_related(page.get("title", ""), query)), None)
+            if match is not None:
+                found = match["title"], match.get("pageprops", {}).get("wikibase_item")
+                break
+                
+        except Exception as e:
+            logger.debug(f"Wikipedia search error for '{search_term}': {e}")
+            _lookup_failed()
+            failed = True
+    
+    if not failed or found[0]:
+        _title_cache.put(query, found[0])
+        if found[0]:
+            _wikidata_id_cache.put(found[0], found[1])
+    return found
+
+
+# Indicateurs Tolkien dans un titre Wikipedia (minuscules), en une seule passe
+_TOLKIEN_RE = re.compile(
+    r"middle-earth|tolkien|lord of the rings|hobbit|silmarillion|arda|gondor|rohan|mordor"
+)
+
+
 def _is_tolkien_related(wiki_title: str, original_name: str) -> bool:
     """
     Vérifie si un titre Wikipedia est lié à l'univers Tolkien.
@@ -96,16 +276,9 @@ def _is_tolkien_related(wiki_title: str, original_name: str) -> bool:
     
     # Correspondance directe
     if name_lower in wiki_lower or wiki_lower.startswith(name_lower.split()[0]):
-        tolkien_indicators = [
-            "middle-earth", "tolkien", "lord of the rings", "hobbit",
-            "silmarillion", "arda", "gondor", "rohan", "mordor",
-            "(middle-earth)", "(tolkien)"
-        ]
-        
         # Si le titre contient un indicateur Tolkien explicite
-        for indicator in tolkien_indicators:
-            if indicator in wiki_lower:
-                return True
+        if _TOLKIEN_RE.search(wiki_lower):
+            return True
         
         # Sinon, accepter si le nom correspond bien
         if name_lower == wiki_lower or f"{name_lower} (" in wiki_lower:
@@ -114,11 +287,12 @@ def _is_tolkien_related(wiki_title: str, original_name: str) -> bool:
     return False
 
 
+@_memoized(_wikidata_id_cache)
 def get_wikidata_id_from_wikipedia(wikipedia_title: str) -> Optional[str]:
     """
     Récupère l'ID Wikidata à partir d'un titre Wikipedia.
     """
-    _rate_limit()
+    _rate_limit(WIKIPEDIA_API)
     
     try:
         params = {
@@ -129,14 +303,13 @@ def get_wikidata_id_from_wikipedia(wikipedia_title: str) -> Optional[str]:
             "format": "json",
         }
         
-        response = requests.get(
+        response = _session.get(
             WIKIPEDIA_API,
             params=params,
-            headers=HTTP_HEADERS,
             timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        data = response.json()
+        data = _json(response)
         
         pages = data.get("query", {}).get("pages", {})
         for page_id, page_data in pages.items():
@@ -145,15 +318,17 @@ def get_wikidata_id_from_wikipedia(wikipedia_title: str) -> Optional[str]:
                 
     except Exception as e:
         logger.debug(f"Wikidata ID lookup error for '{wikipedia_title}': {e}")
+        _lookup_failed()
     
     return None
 
 
+@_memoized(_wikidata_search_cache)
 def search_wikidata_direct(query: str) -> Optional[str]:
     """
     Recherche directement sur Wikidata si Wikipedia ne trouve rien.
     """
-    _rate_limit()
+    _rate_limit(WIKIDATA_API)
     
     try:
         params = {
@@ -164,14 +339,13 @@ def search_wikidata_direct(query: str) -> Optional[str]:
             "format": "json",
         }
         
-        response = requests.get(
+        response = _session.get(
             WIKIDATA_API,
             params=params,
-            headers=HTTP_HEADERS,
             timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        data = response.json()
+        data = _json(response)
         
         results = data.get("search", [])
         
@@ -183,18 +357,29 @@ def search_wikidata_direct(query: str) -> Optional[str]:
                 
     except Exception as e:
         logger.debug(f"Wikidata direct search error for '{query}': {e}")
+        _lookup_failed()
     
     return None
 
 
+# Titres -> identifiants d'URI: quote() n'est appelé que si un caractère doit
+# être encodé (les caractères non réservés et les "safe" de chaque appel restent tels quels)
+_SPACE_TO_UNDERSCORE = str.maketrans({" ": "_"})
+_DBPEDIA_SAFE_RE = re.compile(r"[A-Za-z0-9_.~(),-]*")
+_YAGO_SAFE_RE = re.compile(r"[A-Za-z0-9_.~-]*")
+_WIKIPEDIA_SAFE_RE = re.compile(r"[A-Za-z0-9_.~/-]*")
+
+
 def get_dbpedia_uri(wikipedia_title: str) -> str:
     """
     Construit l'URI DBpedia à partir d'un titre Wikipedia.
     DBpedia utilise le même identifiant que Wikipedia.
     """
     # Normaliser le titre pour DBpedia
-    dbpedia_name = wikipedia_title.replace(" ", "_")
-    return f"http://dbpedia.org/resource/{quote(dbpedia_name, safe='_(),-')}"
+    dbpedia_name = wikipedia_title.translate(_SPACE_TO_UNDERSCORE)
+    if not _DBPEDIA_SAFE_RE.fullmatch(dbpedia_name):
+        dbpedia_name = quote(dbpedia_name, safe='_(),-')
+    return f"http://dbpedia.org/resource/{dbpedia_name}"
 
 
 def get_yago_uri(wikipedia_title: str, wikidata_id: str = None) -> Optional[str]:
@@ -207,32 +392,78 @@ def get_yago_uri(wikipedia_title: str, wikidata_id: str = None) -> Optional[str]
         return None
     
     # Format YAGO: remplacer espaces par underscores
-    yago_name = wikipedia_title.replace(" ", "_")
-    return f"http://yago-knowledge.org/resource/{quote(yago_name, safe='_-')}"
+    yago_name = wikipedia_title.translate(_SPACE_TO_UNDERSCORE)
+    if not _YAGO_SAFE_RE.fullmatch(yago_name):
+        yago_name = quote(yago_name, safe='_-')
+    return f"http://yago-knowledge.org/resource/{yago_name}"
 
 
-def discover_external_links(entity_name: str) -> Dict[str, str]:
+def get_wikidata_ids_batch(titles: List[str]) -> Dict[str, Optional[str]]:
     """
-    Découvre dynamiquement les liens externes pour une entité.
+    Récupère les IDs Wikidata de plusieurs titres Wikipedia, par requêtes
+    multi-titres (jusqu'à MAX_TITLES_PER_QUERY titres par appel).
     
-    Args:
-        entity_name: Nom de l'entité (ex: "Gandalf", "Frodo Baggins")
-        
     Returns:
-        Dictionnaire avec les clés possibles: 'dbpedia', 'wikidata', 'yago', 'wikipedia'
+        Dictionnaire {titre demandé: ID Wikidata ou None}. Les titres dont la
+        requête a échoué sont absents du dictionnaire.
     """
-    # Vérifier le cache
-    if entity_name in _link_cache:
-        return _link_cache[entity_name]
+    ids = {}
+    unique = []
+    for title in dict.fromkeys(titles):
+        cached = _wikidata_id_cache.get(title, _MISSING)
+        if cached is _MISSING:
+            unique.append(title)
+        else:
+            ids[title] = cached
     
-    links = {}
+    for start in range(0, len(unique), MAX_TITLES_PER_QUERY):
+        chunk = unique[start:start + MAX_TITLES_PER_QUERY]
+        _rate_limit(WIKIPEDIA_API)
+        try:
+            params = {
+                "action": "query",
+                "titles": "|".join(chunk),
+                "prop": "pageprops",
+                "ppprop": "wikibase_item",
+                "format": "json",
+            }
+            
+            response = _session.get(
+                WIKIPEDIA_API,
+                params=params,
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            data = _json(response)
+            
+            query = data.get("query", {})
+            # Titres normalisés par l'API -> titre demandé
+            requested = {n["to"]: n["from"] for n in query.get("normalized", [])}
+            
+            chunk_ids = dict.fromkeys(chunk)
+            for page_data in query.get("pages", {}).values():
+                title = page_data.get("title", "")
+                chunk_ids[requested.get(title, title)] = page_data.get("pageprops", {}).get("wikibase_item")
+            for title in chunk:
+                ids[title] = chunk_ids[title]
+                _wikidata_id_cache.put(title, chunk_ids[title])
+            
+        except Exception as e:
+            logger.debug(f"Wikidata batch lookup error ({len(chunk)} titles): {e}")
     
-    # 1. Chercher sur Wikipedia
-    wiki_title = search_wikipedia(entity_name)
+    return ids
+
+
+def _assemble_links(wiki_title: Optional[str], wikidata_id: Optional[str]) -> Dict[str, str]:
+    """Construit les liens externes à partir du titre Wikipedia et de l'ID Wikidata."""
+    links = {}
     
     if wiki_title:
         # Wikipedia trouvé
-        links["wikipedia"] = f"https://en.wikipedia.org/wiki/{quote(wiki_title.replace(' ', '_'))}"
+        wiki_name = wiki_title.translate(_SPACE_TO_UNDERSCORE)
+        if not _WIKIPEDIA_SAFE_RE.fullmatch(wiki_name):
+            wiki_name = quote(wiki_name)
+        links["wikipedia"] = f"https://en.wikipedia.org/wiki/{wiki_name}"
         
         # DBpedia (dérivé de Wikipedia)
         links["dbpedia"] = get_dbpedia_uri(wiki_title)
@@ -241,54 +472,165 @@ def discover_external_links(entity_name: str) -> Dict[str, str]:
         yago_uri = get_yago_uri(wiki_title)
         if yago_uri:
             links["yago"] = yago_uri
-        
-        # Wikidata (via Wikipedia)
-        wikidata_id = get_wikidata_id_from_wikipedia(wiki_title)
-        if wikidata_id:
-            links["wikidata"] = f"http://www.wikidata.org/entity/{wikidata_id}"
-    else:
-        # Fallback: recherche directe sur Wikidata
-        wikidata_id = search_wikidata_direct(entity_name)
-        if wikidata_id:
-            links["wikidata"] = f"http://www.wikidata.org/entity/{wikidata_id}"
     
-    # Mettre en cache
-    _link_cache[entity_name] = links
+    if wikidata_id:
+        links["wikidata"] = f"http://www.wikidata.org/entity/{wikidata_id}"
+    
+    return links
+
+
+def _store_links(entity_name: str, links: Dict[str, str], failed: bool):
+    # Mettre en cache (sauf résultat incomplet à cause d'une erreur réseau)
+    if not failed:
+        _link_cache.put(entity_name, links)
     
     if links:
         logger.info(f"Found external links for '{entity_name}': {list(links.keys())}")
     else:
         logger.debug(f"No external links found for '{entity_name}'")
+
+
+def _tracked(func, *args):
+    """Appelle func et indique si une de ses requêtes a échoué (dans ce thread)."""
+    _lookup_state.failed = False
+    result = func(*args)
+    return result, _lookup_state.failed
+
+
+def discover_external_links(entity_name: str) -> Dict[str, str]:
+    """
+    Découvre dynamiquement les liens externes pour une entité.
+    
+    Args:
+        entity_name: Nom de l'entité (ex: "Gandalf", "Frodo Baggins")
+        
+    Returns:
+        Dictionnaire avec les clés possibles: 'dbpedia', 'wikidata', 'yago', 'wikipedia'
+    """
+    # Vérifier le cache
+    cached = _link_cache.get(entity_name)
+    if cached is not None:
+        return cached
+    
+    # Index Wikidata hors ligne, si configuré
+    offline = linking_offline.lookup(entity_name)
+    if offline is not None:
+        links = _assemble_links(*offline)
+        _store_links(entity_name, links, False)
+        return links
     
+    _lookup_state.failed = False
+    
+    # 1. Chercher sur Wikipedia (avec l'ID Wikidata de la page, même requête)
+    wiki_title, wikidata_id = search_wikipedia_with_wikidata(entity_name)
+    if not wiki_title:
+        # Fallback: recherche directe sur Wikidata
+        wikidata_id = search_wikidata_direct(entity_name)
+    
+    links = _assemble_links(wiki_title, wikidata_id)
+    _drop_missing_dbpedia([links])
+    _store_links(entity_name, links, _lookup_state.failed)
     return links
 
 
-def discover_links_batch(entity_names: List[str], verbose: bool = True) -> Dict[str, Dict[str, str]]:
+def _batch_key(name: str) -> Optional[str]:
+    """Clé de déduplication d'un nom, ou None s'il ne vaut pas une recherche."""
+    key = name.strip().casefold()
+    if len(key) < MIN_NAME_LENGTH or not any(c.isalpha() for c in key):
+        return None
+    return key
+
+
+def discover_links_batch(entity_names: List[str], verbose: bool = True,
+                         workers: int = LINKING_WORKERS) -> Dict[str, Dict[str, str]]:
     """
     Découvre les liens externes pour plusieurs entités.
     
+    Les recherches Wikipedia (qui renvoient aussi les IDs Wikidata) sont faites
+    en parallèle: les appels réseau se recouvrent, le rate limiting restant
+    partagé entre les threads. Les liens DBpedia trouvés sont ensuite vérifiés
+    par lots (verify_dbpedia_exists_batch).
+    
     Args:
         entity_names: Liste des noms d'entités
         verbose: Afficher la progression
+        workers: Nombre d'entités traitées simultanément
         
     Returns:
         Dictionnaire {entity_name: {link_type: uri}}
     """
-    results = {}
     total = len(entity_names)
-    found = 0
     
     if verbose:
         print(f"\nDiscovering external links for {total} entities...")
     
-    for i, name in enumerate(entity_names, 1):
-        links = discover_external_links(name)
+    # Une seule recherche par nom (à la casse et aux espaces près), noms
+    # inexploitables écartés avant tout accès au cache ou au réseau
+    keys = {name: _batch_key(name) for name in entity_names}
+    canonical = {}
+    for name, key in keys.items():
+        if key is not None:
+            canonical.setdefault(key, name)
+    
+    links_by_name = {}
+    todo = []
+    for name in canonical.values():
+        cached = _link_cache.get(name)
+        if cached is not None:
+            links_by_name[name] = cached
+            continue
+        offline = linking_offline.lookup(name)
+        if offline is not None:
+            links_by_name[name] = _assemble_links(*offline)
+            _store_links(name, links_by_name[name], False)
+        else:
+            todo.append(name)
+    
+    # Titre Wikipedia déjà en cache: pas de recherche, seuls les IDs Wikidata
+    # expirés sont redemandés, en requêtes multi-titres
+    cached_titles = {name: _title_cache.get(name, _MISSING) for name in todo}
+    known = {name: title for name, title in cached_titles.items() if title is not _MISSING}
+    ids = get_wikidata_ids_batch([title for title in known.values() if title])
+    searches = {name: ((title, ids.get(title)), bool(title) and title not in ids)
+                for name, title in known.items()}
+    to_search = [name for name in todo if name not in known]
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # 1. Recherche Wikipedia de chaque entité, IDs Wikidata compris
+        # (progression comptée à la fin de chaque recherche, dans n'importe quel ordre)
+        futures = {pool.submit(_tracked, search_wikipedia_with_wikidata, name): name for name in to_search}
+        for done, future in enumerate(as_completed(futures), 1):
+            searches[futures[future]] = future.result()
+            if verbose and done % 10 == 0:
+                print(f"  Wikipedia search: {done}/{len(to_search)}")
+        searches = {name: searches[name] for name in todo}
+        
+        # 2. Recherche directe sur Wikidata pour les entités sans page Wikipedia
+        missing = [name for name, ((title, _), _) in searches.items() if not title]
+        direct = dict(zip(missing, pool.map(lambda n: _tracked(search_wikidata_direct, n), missing)))
+    
+    found_links = {}
+    for name, ((wiki_title, wikidata_id), failed) in searches.items():
+        if not wiki_title:
+            wikidata_id, direct_failed = direct[name]
+            failed = failed or direct_failed
+        found_links[name] = (_assemble_links(wiki_title, wikidata_id), failed)
+    
+    # 3. Ressources DBpedia dérivées des titres vérifiées par lots VALUES
+    _drop_missing_dbpedia([links for links, _ in found_links.values()])
+    for name, (links, failed) in found_links.items():
+        _store_links(name, links, failed)
+        links_by_name[name] = links
+    
+    results = {}
+    for name, key in keys.items():
+        links = links_by_name[canonical[key]] if key is not None else None
         if links:
             results[name] = links
-            found += 1
-        
-        if verbose and i % 10 == 0:
-            print(f"  Progress: {i}/{total} ({found} with links)")
+    found = sum(1 for name in entity_names if name in results)
+    
+    # Visible des autres processus (parsing) dès la fin du batch
+    _flush_caches()
     
     if verbose:
         print(f"  Complete: {found}/{total} entities linked")
@@ -300,21 +642,19 @@ def verify_dbpedia_exists(dbpedia_uri: str) -> bool:
     """
     Vérifie qu'une ressource DBpedia existe réellement.
     """
-    _rate_limit()
+    _rate_limit(DBPEDIA_SPARQL)
     
     try:
         # Utiliser l'endpoint SPARQL de DBpedia
-        sparql_endpoint = "http://dbpedia.org/sparql"
         query = f"ASK {{ <{dbpedia_uri}> ?p ?o }}"
         
-        response = requests.get(
-            sparql_endpoint,
+        response = _session.get(
+            DBPEDIA_SPARQL,
             params={"query": query, "format": "json"},
-            headers=HTTP_HEADERS,
             timeout=REQUEST_TIMEOUT
         )
         response.raise_for_status()
-        data = response.json()
+        data = _json(response)
         
         return data.get("boolean", False)
         
@@ -324,10 +664,73 @@ def verify_dbpedia_exists(dbpedia_uri: str) -> bool:
         return True
 
 
+# Caractères interdits dans un IRI: une forme décodée qui en contient reste encodée
+_IRI_UNSAFE_RE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+
+def _dbpedia_iri(dbpedia_uri: str) -> str:
+    """Forme IRI (apostrophes et non-ASCII décodés) sous laquelle DBpedia stocke ses ressources."""
+    iri = unquote(dbpedia_uri)
+    return dbpedia_uri if _IRI_UNSAFE_RE.search(iri) else iri
+
+
+def verify_dbpedia_exists_batch(dbpedia_uris: List[str]) -> Set[str]:
+    """
+    Vérifie l'existence de plusieurs ressources DBpedia avec une requête
+    SPARQL VALUES par lot (au lieu d'un ASK par URI). Chaque URI est cherchée
+    sous sa forme encodée et sous sa forme IRI (voir _dbpedia_iri).
+    
+    Returns:
+        Ensemble des URIs qui existent (comme verify_dbpedia_exists, un lot en
+        erreur est considéré comme valide)
+    """
+    uris = list(dict.fromkeys(dbpedia_uris))
+    existing = set()
+    
+    for start in range(0, len(uris), MAX_URIS_PER_QUERY):
+        chunk = uris[start:start + MAX_URIS_PER_QUERY]
+        forms = {}
+        for uri in chunk:
+            forms[uri] = uri
+            forms.setdefault(_dbpedia_iri(uri), uri)
+        values = " ".join(f"<{form}>" for form in forms)
+        query = f"SELECT DISTINCT ?s WHERE {{ VALUES ?s {{ {values} }} ?s ?p ?o }}"
+        _rate_limit(DBPEDIA_SPARQL)
+        
+        try:
+            # POST: la clause VALUES dépasse vite la longueur d'URL acceptée
+            response = _session.post(
+                DBPEDIA_SPARQL,
+                data={"query": query, "format": "json"},
+                timeout=REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            data = _json(response)
+            
+            for binding in data.get("results", {}).get("bindings", []):
+                uri = forms.get(binding["s"]["value"])
+                if uri is not None:
+                    existing.add(uri)
+                
+        except Exception as e:
+            logger.debug(f"DBpedia batch verification error ({len(chunk)} URIs): {e}")
+            existing.update(chunk)
+    
+    return existing
+
+
+def _drop_missing_dbpedia(links_list: List[Dict[str, str]]):
+    """Retire des liens le 'dbpedia' dont la ressource n'existe pas (un lot de vérification)."""
+    existing = verify_dbpedia_exists_batch([links["dbpedia"] for links in links_list if "dbpedia" in links])
+    for links in links_list:
+        if "dbpedia" in links and links["dbpedia"] not in existing:
+            del links["dbpedia"]
+
+
 def clear_cache():
-    """Vide le cache des liens."""
-    global _link_cache
-    _link_cache = {}
+    """Vide le cache des liens et des recherches intermédiaires."""
+    for c in (_link_cache, _title_cache, _wikidata_id_cache, _wikidata_search_cache):
+        c.clear()
 
 
 def get_external_links_for_entity(entity_name: str) -> Dict[str, str]:
@@ -0,0 +1,165 @@
+"""
+Recherche hors ligne des liens Wikidata / Wikipedia à partir d'un index LMDB.
+
+L'index est construit une fois à partir du dump JSON de Wikidata
+(latest-all.json.bz2) et ne conserve que les entités liées à Tolkien:
+    python linking_offline.py latest-all.json.bz2 output/wikidata-lite.mdb
+
+Il est utilisé par linking.py avant les APIs quand WIKIDATA_LITE_PATH pointe
+vers l'index (lmdb doit être installé).
+"""
+
+import os
+import re
+import bz2
+import gzip
+import json
+import logging
+import threading
+from typing import Optional, Tuple
+
+try:
+    import lmdb
+    LMDB_AVAILABLE = True
+except ImportError:
+    LMDB_AVAILABLE = False
+
+from config import WIKIDATA_LITE_PATH
+
+logger = logging.getLogger(__name__)
+
+# Sous-bases de l'index: label/alias anglais (casefold) -> QID, QID -> titre enwiki
+LABEL_DB = b"labels"
+SITELINK_DB = b"sitelinks"
+
+# Taille maximale de l'index (espace d'adressage réservé, pas d'espace disque)
+MAP_SIZE = 1 << 34
+
+# Entités retenues: description ou titre Wikipedia mentionnant l'univers Tolkien
+_TOLKIEN_RE = re.compile(r"tolkien|middle-earth|silmarillion|lord of the rings|hobbit")
+
+_env = None
+_env_lock = threading.Lock()
+
+
+def _open_env():
+    """Ouvre l'index en lecture seule (None si indisponible)."""
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                if not (LMDB_AVAILABLE and WIKIDATA_LITE_PATH and os.path.exists(WIKIDATA_LITE_PATH)):
+                    _env = False
+                else:
+                    try:
+                        _env = lmdb.open(WIKIDATA_LITE_PATH, readonly=True, lock=False,
+                                         max_dbs=2, subdir=os.path.isdir(WIKIDATA_LITE_PATH))
+                    except lmdb.Error as e:
+                        logger.warning(f"Cannot open Wikidata index {WIKIDATA_LITE_PATH}: {e}")
+                        _env = False
+    return _env or None
+
+
+def is_available() -> bool:
+    """Indique si l'index hors ligne est configuré et lisible."""
+    return _open_env() is not None
+
+
+def lookup(label: str) -> Optional[Tuple[Optional[str], str]]:
+    """
+    Cherche une entité par son label anglais.
+    
+    Returns:
+        (titre Wikipedia ou None, QID), ou None si le label n'est pas indexé
+    """
+    env = _open_env()
+    if env is None:
+        return None
+    
+    with env.begin() as txn:
+        qid = txn.get(label.casefold().encode("utf-8"), db=env.open_db(LABEL_DB, txn=txn))
+        if qid is None:
+            return None
+        title = txn.get(qid, db=env.open_db(SITELINK_DB, txn=txn))
+    
+    return (title.decode("utf-8") if title else None), qid.decode("ascii")
+
+
+def _iter_dump(dump_path: str):
+    """Entités du dump JSON Wikidata (un objet par ligne dans un tableau)."""
+    if dump_path.endswith(".bz2"):
+        f = bz2.open(dump_path, "rt", encoding="utf-8")
+    elif dump_path.endswith(".gz"):
+        f = gzip.open(dump_path, "rt", encoding="utf-8")
+    else:
+        f = open(dump_path, "r", encoding="utf-8")
+    
+    with f:
+        for line in f:
+            line = line.strip().rstrip(",")
+            if not line or line in ("[", "]"):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def build_index(dump_path: str, env_path: str, verbose: bool = True) -> int:
+    """
+    Construit l'index LMDB à partir du dump JSON de Wikidata.
+    
+    Returns:
+        Nombre d'entités indexées
+    """
+    if not LMDB_AVAILABLE:
+        raise RuntimeError("lmdb is required to build the offline Wikidata index")
+    
+    env = lmdb.open(env_path, map_size=MAP_SIZE, max_dbs=2)
+    labels_db = env.open_db(LABEL_DB)
+    sitelinks_db = env.open_db(SITELINK_DB)
+    count = 0
+    
+    txn = env.begin(write=True)
+    try:
+        for entity in _iter_dump(dump_path):
+            description = entity.get("descriptions", {}).get("en", {}).get("value", "")
+            title = entity.get("sitelinks", {}).get("enwiki", {}).get("title", "")
+            if not _TOLKIEN_RE.search(f"{description} {title}".lower()):
+                continue
+            
+            qid = entity["id"].encode("ascii")
+            names = [entity.get("labels", {}).get("en", {}).get("value")]
+            names.extend(alias.get("value") for alias in entity.get("aliases", {}).get("en", []))
+            for name in names:
+                if name:
+                    # Premier arrivé conservé pour un label ambigu
+                    txn.put(name.casefold().encode("utf-8"), qid, db=labels_db, overwrite=False)
+            if title:
+                txn.put(qid, title.encode("utf-8"), db=sitelinks_db)
+            
+            count += 1
+            if count % 10000 == 0:
+                txn.commit()
+                txn = env.begin(write=True)
+                if verbose:
+                    print(f"  Indexed {count} entities")
+        txn.commit()
+    except BaseException:
+        txn.abort()
+        raise
+    finally:
+        env.close()
+    
+    if verbose:
+        print(f"Wikidata index: {count} entities -> {env_path}")
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) != 3:
+        print("Usage: python linking_offline.py <wikidata-dump.json[.bz2|.gz]> <index-path>")
+        sys.exit(1)
+    build_index(sys.argv[1], sys.argv[2])
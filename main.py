@@ -18,13 +18,14 @@ import sys
 import argparse
 
 from config import OUTPUT_DIR, CATEGORIES, FUSEKI_URL, FUSEKI_DATASET
-from builder import KGBuilder
-from ontology import create_ontology, create_shacl_shapes
 
 
 def cmd_build(args):
     """Construit le Knowledge Graph."""
-    builder = KGBuilder(output_dir=args.output, use_fuseki=not args.no_fuseki)
+    from builder import KGBuilder
+    
+    builder = KGBuilder(output_dir=args.output, use_fuseki=not args.no_fuseki,
+                        stream=args.stream)
     
     if args.categories:
         cats = [(c, 100) for c in args.categories]
@@ -78,20 +79,26 @@ def cmd_serve(args):
 
 def cmd_ontology(args):
     """Génère le fichier d'ontologie."""
+    from ontology import create_ontology, save_turtle_cached
+    
     os.makedirs(args.output, exist_ok=True)
-    onto = create_ontology()
     path = os.path.join(args.output, 'tolkien_ontology.ttl')
-    onto.serialize(destination=path, format='turtle')
-    print(f"Ontology saved: {path}")
+    if save_turtle_cached(create_ontology, path):
+        print(f"Ontology saved: {path}")
+    else:
+        print(f"Ontology up to date: {path}")
 
 
 def cmd_shapes(args):
     """Génère les shapes SHACL."""
+    from ontology import create_shacl_shapes, save_turtle_cached
+    
     os.makedirs(args.output, exist_ok=True)
-    shapes = create_shacl_shapes()
     path = os.path.join(args.output, 'tolkien_shapes.ttl')
-    shapes.serialize(destination=path, format='turtle')
-    print(f"SHACL shapes saved: {path}")
+    if save_turtle_cached(create_shacl_shapes, path):
+        print(f"SHACL shapes saved: {path}")
+    else:
+        print(f"SHACL shapes up to date: {path}")
 
 
 def cmd_fuseki_status(args):
@@ -122,6 +129,7 @@ def cmd_fuseki_status(args):
 def cmd_fuseki_load(args):
     """Charge un fichier RDF dans Fuseki."""
     from fuseki_client import FusekiClient
+    from builder import is_fresh
     
     fuseki = FusekiClient(FUSEKI_URL, FUSEKI_DATASET)
     
@@ -129,7 +137,14 @@ def cmd_fuseki_load(args):
         print(f"Error: Fuseki not available at {FUSEKI_URL}")
         sys.exit(1)
     
-    filepath = args.file or os.path.join(OUTPUT_DIR, "tolkien_kg.ttl")
+    filepath = args.file
+    if not filepath:
+        # La copie N-Triples écrite par le build se charge plus vite que le
+        # Turtle, si elle n'est pas plus ancienne (même règle que load_graph_file)
+        filepath = os.path.join(OUTPUT_DIR, "tolkien_kg.nt")
+        ttl_path = os.path.join(OUTPUT_DIR, "tolkien_kg.ttl")
+        if not is_fresh(filepath, ttl_path):
+            filepath = ttl_path
     
     if not os.path.exists(filepath):
         print(f"Error: File not found: {filepath}")
@@ -138,6 +153,8 @@ def cmd_fuseki_load(args):
     print(f"Loading {filepath} into Fuseki...")
     
     success = fuseki.load_file(filepath, clear_first=args.clear)
+    if success:
+        fuseki.materialize_link_flags()
     
     if success:
         count = fuseki.count_triples()
@@ -172,6 +189,23 @@ def cmd_fuseki_clear(args):
         sys.exit(1)
 
 
+def cmd_fuseki_flags(args):
+    """Ajoute les indicateurs METW/CSV à un dataset chargé avant qu'ils n'existent."""
+    from fuseki_client import FusekiClient
+    
+    fuseki = FusekiClient(FUSEKI_URL, FUSEKI_DATASET)
+    
+    if not fuseki.is_available():
+        print(f"Error: Fuseki not available at {FUSEKI_URL}")
+        sys.exit(1)
+    
+    if fuseki.materialize_link_flags():
+        print(f"Link flags materialized in {FUSEKI_DATASET}")
+    else:
+        print(f"Failed to materialize link flags")
+        sys.exit(1)
+
+
 def cmd_link(args):
     """Teste le linking dynamique pour une entité."""
     from linking import discover_external_links
@@ -226,59 +260,53 @@ def main():
     p_build.add_argument('--no-metw', action='store_true', help='Disable METW cards enrichment')
     p_build.add_argument('--no-multilingual', action='store_true', help='Disable multilingual labels (enabled by default)')
     p_build.add_argument('--no-fuseki', action='store_true', help='Do not load into Fuseki')
+    p_build.add_argument('--stream', action='store_true', help='Write page triples straight to tolkien_kg.nt (constant memory, no Turtle output)')
+    p_build.set_defaults(func=cmd_build)
     
     # serve
     p_serve = subparsers.add_parser('serve', help='Start the web server')
     p_serve.add_argument('--port', type=int, default=5000)
     p_serve.add_argument('--host', default='0.0.0.0')
+    p_serve.set_defaults(func=cmd_serve)
     
     # ontology
-    subparsers.add_parser('ontology', help='Generate ontology file')
+    subparsers.add_parser('ontology', help='Generate ontology file').set_defaults(func=cmd_ontology)
     
     # shapes
-    subparsers.add_parser('shapes', help='Generate SHACL shapes file')
+    subparsers.add_parser('shapes', help='Generate SHACL shapes file').set_defaults(func=cmd_shapes)
     
     # fuseki-status
-    subparsers.add_parser('fuseki-status', help='Check Fuseki triplestore status')
+    subparsers.add_parser('fuseki-status', help='Check Fuseki triplestore status').set_defaults(func=cmd_fuseki_status)
     
     # fuseki-load
     p_load = subparsers.add_parser('fuseki-load', help='Load RDF file into Fuseki')
-    p_load.add_argument('--file', help='Path to RDF file (default: output/tolkien_kg.ttl)')
+    p_load.add_argument('--file', help='Path to RDF file (default: output/tolkien_kg.nt, or .ttl if newer)')
     p_load.add_argument('--clear', action='store_true', help='Clear dataset before loading')
+    p_load.set_defaults(func=cmd_fuseki_load)
     
     # fuseki-clear
     p_clear = subparsers.add_parser('fuseki-clear', help='Clear Fuseki dataset')
     p_clear.add_argument('--yes', '-y', action='store_true', help='Skip confirmation')
+    p_clear.set_defaults(func=cmd_fuseki_clear)
+    
+    # fuseki-flags
+    subparsers.add_parser('fuseki-flags', help='Add METW/CSV link flags to a loaded dataset').set_defaults(func=cmd_fuseki_flags)
     
     # link
     p_link = subparsers.add_parser('link', help='Test dynamic linking for an entity')
     p_link.add_argument('entity', help='Entity name to link (e.g., "Gandalf")')
+    p_link.set_defaults(func=cmd_link)
     
     # export
     p_export = subparsers.add_parser('export', help='Export graph from Fuseki to file')
     p_export.add_argument('--output-file', help='Output file path')
     p_export.add_argument('--format', default='turtle', choices=['turtle', 'xml', 'nt'])
+    p_export.set_defaults(func=cmd_export)
     
     args = parser.parse_args()
     
-    if args.command == 'build':
-        cmd_build(args)
-    elif args.command == 'serve':
-        cmd_serve(args)
-    elif args.command == 'ontology':
-        cmd_ontology(args)
-    elif args.command == 'shapes':
-        cmd_shapes(args)
-    elif args.command == 'fuseki-status':
-        cmd_fuseki_status(args)
-    elif args.command == 'fuseki-load':
-        cmd_fuseki_load(args)
-    elif args.command == 'fuseki-clear':
-        cmd_fuseki_clear(args)
-    elif args.command == 'link':
-        cmd_link(args)
-    elif args.command == 'export':
-        cmd_export(args)
+    if hasattr(args, 'func'):
+        args.func(args)
     else:
         parser.print_help()
 
@@ -2,9 +2,15 @@
 Ontologie et shapes SHACL pour le Knowledge Graph Tolkien.
 """
 
+import os
+import hashlib
+from functools import lru_cache
+from typing import Callable
+
 from rdflib import Graph, Literal, URIRef, RDF, RDFS, XSD, Namespace
 from rdflib.namespace import OWL
 
+import config
 from config import TOLKIEN_ONTOLOGY, TOLKIEN_PROPERTY, SCHEMA, PREFIXES
 
 
@@ -15,156 +21,188 @@ def create_graph() -> Graph:
     return g
 
 
+@lru_cache(maxsize=1)
+def _ontology_triples() -> tuple:
+    """Triplets de l'ontologie, construits une seule fois (termes rdflib partagés)."""
+    return (
+        # Classes
+        (TOLKIEN_ONTOLOGY.Character, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.Character, RDFS.subClassOf, SCHEMA.Person),
+        (TOLKIEN_ONTOLOGY.Character, RDFS.label, Literal("Tolkien Character", lang="en")),
+        (TOLKIEN_ONTOLOGY.Character, RDFS.comment, Literal("A fictional character from Tolkien's legendarium", lang="en")),
+        
+        (TOLKIEN_ONTOLOGY.Location, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.Location, RDFS.subClassOf, SCHEMA.Place),
+        (TOLKIEN_ONTOLOGY.Location, RDFS.label, Literal("Tolkien Location", lang="en")),
+        
+        (TOLKIEN_ONTOLOGY.Artifact, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.Artifact, RDFS.subClassOf, SCHEMA.Thing),
+        (TOLKIEN_ONTOLOGY.Artifact, RDFS.label, Literal("Tolkien Artifact", lang="en")),
+        
+        (TOLKIEN_ONTOLOGY.Battle, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.Battle, RDFS.subClassOf, SCHEMA.Event),
+        (TOLKIEN_ONTOLOGY.Battle, RDFS.label, Literal("Battle", lang="en")),
+        
+        (TOLKIEN_ONTOLOGY.War, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.War, RDFS.subClassOf, SCHEMA.Event),
+        (TOLKIEN_ONTOLOGY.War, RDFS.label, Literal("War", lang="en")),
+        
+        (TOLKIEN_ONTOLOGY.Race, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.Race, RDFS.label, Literal("Race/People", lang="en")),
+        
+        # Properties
+        (TOLKIEN_ONTOLOGY.race, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_ONTOLOGY.race, RDFS.domain, TOLKIEN_ONTOLOGY.Character),
+        (TOLKIEN_ONTOLOGY.race, RDFS.range, TOLKIEN_ONTOLOGY.Race),
+        (TOLKIEN_ONTOLOGY.race, RDFS.label, Literal("race", lang="en")),
+        
+        (TOLKIEN_PROPERTY.father, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_PROPERTY.father, RDFS.subPropertyOf, SCHEMA.parent),
+        (TOLKIEN_PROPERTY.father, RDFS.label, Literal("father", lang="en")),
+        
+        (TOLKIEN_PROPERTY.mother, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_PROPERTY.mother, RDFS.subPropertyOf, SCHEMA.parent),
+        (TOLKIEN_PROPERTY.mother, RDFS.label, Literal("mother", lang="en")),
+        
+        (TOLKIEN_PROPERTY.realm, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_PROPERTY.realm, RDFS.domain, TOLKIEN_ONTOLOGY.Location),
+        (TOLKIEN_PROPERTY.realm, RDFS.label, Literal("realm", lang="en")),
+        
+        (TOLKIEN_PROPERTY.destroyedDate, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.destroyedDate, RDFS.label, Literal("destroyed date", lang="en")),
+        
+        (TOLKIEN_PROPERTY.result, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.result, RDFS.domain, SCHEMA.Event),
+        (TOLKIEN_PROPERTY.result, RDFS.label, Literal("result", lang="en")),
+        
+        (TOLKIEN_PROPERTY.objectType, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.objectType, RDFS.label, Literal("object type", lang="en")),
+        
+        (TOLKIEN_PROPERTY.ownedBy, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_PROPERTY.ownedBy, RDFS.label, Literal("owned by", lang="en")),
+        
+        (TOLKIEN_PROPERTY.raceLabel, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.raceLabel, RDFS.label, Literal("race label", lang="en")),
+        
+        # METW Card class
+        (TOLKIEN_ONTOLOGY.METWCard, RDF.type, OWL.Class),
+        (TOLKIEN_ONTOLOGY.METWCard, RDFS.label, Literal("METW Card", lang="en")),
+        (TOLKIEN_ONTOLOGY.METWCard, RDFS.comment, 
+         Literal("A card from Middle Earth: The Wizards collectible card game", lang="en")),
+        
+        # METW properties
+        (TOLKIEN_PROPERTY.metwCard, RDF.type, OWL.ObjectProperty),
+        (TOLKIEN_PROPERTY.metwCard, RDFS.label, Literal("METW card", lang="en")),
+        (TOLKIEN_PROPERTY.metwCard, RDFS.range, TOLKIEN_ONTOLOGY.METWCard),
+        
+        (TOLKIEN_PROPERTY.cardType, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.cardType, RDFS.label, Literal("card type", lang="en")),
+        
+        (TOLKIEN_PROPERTY.cardSet, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.cardSet, RDFS.label, Literal("card set", lang="en")),
+        
+        (TOLKIEN_PROPERTY.prowess, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.prowess, RDFS.label, Literal("prowess", lang="en")),
+        (TOLKIEN_PROPERTY.prowess, RDFS.range, XSD.integer),
+        
+        (TOLKIEN_PROPERTY.body, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.body, RDFS.label, Literal("body", lang="en")),
+        (TOLKIEN_PROPERTY.body, RDFS.range, XSD.integer),
+        
+        # CSV enrichment properties
+        (TOLKIEN_PROPERTY.hairColor, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.hairColor, RDFS.label, Literal("hair color", lang="en")),
+        
+        (TOLKIEN_PROPERTY.height, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.height, RDFS.label, Literal("height", lang="en")),
+        
+        # Indicateurs matérialisés pour les badges de l'interface
+        (TOLKIEN_PROPERTY.hasMetwCard, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.hasMetwCard, RDFS.label, Literal("has METW card", lang="en")),
+        (TOLKIEN_PROPERTY.hasMetwCard, RDFS.range, XSD.boolean),
+        
+        (TOLKIEN_PROPERTY.hasCsvData, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.hasCsvData, RDFS.label, Literal("has CSV data", lang="en")),
+        (TOLKIEN_PROPERTY.hasCsvData, RDFS.range, XSD.boolean),
+        
+        # Multilingual properties
+        (TOLKIEN_PROPERTY.translatedName, RDF.type, OWL.DatatypeProperty),
+        (TOLKIEN_PROPERTY.translatedName, RDFS.label, Literal("translated name", lang="en")),
+        (TOLKIEN_PROPERTY.translatedName, RDFS.comment, 
+         Literal("Name of the entity in a different language (from LOTR Fandom Wiki)", lang="en")),
+    )
+
+
 def create_ontology() -> Graph:
     onto = create_graph()
-    
-    # Classes
-    onto.add((TOLKIEN_ONTOLOGY.Character, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.Character, RDFS.subClassOf, SCHEMA.Person))
-    onto.add((TOLKIEN_ONTOLOGY.Character, RDFS.label, Literal("Tolkien Character", lang="en")))
-    onto.add((TOLKIEN_ONTOLOGY.Character, RDFS.comment, Literal("A fictional character from Tolkien's legendarium", lang="en")))
-    
-    onto.add((TOLKIEN_ONTOLOGY.Location, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.Location, RDFS.subClassOf, SCHEMA.Place))
-    onto.add((TOLKIEN_ONTOLOGY.Location, RDFS.label, Literal("Tolkien Location", lang="en")))
-    
-    onto.add((TOLKIEN_ONTOLOGY.Artifact, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.Artifact, RDFS.subClassOf, SCHEMA.Thing))
-    onto.add((TOLKIEN_ONTOLOGY.Artifact, RDFS.label, Literal("Tolkien Artifact", lang="en")))
-    
-    onto.add((TOLKIEN_ONTOLOGY.Battle, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.Battle, RDFS.subClassOf, SCHEMA.Event))
-    onto.add((TOLKIEN_ONTOLOGY.Battle, RDFS.label, Literal("Battle", lang="en")))
-    
-    onto.add((TOLKIEN_ONTOLOGY.War, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.War, RDFS.subClassOf, SCHEMA.Event))
-    onto.add((TOLKIEN_ONTOLOGY.War, RDFS.label, Literal("War", lang="en")))
-    
-    onto.add((TOLKIEN_ONTOLOGY.Race, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.Race, RDFS.label, Literal("Race/People", lang="en")))
-    
-    # Properties
-    onto.add((TOLKIEN_ONTOLOGY.race, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_ONTOLOGY.race, RDFS.domain, TOLKIEN_ONTOLOGY.Character))
-    onto.add((TOLKIEN_ONTOLOGY.race, RDFS.range, TOLKIEN_ONTOLOGY.Race))
-    onto.add((TOLKIEN_ONTOLOGY.race, RDFS.label, Literal("race", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.father, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_PROPERTY.father, RDFS.subPropertyOf, SCHEMA.parent))
-    onto.add((TOLKIEN_PROPERTY.father, RDFS.label, Literal("father", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.mother, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_PROPERTY.mother, RDFS.subPropertyOf, SCHEMA.parent))
-    onto.add((TOLKIEN_PROPERTY.mother, RDFS.label, Literal("mother", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.realm, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_PROPERTY.realm, RDFS.domain, TOLKIEN_ONTOLOGY.Location))
-    onto.add((TOLKIEN_PROPERTY.realm, RDFS.label, Literal("realm", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.destroyedDate, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.destroyedDate, RDFS.label, Literal("destroyed date", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.result, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.result, RDFS.domain, SCHEMA.Event))
-    onto.add((TOLKIEN_PROPERTY.result, RDFS.label, Literal("result", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.objectType, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.objectType, RDFS.label, Literal("object type", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.ownedBy, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_PROPERTY.ownedBy, RDFS.label, Literal("owned by", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.raceLabel, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.raceLabel, RDFS.label, Literal("race label", lang="en")))
-    
-    # METW Card class
-    onto.add((TOLKIEN_ONTOLOGY.METWCard, RDF.type, OWL.Class))
-    onto.add((TOLKIEN_ONTOLOGY.METWCard, RDFS.label, Literal("METW Card", lang="en")))
-    onto.add((TOLKIEN_ONTOLOGY.METWCard, RDFS.comment, 
-              Literal("A card from Middle Earth: The Wizards collectible card game", lang="en")))
-    
-    # METW properties
-    onto.add((TOLKIEN_PROPERTY.metwCard, RDF.type, OWL.ObjectProperty))
-    onto.add((TOLKIEN_PROPERTY.metwCard, RDFS.label, Literal("METW card", lang="en")))
-    onto.add((TOLKIEN_PROPERTY.metwCard, RDFS.range, TOLKIEN_ONTOLOGY.METWCard))
-    
-    onto.add((TOLKIEN_PROPERTY.cardType, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.cardType, RDFS.label, Literal("card type", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.cardSet, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.cardSet, RDFS.label, Literal("card set", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.prowess, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.prowess, RDFS.label, Literal("prowess", lang="en")))
-    onto.add((TOLKIEN_PROPERTY.prowess, RDFS.range, XSD.integer))
-    
-    onto.add((TOLKIEN_PROPERTY.body, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.body, RDFS.label, Literal("body", lang="en")))
-    onto.add((TOLKIEN_PROPERTY.body, RDFS.range, XSD.integer))
-    
-    # CSV enrichment properties
-    onto.add((TOLKIEN_PROPERTY.hairColor, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.hairColor, RDFS.label, Literal("hair color", lang="en")))
-    
-    onto.add((TOLKIEN_PROPERTY.height, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.height, RDFS.label, Literal("height", lang="en")))
-    
-    # Multilingual properties
-    onto.add((TOLKIEN_PROPERTY.translatedName, RDF.type, OWL.DatatypeProperty))
-    onto.add((TOLKIEN_PROPERTY.translatedName, RDFS.label, Literal("translated name", lang="en")))
-    onto.add((TOLKIEN_PROPERTY.translatedName, RDFS.comment, 
-              Literal("Name of the entity in a different language (from LOTR Fandom Wiki)", lang="en")))
-    
+    onto.addN((s, p, o, onto) for s, p, o in _ontology_triples())
     return onto
 
 
+SH = Namespace("http://www.w3.org/ns/shacl#")
+
+
+@lru_cache(maxsize=1)
+def _shape_triples() -> tuple:
+    """Triplets des shapes SHACL, construits une seule fois."""
+    min_one = Literal(1, datatype=XSD.integer)
+    triples = []
+    
+    # Une shape par classe, chacune exigeant au moins un rdfs:label
+    for shape, target_class, label in (
+        (TOLKIEN_ONTOLOGY.CharacterShape, TOLKIEN_ONTOLOGY.Character, "Shape for Tolkien Characters"),
+        (TOLKIEN_ONTOLOGY.LocationShape, TOLKIEN_ONTOLOGY.Location, "Shape for Tolkien Locations"),
+        (TOLKIEN_ONTOLOGY.ArtifactShape, TOLKIEN_ONTOLOGY.Artifact, "Shape for Tolkien Artifacts"),
+        (TOLKIEN_ONTOLOGY.EventShape, SCHEMA.Event, "Shape for Events"),
+    ):
+        label_shape = URIRef(str(shape) + "_label")
+        triples += [
+            (shape, RDF.type, SH.NodeShape),
+            (shape, SH.targetClass, target_class),
+            (shape, RDFS.label, Literal(label)),
+            (shape, SH.property, label_shape),
+            (label_shape, SH.path, RDFS.label),
+            (label_shape, SH.minCount, min_one),
+        ]
+    return tuple(triples)
+
+
 def create_shacl_shapes() -> Graph:
     shapes = create_graph()
-    SH = Namespace("http://www.w3.org/ns/shacl#")
     shapes.bind("sh", SH)
-    
-    # Character Shape
-    cs = TOLKIEN_ONTOLOGY.CharacterShape
-    shapes.add((cs, RDF.type, SH.NodeShape))
-    shapes.add((cs, SH.targetClass, TOLKIEN_ONTOLOGY.Character))
-    shapes.add((cs, RDFS.label, Literal("Shape for Tolkien Characters")))
-    
-    cs_label = URIRef(str(cs) + "_label")
-    shapes.add((cs, SH.property, cs_label))
-    shapes.add((cs_label, SH.path, RDFS.label))
-    shapes.add((cs_label, SH.minCount, Literal(1, datatype=XSD.integer)))
-    
-    # Location Shape
-    ls = TOLKIEN_ONTOLOGY.LocationShape
-    shapes.add((ls, RDF.type, SH.NodeShape))
-    shapes.add((ls, SH.targetClass, TOLKIEN_ONTOLOGY.Location))
-    shapes.add((ls, RDFS.label, Literal("Shape for Tolkien Locations")))
-    
-    ls_label = URIRef(str(ls) + "_label")
-    shapes.add((ls, SH.property, ls_label))
-    shapes.add((ls_label, SH.path, RDFS.label))
-    shapes.add((ls_label, SH.minCount, Literal(1, datatype=XSD.integer)))
-    
-    # Artifact Shape
-    as_ = TOLKIEN_ONTOLOGY.ArtifactShape
-    shapes.add((as_, RDF.type, SH.NodeShape))
-    shapes.add((as_, SH.targetClass, TOLKIEN_ONTOLOGY.Artifact))
-    shapes.add((as_, RDFS.label, Literal("Shape for Tolkien Artifacts")))
-    
-    as_label = URIRef(str(as_) + "_label")
-    shapes.add((as_, SH.property, as_label))
-    shapes.add((as_label, SH.path, RDFS.label))
-    shapes.add((as_label, SH.minCount, Literal(1, datatype=XSD.integer)))
-    
-    # Event Shape
-    es = TOLKIEN_ONTOLOGY.EventShape
-    shapes.add((es, RDF.type, SH.NodeShape))
-    shapes.add((es, SH.targetClass, SCHEMA.Event))
-    shapes.add((es, RDFS.label, Literal("Shape for Events")))
-    
-    es_label = URIRef(str(es) + "_label")
-    shapes.add((es, SH.property, es_label))
-    shapes.add((es_label, SH.path, RDFS.label))
-    shapes.add((es_label, SH.minCount, Literal(1, datatype=XSD.integer)))
-    
+    shapes.addN((s, p, o, shapes) for s, p, o in _shape_triples())
     return shapes
+
+
+@lru_cache(maxsize=1)
+def _sources_digest() -> str:
+    """Empreinte des sources qui déterminent l'ontologie et les shapes."""
+    h = hashlib.sha1()
+    for path in (__file__, config.__file__):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def save_turtle_cached(factory: Callable[[], Graph], path: str) -> bool:
+    """
+    Écrit en Turtle le graphe produit par factory, sauf si le fichier existant
+    a été généré à partir des mêmes sources (empreinte dans <path>.sha1).
+    
+    Returns:
+        True si le fichier a été (ré)écrit
+    """
+    digest = _sources_digest()
+    stamp_path = path + ".sha1"
+    if os.path.exists(path):
+        try:
+            with open(stamp_path, 'r', encoding='utf-8') as f:
+                if f.read().strip() == digest:
+                    return False
+        except OSError:
+            pass
+    
+    factory().serialize(destination=path, format='turtle')
+    with open(stamp_path, 'w', encoding='utf-8') as f:
+        f.write(digest)
+    return True
@@ -0,0 +1,34 @@
+"""
+Limitation de débit des appels aux APIs externes.
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Limiteur de débit à jetons, partageable entre threads.
+    Autorise `rate` requêtes/s en moyenne et des rafales jusqu'à `capacity`:
+    on n'attend que lorsque le budget est réellement dépassé (rate=None: illimité).
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Le jeton est réservé tout de suite (solde négatif) pour dormir hors du verrou
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
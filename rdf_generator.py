@@ -3,13 +3,21 @@ Generateur RDF pour les infobox Tolkien Gateway.
 Utilise le linking dynamique pour découvrir les liens externes.
 """
 
-from typing import Dict, Optional
-from rdflib import Graph, Literal, URIRef, RDF, RDFS, XSD
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from rdflib import Graph, Literal, URIRef, RDF, RDFS, XSD, plugin
+from rdflib.parser import Parser
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.plugin import PluginException
+from rdflib.serializer import Serializer
+from rdflib.term import Node
 from rdflib.namespace import OWL, FOAF
 
 from config import (
     TOLKIEN_RESOURCE, TOLKIEN_PAGE, TOLKIEN_ONTOLOGY, TOLKIEN_PROPERTY,
-    SCHEMA, PREFIXES, ENABLE_DYNAMIC_LINKING
+    SCHEMA, PREFIXES, ENABLE_DYNAMIC_LINKING, RDF_STORE
 )
 from wiki import (
     clean_wikitext, clean_entity_name, extract_internal_links,
@@ -17,220 +25,495 @@ from wiki import (
 )
 import mwparserfromhell
 
+logger = logging.getLogger(__name__)
+
+Triple = Tuple[Node, Node, Node]
+
 try:
-    from linking import discover_external_links
+    from linking import discover_external_links, discover_links_batch
     LINKING_AVAILABLE = True
 except ImportError:
     LINKING_AVAILABLE = False
     discover_external_links = None
+    discover_links_batch = None
 
 
-def create_graph() -> Graph:
+def _namespace_bindings() -> Tuple[Tuple[str, URIRef], ...]:
     g = Graph()
     for prefix, ns in PREFIXES.items():
         g.bind(prefix, ns)
+    return tuple(g.namespaces())
+
+
+# Préfixes d'un graphe (ceux de rdflib + PREFIXES), résolus une fois: les
+# écrire directement dans le store évite les vérifications de Graph.bind
+_NAMESPACE_BINDINGS = _namespace_bindings()
+
+
+def create_graph() -> Graph:
+    g = Graph(store=RDF_STORE, bind_namespaces="none")
+    for prefix, ns in _NAMESPACE_BINDINGS:
+        g.store.bind(prefix, ns)
     return g
 
 
-def extract_infobox(wikitext: str):
+@lru_cache(maxsize=None)
+def graph_format(fmt: str) -> str:
+    """
+    Format rdflib à utiliser pour lire ou écrire fmt ('nt', 'turtle') avec le
+    graphe de create_graph: le parseur/sérialiseur natif d'oxrdflib ('ox-nt')
+    quand le graphe est dans le store Oxigraph, sinon fmt lui-même.
+    """
+    if RDF_STORE != "Oxigraph":
+        return fmt
+    native = f"ox-{fmt}"
+    try:
+        plugin.get(native, Serializer)
+        plugin.get(native, Parser)
+    except PluginException:
+        return fmt
+    return native
+
+
+# Noms locaux sûrs pour un nom préfixé Turtle (sinon on garde <uri>)
+_PN_LOCAL_RE = re.compile(r"[A-Za-z0-9_](?:[A-Za-z0-9_.-]*[A-Za-z0-9_-])?$")
+
+
+def _turtle_term(term, nm, qnames: Dict[str, str]) -> str:
+    if not isinstance(term, URIRef):
+        return term.n3(nm)
+    text = qnames.get(term)
+    if text is None:
+        text = term.n3()
+        try:
+            prefix, _, local = nm.compute_qname(term, generate=False)
+            if _PN_LOCAL_RE.match(local):
+                text = f"{prefix}:{local}"
+        except Exception:
+            pass
+        qnames[term] = text
+    return text
+
+
+def write_turtle(graph: Graph, path: str):
+    """
+    Écrit le graphe en Turtle au fil de l'eau, sujet par sujet.
+    Évite de construire tout le document en mémoire comme le sérialiseur rdflib.
+    """
+    nm = graph.namespace_manager
+    qnames = {}
+    with open(path, "w", encoding="utf-8", buffering=1 << 20) as fh:
+        for prefix, ns in nm.namespaces():
+            fh.write(f"@prefix {prefix}: <{ns}> .\n")
+        for s in graph.subjects(unique=True):
+            fh.write(f"\n{_turtle_term(s, nm, qnames)}")
+            sep = ""
+            for p, o in sorted(graph.predicate_objects(s)):
+                fh.write(f"{sep}\n    {_turtle_term(p, nm, qnames)} {_turtle_term(o, nm, qnames)}")
+                sep = " ;"
+            fh.write(" .\n")
+
+
+# Lignes N-Triples regroupées par écriture (write_ntriples, iter_ntriples)
+NT_WRITE_CHUNK = 4096
+
+
+def iter_ntriples(triples: Iterable[Triple]) -> Iterator[Tuple[bytes, int]]:
+    """
+    Triplets en N-Triples (UTF-8), par blocs de NT_WRITE_CHUNK lignes
+    (mémoire bornée même pour un graphe entier): (bloc, nombre de lignes).
+    """
+    lines = []
+    for t in triples:
+        lines.append(_nt_row(t))
+        if len(lines) >= NT_WRITE_CHUNK:
+            yield "".join(lines).encode("utf-8"), len(lines)
+            lines = []
+    if lines:
+        yield "".join(lines).encode("utf-8"), len(lines)
+
+
+def write_ntriples(triples: Iterable[Triple], fh) -> int:
+    """
+    Ajoute des triplets en N-Triples à un fichier ouvert en binaire.
+    Retourne le nombre de lignes écrites.
+    """
+    count = 0
+    for block, n in iter_ntriples(triples):
+        fh.write(block)
+        count += n
+    return count
+
+
+def _find_infobox(wikitext: str) -> Tuple[Optional[object], str]:
+    """Infobox de la page et son nom normalisé (strip, minuscules), ou (None, "")."""
     if not wikitext:
-        return None
+        return None, ""
     try:
         wikicode = mwparserfromhell.parse(wikitext)
         for template in wikicode.filter_templates():
             template_name = str(template.name).strip().lower()
             # Reconnaître les infobox classiques ET les templates campaign/battle
             if "infobox" in template_name or template_name in ["campaign", "battle"]:
-                return template
+                return template, template_name
     except Exception:
         pass
-    return None
+    return None, ""
 
 
-def detect_type(infobox) -> str:
-    name = str(infobox.name).strip().lower()
-    # Templates spéciaux pour les conflits
-    if name == "campaign":
-        return "war"
-    if name == "battle":
-        return "battle"
+def extract_infobox(wikitext: str):
+    return _find_infobox(wikitext)[0]
+
+
+# Types reconnus dans le nom du template, par ordre de priorité
+_INFOBOX_TYPES = ("character", "place", "location", "object", "weapon", "artifact", "book", "event",
+                  "battle", "war", "conflict")
+# Templates spéciaux pour les conflits ("conflict" est traité comme "war")
+_SPECIAL_TYPES = {"campaign": "war", "battle": "battle"}
+
+
+@lru_cache(maxsize=1024)
+def _template_type(name: str) -> str:
+    # Peu de noms de templates distincts: le parcours est fait une fois par nom
+    special = _SPECIAL_TYPES.get(name)
+    if special:
+        return special
     # Infobox classiques
-    for t in ["character", "place", "location", "object", "weapon", "artifact", "book", "event", "battle", "war", "conflict"]:
+    for t in _INFOBOX_TYPES:
         if t in name:
-            # "conflict" est traité comme "war" ou "battle"
-            if t == "conflict":
-                return "war"
-            return t
+            return "war" if t == "conflict" else t
     return "unknown"
 
 
+def detect_type(infobox) -> str:
+    return _template_type(str(infobox.name).strip().lower())
+
+
 def get_params(infobox) -> Dict[str, str]:
-    params = {}
-    for p in infobox.params:
-        name = str(p.name).strip().lower()
-        value = str(p.value).strip()
-        if value:
-            params[name] = value
-    return params
+    # Valeur convertie une seule fois; le nom seulement pour les valeurs non vides
+    return {str(p.name).strip().lower(): value
+            for p in infobox.params if (value := str(p.value).strip())}
+
+
+class ParamView:
+    """
+    Paramètres non vides d'une infobox (comme get_params). La valeur de chaque
+    champ est parsée une seule fois: liens et texte nettoyé en sont dérivés
+    et mémorisés. Construite une fois par page avec le nom normalisé du
+    template (name, type) déjà calculé par _find_infobox.
+    """
+
+    # Une instance par page: pas de __dict__
+    __slots__ = ("name", "type", "_values", "_parsed", "_links", "_texts")
+
+    def __init__(self, infobox, name: Optional[str] = None):
+        self.name = str(infobox.name).strip().lower() if name is None else name
+        self.type = _template_type(self.name)
+        self._values = get_params(infobox)
+        self._parsed = {}
+        self._links = {}
+        self._texts = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def __getitem__(self, key: str) -> str:
+        return self._values[key]
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self._values.get(key, default)
+
+    def wikicode(self, key: str):
+        """Wikicode de la valeur du champ (parsé au premier accès)."""
+        code = self._parsed.get(key)
+        if code is None:
+            code = self._parsed[key] = mwparserfromhell.parse(self._values[key])
+        return code
+
+    def links(self, key: str) -> List[str]:
+        """Liens internes du champ."""
+        links = self._links.get(key)
+        if links is None:
+            links = self._links[key] = extract_internal_links(self.wikicode(key))
+        return links
+
+    def text(self, key: str) -> str:
+        """Texte nettoyé du champ (clean_wikitext)."""
+        text = self._texts.get(key)
+        if text is None:
+            text = self._texts[key] = clean_wikitext(self.wikicode(key))
+        return text
+
+    def date(self, key: str) -> str:
+        """Date nettoyée du champ (clean_date_field)."""
+        # La chaîne brute garde le raccourci sans balisage de clean_date_field
+        return clean_date_field(self._parsed.get(key) or self._values[key])
+
+
+# URIs par titre: les mêmes entités (races, parents, lieux) reviennent dans
+# les liens de nombreuses pages
+@lru_cache(maxsize=1 << 16)
+def _resource_uri(title: str) -> URIRef:
+    return TOLKIEN_RESOURCE[clean_entity_name(title)]
+
+
+@lru_cache(maxsize=1 << 16)
+def _page_uri(title: str) -> URIRef:
+    return TOLKIEN_PAGE[clean_entity_name(title)]
+
+
+@lru_cache(maxsize=1 << 16)
+def _wiki_page_url(title: str) -> URIRef:
+    return URIRef(f"https://tolkiengateway.net/wiki/{title.replace(' ', '_')}")
+
+
+# Champs d'infobox par groupe de types: (paramètres, prédicat, nature de la valeur).
+# Les paramètres d'une entrée sont traités chacun dans l'ordre s'ils sont présents
+# (sauf "first_text": uniquement le premier renseigné).
+INFOBOX_FIELDS = {
+    "character": (
+        (("name",), SCHEMA.name, "name"),
+        (("othernames",), SCHEMA.alternateName, "alt_names"),
+        (("gender",), SCHEMA.gender, "gender"),
+        (("race", "people"), TOLKIEN_ONTOLOGY.race, "race"),
+        (("birth",), SCHEMA.birthDate, "valid_date"),
+        (("birthlocation",), SCHEMA.birthPlace, "first_link"),
+        (("death",), SCHEMA.deathDate, "valid_date"),
+        (("deathlocation",), SCHEMA.deathPlace, "first_link"),
+        (("spouse",), SCHEMA.spouse, "links"),
+        (("children",), SCHEMA.children, "children"),
+        (("parentage",), SCHEMA.parent, "links"),
+        (("siblings",), SCHEMA.sibling, "links"),
+    ),
+    "place": (
+        (("name",), SCHEMA.name, "name"),
+        (("location",), SCHEMA.containedInPlace, "links"),
+        (("realm",), TOLKIEN_PROPERTY.realm, "links"),
+        (("founded",), SCHEMA.foundingDate, "date"),
+        (("destroyed",), TOLKIEN_PROPERTY.destroyedDate, "date"),
+        (("description",), SCHEMA.description, "text_en"),
+    ),
+    "object": (
+        (("name",), SCHEMA.name, "name"),
+        (("type",), TOLKIEN_PROPERTY.objectType, "literal"),
+        (("owner",), TOLKIEN_PROPERTY.ownedBy, "owner"),
+        (("creator", "maker"), SCHEMA.creator, "links"),
+    ),
+    "event": (
+        (("name",), SCHEMA.name, "name"),
+        (("date",), SCHEMA.startDate, "date"),
+        (("location",), SCHEMA.location, "links"),
+        (("result", "outcome"), TOLKIEN_PROPERTY.result, "first_text"),
+    ),
+}
+
+# Type d'infobox -> groupe de champs (les autres types sont traités comme des personnages)
+FIELD_GROUPS = {
+    "character": "character",
+    "place": "place", "location": "place",
+    "object": "object", "weapon": "object", "artifact": "object",
+    "event": "event", "battle": "event", "war": "event",
+}
+
+
+@lru_cache(maxsize=None)
+def _field_plan(group: str) -> tuple:
+    """
+    Table INFOBOX_FIELDS du groupe aplatie une fois, dans l'ordre: (clé,
+    prédicat, handler, ligne), où ligne identifie les clés d'une entrée
+    "first_text" (None pour les autres natures).
+    """
+    handlers = RDFGenerator._FIELD_HANDLERS
+    return tuple(
+        (key, predicate, handlers[kind], i if kind == "first_text" else None)
+        for i, (keys, predicate, kind) in enumerate(INFOBOX_FIELDS[group])
+        for key in keys
+    )
+
+
+# Termes des triplets de chaque page, résolus une fois (un accès à un
+# Namespace construit un nouveau URIRef)
+_TYPE = RDF.type
+_LABEL = RDFS.label
+_SEE_ALSO = RDFS.seeAlso
+_SAME_AS = OWL.sameAs
+_IS_PRIMARY_TOPIC_OF = FOAF.isPrimaryTopicOf
+_PRIMARY_TOPIC = FOAF.primaryTopic
+_DOCUMENT = FOAF.Document
+_URL = SCHEMA.url
+_IMAGE = SCHEMA.image
+_OWNS = SCHEMA.owns
+_RACE_LABEL = TOLKIEN_PROPERTY.raceLabel
+
+# Classes rdf:type de chaque type d'infobox (detect_type)
+_CHARACTER_CLASSES = (SCHEMA.Person, TOLKIEN_ONTOLOGY.Character)
+_LOCATION_CLASSES = (SCHEMA.Place, TOLKIEN_ONTOLOGY.Location)
+_ARTIFACT_CLASSES = (SCHEMA.Thing, TOLKIEN_ONTOLOGY.Artifact)
+_DEFAULT_CLASSES = (SCHEMA.Thing,)
+TYPE_CLASSES = {
+    "character": _CHARACTER_CLASSES,
+    "place": _LOCATION_CLASSES,
+    "location": _LOCATION_CLASSES,
+    "object": _ARTIFACT_CLASSES,
+    "weapon": _ARTIFACT_CLASSES,
+    "artifact": _ARTIFACT_CLASSES,
+    "book": (SCHEMA.Book,),
+    "event": (SCHEMA.Event,),
+    "battle": (SCHEMA.Event, TOLKIEN_ONTOLOGY.Battle),
+    "war": (SCHEMA.Event, TOLKIEN_ONTOLOGY.War),
+}
 
 
 class RDFGenerator:
-    def __init__(self):
-        self.graph = create_graph()
+    __slots__ = ("_triples", "_external_links_cache", "_image_urls", "_wiki")
+
+    def __init__(self, wiki_client=None):
+        # Triplets de la page en cours (pas de Graph intermédiaire par page)
+        self._triples = []
         # Cache pour les liens externes découverts
         self._external_links_cache = {}
+        # URLs directes des images résolues en lot (prefetch_images)
+        self._image_urls = {}
+        # Client Tolkien Gateway des requêtes d'images (None: client du processus)
+        self._wiki = wiki_client
 
     def reset(self):
-        self.graph = create_graph()
+        self._triples = []
 
     def uri(self, title: str) -> URIRef:
-        return TOLKIEN_RESOURCE[clean_entity_name(title)]
+        return _resource_uri(title)
 
     def page_uri(self, title: str) -> URIRef:
-        return TOLKIEN_PAGE[clean_entity_name(title)]
+        return _page_uri(title)
 
     def add_base(self, entity: URIRef, page: URIRef, title: str):
-        self.graph.add((entity, FOAF.isPrimaryTopicOf, page))
-        self.graph.add((page, FOAF.primaryTopic, entity))
-        self.graph.add((page, RDF.type, FOAF.Document))
-        self.graph.add((entity, RDFS.label, Literal(title, lang="en")))
-        wiki_url = f"https://tolkiengateway.net/wiki/{title.replace(' ', '_')}"
-        self.graph.add((page, SCHEMA.url, URIRef(wiki_url)))
-        self.graph.add((entity, RDFS.seeAlso, URIRef(wiki_url)))
+        self._triples.append((entity, _IS_PRIMARY_TOPIC_OF, page))
+        self._triples.append((page, _PRIMARY_TOPIC, entity))
+        self._triples.append((page, _TYPE, _DOCUMENT))
+        self._triples.append((entity, _LABEL, Literal(title, lang="en")))
+        wiki_url = _wiki_page_url(title)
+        self._triples.append((page, _URL, wiki_url))
+        self._triples.append((entity, _SEE_ALSO, wiki_url))
 
     def add_types(self, entity: URIRef, itype: str):
-        if itype == "character":
-            self.graph.add((entity, RDF.type, SCHEMA.Person))
-            self.graph.add((entity, RDF.type, TOLKIEN_ONTOLOGY.Character))
-        elif itype in ["place", "location"]:
-            self.graph.add((entity, RDF.type, SCHEMA.Place))
-            self.graph.add((entity, RDF.type, TOLKIEN_ONTOLOGY.Location))
-        elif itype in ["object", "weapon", "artifact"]:
-            self.graph.add((entity, RDF.type, SCHEMA.Thing))
-            self.graph.add((entity, RDF.type, TOLKIEN_ONTOLOGY.Artifact))
-        elif itype == "book":
-            self.graph.add((entity, RDF.type, SCHEMA.Book))
-        elif itype in ["event", "battle", "war"]:
-            self.graph.add((entity, RDF.type, SCHEMA.Event))
-            if itype == "battle":
-                self.graph.add((entity, RDF.type, TOLKIEN_ONTOLOGY.Battle))
-            elif itype == "war":
-                self.graph.add((entity, RDF.type, TOLKIEN_ONTOLOGY.War))
-        else:
-            self.graph.add((entity, RDF.type, SCHEMA.Thing))
-
-    def process_character(self, entity: URIRef, params: Dict[str, str]):
-        if "name" in params:
-            self.graph.add((entity, SCHEMA.name, Literal(clean_wikitext(params["name"]), lang="en")))
-        if "othernames" in params:
-            for n in split_on_br(params["othernames"]):
-                cn = clean_wikitext(n)
-                if cn and cn.lower() not in ["see below", ""]:
-                    self.graph.add((entity, SCHEMA.alternateName, Literal(cn)))
-        if "gender" in params:
-            g = clean_wikitext(params["gender"]).lower()
-            if g in ["male", "female"]:
-                self.graph.add((entity, SCHEMA.gender, Literal(g)))
-        for key in ["race", "people"]:
-            if key in params:
-                for link in extract_internal_links(params[key]):
-                    self.graph.add((entity, TOLKIEN_ONTOLOGY.race, self.uri(link)))
-                cr = clean_wikitext(params[key])
-                if cr:
-                    self.graph.add((entity, TOLKIEN_PROPERTY.raceLabel, Literal(cr)))
-        if "birth" in params:
-            b = clean_date_field(params["birth"])
-            if b and is_valid_date(b):
-                self.graph.add((entity, SCHEMA.birthDate, Literal(b)))
-        if "birthlocation" in params:
-            links = extract_internal_links(params["birthlocation"])
-            if links:
-                self.graph.add((entity, SCHEMA.birthPlace, self.uri(links[0])))
-        if "death" in params:
-            d = clean_date_field(params["death"])
-            if d and is_valid_date(d):
-                self.graph.add((entity, SCHEMA.deathDate, Literal(d)))
-        if "deathlocation" in params:
-            links = extract_internal_links(params["deathlocation"])
-            if links:
-                self.graph.add((entity, SCHEMA.deathPlace, self.uri(links[0])))
-        if "spouse" in params:
-            for link in extract_internal_links(params["spouse"]):
-                self.graph.add((entity, SCHEMA.spouse, self.uri(link)))
-        if "children" in params:
-            for link in extract_internal_links(params["children"]):
-                if link.lower() not in ["twins", "twin", "several", "many", "unknown", "none"]:
-                    self.graph.add((entity, SCHEMA.children, self.uri(link)))
-        if "parentage" in params:
-            for link in extract_internal_links(params["parentage"]):
-                self.graph.add((entity, SCHEMA.parent, self.uri(link)))
-        if "siblings" in params:
-            for link in extract_internal_links(params["siblings"]):
-                self.graph.add((entity, SCHEMA.sibling, self.uri(link)))
-
-    def process_place(self, entity: URIRef, params: Dict[str, str]):
-        if "name" in params:
-            self.graph.add((entity, SCHEMA.name, Literal(clean_wikitext(params["name"]), lang="en")))
-        if "location" in params:
-            for link in extract_internal_links(params["location"]):
-                self.graph.add((entity, SCHEMA.containedInPlace, self.uri(link)))
-        if "realm" in params:
-            for link in extract_internal_links(params["realm"]):
-                self.graph.add((entity, TOLKIEN_PROPERTY.realm, self.uri(link)))
-        if "founded" in params:
-            f = clean_date_field(params["founded"])
-            if f:
-                self.graph.add((entity, SCHEMA.foundingDate, Literal(f)))
-        if "destroyed" in params:
-            d = clean_date_field(params["destroyed"])
-            if d:
-                self.graph.add((entity, TOLKIEN_PROPERTY.destroyedDate, Literal(d)))
-        if "description" in params:
-            desc = clean_wikitext(params["description"])
-            if desc:
-                self.graph.add((entity, SCHEMA.description, Literal(desc, lang="en")))
-
-    def process_object(self, entity: URIRef, params: Dict[str, str]):
-        if "name" in params:
-            self.graph.add((entity, SCHEMA.name, Literal(clean_wikitext(params["name"]), lang="en")))
-        if "type" in params:
-            self.graph.add((entity, TOLKIEN_PROPERTY.objectType, Literal(clean_wikitext(params["type"]))))
-        if "owner" in params:
-            for link in extract_internal_links(params["owner"]):
-                owner = self.uri(link)
-                self.graph.add((owner, SCHEMA.owns, entity))
-                self.graph.add((entity, TOLKIEN_PROPERTY.ownedBy, owner))
-        for key in ["creator", "maker"]:
-            if key in params:
-                for link in extract_internal_links(params[key]):
-                    self.graph.add((entity, SCHEMA.creator, self.uri(link)))
-
-    def process_event(self, entity: URIRef, params: Dict[str, str]):
-        if "name" in params:
-            self.graph.add((entity, SCHEMA.name, Literal(clean_wikitext(params["name"]), lang="en")))
-        if "date" in params:
-            d = clean_date_field(params["date"])
-            if d:
-                self.graph.add((entity, SCHEMA.startDate, Literal(d)))
-        if "location" in params:
-            for link in extract_internal_links(params["location"]):
-                self.graph.add((entity, SCHEMA.location, self.uri(link)))
-        if "result" in params or "outcome" in params:
-            r = clean_wikitext(params.get("result") or params.get("outcome"))
-            if r:
-                self.graph.add((entity, TOLKIEN_PROPERTY.result, Literal(r)))
-
-    def process_image(self, entity: URIRef, params: Dict[str, str]):
+        for cls in TYPE_CLASSES.get(itype, _DEFAULT_CLASSES):
+            self._triples.append((entity, _TYPE, cls))
+
+    # Traitement d'un champ d'infobox selon sa nature (voir INFOBOX_FIELDS)
+
+    def _field_name(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        self._triples.append((entity, predicate, Literal(params.text(key), lang="en")))
+
+    def _field_literal(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        self._triples.append((entity, predicate, Literal(params.text(key))))
+
+    def _field_text(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        text = params.text(key)
+        if text:
+            self._triples.append((entity, predicate, Literal(text)))
+
+    def _field_text_en(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        text = params.text(key)
+        if text:
+            self._triples.append((entity, predicate, Literal(text, lang="en")))
+
+    def _field_alt_names(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        for n in split_on_br(params[key]):
+            cn = clean_wikitext(n)
+            if cn and cn.lower() not in ["see below", ""]:
+                self._triples.append((entity, predicate, Literal(cn)))
+
+    def _field_gender(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        g = params.text(key).lower()
+        if g in ["male", "female"]:
+            self._triples.append((entity, predicate, Literal(g)))
+
+    def _field_race(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        for link in params.links(key):
+            self._triples.append((entity, predicate, self.uri(link)))
+        cr = params.text(key)
+        if cr:
+            self._triples.append((entity, _RACE_LABEL, Literal(cr)))
+
+    def _field_date(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        d = params.date(key)
+        if d:
+            self._triples.append((entity, predicate, Literal(d)))
+
+    def _field_valid_date(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        d = params.date(key)
+        if d and is_valid_date(d):
+            self._triples.append((entity, predicate, Literal(d)))
+
+    def _field_first_link(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        links = params.links(key)
+        if links:
+            self._triples.append((entity, predicate, self.uri(links[0])))
+
+    def _field_links(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        for link in params.links(key):
+            self._triples.append((entity, predicate, self.uri(link)))
+
+    def _field_children(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        for link in params.links(key):
+            if link.lower() not in ["twins", "twin", "several", "many", "unknown", "none"]:
+                self._triples.append((entity, predicate, self.uri(link)))
+
+    def _field_owner(self, entity: URIRef, predicate: URIRef, params: "ParamView", key: str):
+        for link in params.links(key):
+            owner = self.uri(link)
+            self._triples.append((owner, _OWNS, entity))
+            self._triples.append((entity, predicate, owner))
+
+    _FIELD_HANDLERS = {
+        "name": _field_name,
+        "literal": _field_literal,
+        "text": _field_text,
+        "first_text": _field_text,
+        "text_en": _field_text_en,
+        "alt_names": _field_alt_names,
+        "gender": _field_gender,
+        "race": _field_race,
+        "date": _field_date,
+        "valid_date": _field_valid_date,
+        "first_link": _field_first_link,
+        "links": _field_links,
+        "children": _field_children,
+        "owner": _field_owner,
+    }
+
+    def process_fields(self, entity: URIRef, params: "ParamView", group: str):
+        """Applique la table INFOBOX_FIELDS du groupe aux paramètres de l'infobox."""
+        done = None
+        for key, predicate, handler, entry in _field_plan(group):
+            # "first_text": seul le premier paramètre renseigné de la ligne compte
+            if key in params and (entry is None or entry != done):
+                handler(self, entity, predicate, params, key)
+                done = entry
+
+    def process_character(self, entity: URIRef, params: "ParamView"):
+        self.process_fields(entity, params, "character")
+
+    def process_place(self, entity: URIRef, params: "ParamView"):
+        self.process_fields(entity, params, "place")
+
+    def process_object(self, entity: URIRef, params: "ParamView"):
+        self.process_fields(entity, params, "object")
+
+    def process_event(self, entity: URIRef, params: "ParamView"):
+        self.process_fields(entity, params, "event")
+
+    def process_image(self, entity: URIRef, params: "ParamView"):
         if "image" in params:
             # Essayer d'obtenir l'URL directe de l'image
-            from wiki import get_image_direct_url, WikiClient
+            from wiki import get_image_direct_url
             image_name = params["image"].strip()
             
-            # D'abord essayer l'URL directe
+            # D'abord essayer l'URL directe (déjà résolue par prefetch_images?)
             try:
-                direct_url = get_image_direct_url(image_name)
+                direct_url = self._image_urls.get(image_name) or get_image_direct_url(image_name, self._wiki)
                 if direct_url:
-                    self.graph.add((entity, SCHEMA.image, URIRef(direct_url)))
+                    self._triples.append((entity, _IMAGE, URIRef(direct_url)))
                     return
             except Exception:
                 pass
@@ -238,7 +521,7 @@ class RDFGenerator:
             # Fallback: URL de la page File
             url = build_image_url(image_name)
             if url:
-                self.graph.add((entity, SCHEMA.image, URIRef(url)))
+                self._triples.append((entity, _IMAGE, URIRef(url)))
 
     def add_external_links(self, entity: URIRef, name: str):
         """
@@ -248,7 +531,8 @@ class RDFGenerator:
         if not ENABLE_DYNAMIC_LINKING or not LINKING_AVAILABLE:
             return
         
-        # Vérifier le cache
+        # Cache du générateur (processus courant); les liens découverts sont en
+        # outre conservés sur disque d'un build à l'autre par linking.py (SQLite)
         if name in self._external_links_cache:
             links = self._external_links_cache[name]
         else:
@@ -264,38 +548,152 @@ class RDFGenerator:
         
         # Ajouter les liens découverts
         if "dbpedia" in links:
-            self.graph.add((entity, OWL.sameAs, URIRef(links["dbpedia"])))
+            self._triples.append((entity, _SAME_AS, URIRef(links["dbpedia"])))
         
         if "wikidata" in links:
-            self.graph.add((entity, OWL.sameAs, URIRef(links["wikidata"])))
+            self._triples.append((entity, _SAME_AS, URIRef(links["wikidata"])))
         
         if "yago" in links:
-            self.graph.add((entity, OWL.sameAs, URIRef(links["yago"])))
+            self._triples.append((entity, _SAME_AS, URIRef(links["yago"])))
         
         if "wikipedia" in links:
-            self.graph.add((entity, RDFS.seeAlso, URIRef(links["wikipedia"])))
+            self._triples.append((entity, _SEE_ALSO, URIRef(links["wikipedia"])))
+
+    def prefetch_links(self, names: List[str]):
+        """
+        Découvre en un lot les liens externes des entités pas encore en cache,
+        pour que add_external_links n'ait plus qu'à les relire.
+        """
+        if not ENABLE_DYNAMIC_LINKING or not LINKING_AVAILABLE:
+            return
+        todo = [name for name in dict.fromkeys(names) if name not in self._external_links_cache]
+        if not todo:
+            return
+        try:
+            found = discover_links_batch(todo, verbose=False)
+        except Exception as e:
+            logger.debug(f"External links batch failed: {e}")
+            return
+        for name in todo:
+            self._external_links_cache[name] = found.get(name, {})
+
+    def prefetch_images(self, views: List[ParamView]):
+        """
+        Résout en un lot (50 fichiers par requête) les URLs des images des
+        infobox, pour que process_image n'ait plus qu'à les relire.
+        """
+        from wiki import get_image_direct_urls
+        names = [view.get("image") for view in views]
+        todo = [name for name in dict.fromkeys(names) if name and name not in self._image_urls]
+        if not todo:
+            return
+        try:
+            self._image_urls.update(get_image_direct_urls(todo, self._wiki))
+        except Exception as e:
+            logger.debug(f"Image URLs batch failed: {e}")
+
+    def process_batch(self, items: List[Tuple[str, object]]) -> List[List[Triple]]:
+        """Génère les triplets de plusieurs pages (title, infobox), liens et images en un lot."""
+        views = [(title, ParamView(infobox)) for title, infobox in items]
+        self.prefetch_links([title for title, _ in views])
+        self.prefetch_images([view for _, view in views])
+        return [self.process_to_triples(title, view) for title, view in views]
 
-    def process(self, title: str, infobox) -> Graph:
+    def process(self, title: str, infobox, graph: Optional[Graph] = None) -> Graph:
+        """
+        Ajoute les triplets de la page à graph (graphe partagé entre les pages),
+        ou à un nouveau graphe si graph est None.
+        """
+        g = create_graph() if graph is None else graph
+        g.addN((s, p, o, g) for s, p, o in self.process_to_triples(title, infobox))
+        return g
+
+    def process_to_triples(self, title: str, infobox) -> List[Triple]:
+        """
+        Génère les triplets (sans doublon, dans l'ordre d'ajout) d'une page.
+        infobox: le template, ou sa ParamView si elle est déjà construite.
+        """
         self.reset()
         entity = self.uri(title)
         page = self.page_uri(title)
         self.add_base(entity, page, title)
-        itype = detect_type(infobox)
+        params = infobox if isinstance(infobox, ParamView) else ParamView(infobox)
+        itype = params.type
         self.add_types(entity, itype)
-        params = get_params(infobox)
-        if itype == "character":
-            self.process_character(entity, params)
-        elif itype in ["place", "location"]:
-            self.process_place(entity, params)
-        elif itype in ["object", "weapon", "artifact"]:
-            self.process_object(entity, params)
-        elif itype in ["event", "battle", "war"]:
-            self.process_event(entity, params)
-        else:
-            self.process_character(entity, params)
+        self.process_fields(entity, params, FIELD_GROUPS.get(itype, "character"))
         self.process_image(entity, params)
         
         # Découverte dynamique des liens externes
         self.add_external_links(entity, title)
         
-        return self.graph
+        return list(dict.fromkeys(self._triples))
+
+
+# Générateur propre à chaque processus de parsing (ses caches restent locaux)
+_worker_generator: Optional[RDFGenerator] = None
+
+
+def parse_and_generate(title: str, wikitext: Optional[str],
+                       generator: RDFGenerator = None) -> Tuple[Optional[List[Triple]], str]:
+    """
+    Extrait l'infobox d'une page et génère ses triplets.
+    Retourne (triplets, statut) avec statut "success", "no_page", "no_infobox" ou "error: ...".
+    """
+    global _worker_generator
+    if generator is None:
+        if _worker_generator is None:
+            _worker_generator = RDFGenerator()
+        generator = _worker_generator
+    try:
+        if not wikitext:
+            return None, "no_page"
+        infobox, name = _find_infobox(wikitext)
+        if not infobox:
+            return None, "no_infobox"
+        return generator.process_to_triples(title, ParamView(infobox, name)), "success"
+    except Exception as e:
+        logger.debug(f"Error for {title}: {e}")
+        return None, f"error: {str(e)[:50]}"
+
+
+def parse_pages(pages: List[Tuple[str, Optional[str]]],
+                generator: RDFGenerator = None) -> List[Tuple[Optional[List[Triple]], str]]:
+    """
+    Traite un lot de pages (title, wikitext); point d'entrée des processus de parsing.
+    Les infobox sont extraites d'abord, puis les liens externes et les images
+    des pages retenues résolus en un lot avant la génération des triplets.
+    """
+    global _worker_generator
+    if generator is None:
+        if _worker_generator is None:
+            _worker_generator = RDFGenerator()
+        generator = _worker_generator
+    
+    results = []
+    views = {}
+    for title, wikitext in pages:
+        try:
+            if not wikitext:
+                results.append((None, "no_page"))
+                continue
+            infobox, name = _find_infobox(wikitext)
+            if not infobox:
+                results.append((None, "no_infobox"))
+                continue
+            view = ParamView(infobox, name)
+        except Exception as e:
+            logger.debug(f"Error for {title}: {e}")
+            results.append((None, f"error: {str(e)[:50]}"))
+            continue
+        views[len(results)] = (title, view)
+        results.append(None)
+    
+    generator.prefetch_links([title for title, _ in views.values()])
+    generator.prefetch_images([view for _, view in views.values()])
+    for i, (title, view) in views.items():
+        try:
+            results[i] = generator.process_to_triples(title, view), "success"
+        except Exception as e:
+            logger.debug(f"Error for {title}: {e}")
+            results[i] = None, f"error: {str(e)[:50]}"
+    return results
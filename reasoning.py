@@ -2,8 +2,10 @@
 Module de raisonnement SPARQL pour le Knowledge Graph Tolkien.
 """
 
+import re
 from typing import List, Dict, Optional, Any
 from rdflib import Graph, URIRef
+from rdflib.plugins.sparql import prepareQuery
 
 # Préfixes SPARQL standards
 SPARQL_PREFIXES = """
@@ -19,85 +21,133 @@ PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
 """
 
 
-def get_all_classes_query(entity_uri: str) -> str:
-    """
-    Génère une requête SPARQL qui retourne toutes les classes d'une entité,
-    y compris les superclasses définies dans schema.org ou l'ontologie.
-    
-    Utilise rdfs:subClassOf* (property path) pour la transitivité.
-    """
-    return f"""{SPARQL_PREFIXES}
+# Corps des requêtes paramétrées par l'entité (?entity): compilées une fois
+# pour un graphe local, l'URI est substituée dans le texte pour Fuseki
+
+_ALL_CLASSES_QUERY = """
 SELECT DISTINCT ?class ?classLabel
-WHERE {{
+WHERE {
     # Classes directes de l'entité
-    <{entity_uri}> a ?directClass .
+    ?entity a ?directClass .
     
     # Superclasses via rdfs:subClassOf* (chemin transitif)
     ?directClass rdfs:subClassOf* ?class .
     
     # Label optionnel de la classe
-    OPTIONAL {{ ?class rdfs:label ?classLabel }}
-}}
+    OPTIONAL { ?class rdfs:label ?classLabel }
+}
 ORDER BY ?class
 """
 
 
-def get_entity_relations_with_sameas_query(entity_uri: str) -> str:
-    """
-    Génère une requête SPARQL qui retourne toutes les relations d'une entité,
-    EN PRENANT EN COMPTE les triplets owl:sameAs.
-    
-    Si X owl:sameAs Y, alors pour chaque triplet avec X comme sujet ou objet,
-    il existe un triplet équivalent avec Y.
-    """
-    return f"""{SPARQL_PREFIXES}
+_RELATIONS_WITH_SAMEAS_QUERY = """
 SELECT DISTINCT ?subject ?predicate ?object ?source
-WHERE {{
-    {{
+WHERE {
+    {
         # Relations directes sortantes
-        <{entity_uri}> ?predicate ?object .
-        BIND(<{entity_uri}> AS ?subject)
+        ?entity ?predicate ?object .
+        BIND(?entity AS ?subject)
         BIND("direct" AS ?source)
-    }}
+    }
     UNION
-    {{
+    {
         # Relations directes entrantes
-        ?subject ?predicate <{entity_uri}> .
-        BIND(<{entity_uri}> AS ?object)
+        ?subject ?predicate ?entity .
+        BIND(?entity AS ?object)
         BIND("direct" AS ?source)
-    }}
+    }
     UNION
-    {{
+    {
         # Relations via owl:sameAs (sortantes) - entité est sujet du sameAs
-        <{entity_uri}> owl:sameAs ?sameEntity .
+        ?entity owl:sameAs ?sameEntity .
         ?sameEntity ?predicate ?object .
         BIND(?sameEntity AS ?subject)
         BIND("sameAs-outgoing" AS ?source)
         FILTER(?predicate != owl:sameAs)
-    }}
+    }
     UNION
-    {{
+    {
         # Relations via owl:sameAs (entrantes) - entité est objet du sameAs
-        ?sameEntity owl:sameAs <{entity_uri}> .
+        ?sameEntity owl:sameAs ?entity .
         ?sameEntity ?predicate ?object .
         BIND(?sameEntity AS ?subject)
         BIND("sameAs-incoming" AS ?source)
         FILTER(?predicate != owl:sameAs)
-    }}
+    }
     UNION
-    {{
+    {
         # Relations où l'objet est équivalent à l'entité
-        <{entity_uri}> owl:sameAs ?sameEntity .
+        ?entity owl:sameAs ?sameEntity .
         ?subject ?predicate ?sameEntity .
         BIND(?sameEntity AS ?object)
         BIND("sameAs-as-object" AS ?source)
         FILTER(?predicate != owl:sameAs)
-    }}
-}}
+    }
+}
 ORDER BY ?predicate
 """
 
 
+_RELATED_VIA_SAMEAS_QUERY = """
+SELECT DISTINCT ?relatedEntity ?predicate ?direction
+WHERE {
+    {
+        # Entités équivalentes
+        { ?entity owl:sameAs ?relatedEntity }
+        UNION
+        { ?relatedEntity owl:sameAs ?entity }
+        BIND(owl:sameAs AS ?predicate)
+        BIND("equivalent" AS ?direction)
+    }
+    UNION
+    {
+        # Entités liées via une entité équivalente
+        ?entity owl:sameAs ?same .
+        ?same ?pred ?relatedEntity .
+        FILTER(?pred != owl:sameAs)
+        FILTER(isIRI(?relatedEntity))
+        BIND(?pred AS ?predicate)
+        BIND("via-sameAs" AS ?direction)
+    }
+}
+"""
+
+
+_ENTITY_VAR_RE = re.compile(r"\?entity\b")
+
+
+def _bind_entity(query: str, entity_uri: str) -> str:
+    """Texte complet de la requête pour une entité (exécution distante)."""
+    return SPARQL_PREFIXES + _ENTITY_VAR_RE.sub(lambda m: f"<{entity_uri}>", query)
+
+
+_PREPARED = {
+    query: prepareQuery(SPARQL_PREFIXES + query)
+    for query in (_ALL_CLASSES_QUERY, _RELATIONS_WITH_SAMEAS_QUERY, _RELATED_VIA_SAMEAS_QUERY)
+}
+
+
+def get_all_classes_query(entity_uri: str) -> str:
+    """
+    Génère une requête SPARQL qui retourne toutes les classes d'une entité,
+    y compris les superclasses définies dans schema.org ou l'ontologie.
+    
+    Utilise rdfs:subClassOf* (property path) pour la transitivité.
+    """
+    return _bind_entity(_ALL_CLASSES_QUERY, entity_uri)
+
+
+def get_entity_relations_with_sameas_query(entity_uri: str) -> str:
+    """
+    Génère une requête SPARQL qui retourne toutes les relations d'une entité,
+    EN PRENANT EN COMPTE les triplets owl:sameAs.
+    
+    Si X owl:sameAs Y, alors pour chaque triplet avec X comme sujet ou objet,
+    il existe un triplet équivalent avec Y.
+    """
+    return _bind_entity(_RELATIONS_WITH_SAMEAS_QUERY, entity_uri)
+
+
 def get_entity_description_with_inference_query(entity_uri: str) -> str:
     """
     Génère une requête SPARQL CONSTRUCT qui retourne une description complète
@@ -161,29 +211,7 @@ def get_related_entities_via_sameas_query(entity_uri: str) -> str:
     """
     Trouve toutes les entités liées à travers owl:sameAs.
     """
-    return f"""{SPARQL_PREFIXES}
-SELECT DISTINCT ?relatedEntity ?predicate ?direction
-WHERE {{
-    {{
-        # Entités équivalentes
-        {{ <{entity_uri}> owl:sameAs ?relatedEntity }}
-        UNION
-        {{ ?relatedEntity owl:sameAs <{entity_uri}> }}
-        BIND(owl:sameAs AS ?predicate)
-        BIND("equivalent" AS ?direction)
-    }}
-    UNION
-    {{
-        # Entités liées via une entité équivalente
-        <{entity_uri}> owl:sameAs ?same .
-        ?same ?pred ?relatedEntity .
-        FILTER(?pred != owl:sameAs)
-        FILTER(isIRI(?relatedEntity))
-        BIND(?pred AS ?predicate)
-        BIND("via-sameAs" AS ?direction)
-    }}
-}}
-"""
+    return _bind_entity(_RELATED_VIA_SAMEAS_QUERY, entity_uri)
 
 
 def get_dbpedia_enrichment_query(entity_uri: str) -> str:
@@ -215,9 +243,28 @@ LIMIT 50
 # FONCTIONS D'EXÉCUTION DES REQUÊTES
 # =============================================================================
 
+def _run_entity_query(source, query: str, entity_uri: str) -> Optional[Dict[str, Any]]:
+    """
+    Exécute une requête paramétrée par l'entité sur un graphe rdflib local
+    (requête préparée, ?entity lié par initBindings) ou sur Fuseki (texte).
+    Le résultat suit le format JSON SPARQL dans les deux cas.
+    """
+    if not isinstance(source, Graph):
+        return source.query(_bind_entity(query, entity_uri))
+    
+    rows = source.query(_PREPARED[query], initBindings={"entity": URIRef(entity_uri)})
+    return {'results': {'bindings': [
+        {var: {'value': str(value)} for var, value in row.asdict().items()}
+        for row in rows
+    ]}}
+
+
 def execute_inference_query(fuseki_client, entity_uri: str) -> Dict[str, Any]:
     """
     Exécute une requête avec inférence et retourne les résultats structurés.
+    
+    fuseki_client peut aussi être un Graph rdflib local: les requêtes
+    préparées à l'import sont alors réutilisées sans re-parsing.
     """
     results = {
         'classes': [],
@@ -227,8 +274,7 @@ def execute_inference_query(fuseki_client, entity_uri: str) -> Dict[str, Any]:
     }
     
     # 1. Toutes les classes (y compris superclasses)
-    classes_query = get_all_classes_query(entity_uri)
-    classes_result = fuseki_client.query(classes_query)
+    classes_result = _run_entity_query(fuseki_client, _ALL_CLASSES_QUERY, entity_uri)
     
     if classes_result and 'results' in classes_result:
         for binding in classes_result['results']['bindings']:
@@ -240,8 +286,7 @@ def execute_inference_query(fuseki_client, entity_uri: str) -> Dict[str, Any]:
             })
     
     # 2. Relations avec owl:sameAs
-    relations_query = get_entity_relations_with_sameas_query(entity_uri)
-    relations_result = fuseki_client.query(relations_query)
+    relations_result = _run_entity_query(fuseki_client, _RELATIONS_WITH_SAMEAS_QUERY, entity_uri)
     
     if relations_result and 'results' in relations_result:
         for binding in relations_result['results']['bindings']:
@@ -253,8 +298,7 @@ def execute_inference_query(fuseki_client, entity_uri: str) -> Dict[str, Any]:
             })
     
     # 3. Entités équivalentes via sameAs
-    sameas_query = get_related_entities_via_sameas_query(entity_uri)
-    sameas_result = fuseki_client.query(sameas_query)
+    sameas_result = _run_entity_query(fuseki_client, _RELATED_VIA_SAMEAS_QUERY, entity_uri)
     
     if sameas_result and 'results' in sameas_result:
         for binding in sameas_result['results']['bindings']:
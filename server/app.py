@@ -3,11 +3,14 @@ Serveur Linked Data pour le Knowledge Graph Tolkien.
 Intègre Apache Jena Fuseki comme triplestore.
 """
 
+import io
 import os
 import sys
 import json
 import queue
+import hashlib
 import threading
+from functools import lru_cache
 from urllib.parse import unquote
 from typing import Tuple, Optional, List, Dict
 
@@ -23,9 +26,9 @@ from config import (
     OUTPUT_DIR, CATEGORIES, FUSEKI_URL, FUSEKI_DATASET, STORAGE_MODE
 )
 from ontology import create_ontology
-from builder import KGBuilder
-from rdf_generator import create_graph
-from fuseki_client import FusekiClient, get_fuseki_client
+from builder import KGBuilder, load_graph_file
+from rdf_generator import create_graph, iter_ntriples
+from fuseki_client import FusekiClient, get_fuseki_client, TEXT_PREFIX, TEXT_SEARCH_CANDIDATES, text_query_pattern, _sparql_string
 
 app = Flask(__name__)
 
@@ -37,6 +40,12 @@ _fuseki: Optional[FusekiClient] = None
 _fallback_graph: Optional[Graph] = None
 _use_fuseki: bool = True
 
+# Index de recherche du mode fichier: (label en minuscules, URI, label, type affiché)
+_label_index: Optional[List[Tuple[str, str, str, Optional[str]]]] = None
+_label_index_lock = threading.Lock()
+# Statistiques de la page d'accueil en mode fichier
+_stats_cache: Optional[Dict[str, int]] = None
+
 # Queue pour la progression du build (par session)
 _build_progress_queues: Dict[str, queue.Queue] = {}
 # Flags d'annulation par session
@@ -59,6 +68,8 @@ def check_fuseki_available() -> bool:
         _use_fuseki = fuseki.is_available()
         if _use_fuseki:
             print(f"✓ Fuseki triplestore available at {FUSEKI_URL}/{FUSEKI_DATASET}")
+            if fuseki.detect_text_index():
+                print("✓ Jena text index available for search")
         else:
             print(f"✗ Fuseki not available, using file-based storage")
         return _use_fuseki
@@ -77,19 +88,93 @@ def get_graph() -> Graph:
         return create_graph()
     else:
         if _fallback_graph is None:
-            _fallback_graph = create_graph()
-            if os.path.exists(GRAPH_FILE):
-                _fallback_graph.parse(GRAPH_FILE, format='turtle')
+            # Store Oxigraph (indexé) si oxrdflib est installé, ou HDT s'il existe
+            # un .hdt du graphe: parcours des triplets hors de Python
+            try:
+                _fallback_graph, _ = load_graph_file(GRAPH_FILE)
+            except FileNotFoundError:
+                _fallback_graph = create_graph()
         return _fallback_graph
 
 
 def reload_graph():
     """Recharge le graphe."""
-    global _fallback_graph
+    global _fallback_graph, _label_index, _stats_cache
     _fallback_graph = None
+    _label_index = None
+    _stats_cache = None
     return get_graph()
 
 
+def get_file_stats() -> Dict[str, int]:
+    """Comptages de la page d'accueil en mode fichier (calculés une fois par graphe)."""
+    global _stats_cache
+    if _stats_cache is None:
+        g = get_graph()
+        _stats_cache = {
+            'total': len(g),
+            'Character': sum(1 for _ in g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character)),
+            'Location': sum(1 for _ in g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Location)),
+            'Artifact': sum(1 for _ in g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Artifact)),
+            'Event': sum(1 for _ in g.subjects(RDF.type, SCHEMA.Event)),
+        }
+    return _stats_cache
+
+
+# Types des entités proposées par la recherche
+SEARCH_TYPES = frozenset(str(t) for t in (
+    TOLKIEN_ONTOLOGY.Character, TOLKIEN_ONTOLOGY.Location,
+    TOLKIEN_ONTOLOGY.Artifact, TOLKIEN_ONTOLOGY.Battle,
+    TOLKIEN_ONTOLOGY.War, SCHEMA.Event,
+    SCHEMA.Person, SCHEMA.Place
+))
+
+
+def search_entity_type(type_uris: List[str]) -> Optional[str]:
+    """Type affiché d'une entité (le dernier type reconnu l'emporte)."""
+    etype = None
+    for ts in type_uris:
+        if "Character" in ts or "Person" in ts:
+            etype = "character"
+        elif "Location" in ts or "Place" in ts:
+            etype = "location"
+        elif "Artifact" in ts:
+            etype = "artifact"
+        elif "Event" in ts or "Battle" in ts or "War" in ts:
+            etype = "event"
+    return etype
+
+
+def get_label_index() -> List[Tuple[str, str, str, Optional[str]]]:
+    """
+    Index des labels du graphe fichier, construit en un parcours au premier appel.
+    
+    Seules les entités d'un type de SEARCH_TYPES y figurent, dans l'ordre de leur
+    premier label, leurs labels à la suite.
+    """
+    global _label_index
+    if _label_index is None:
+        with _label_index_lock:
+            if _label_index is None:
+                g = get_graph()
+                index = []
+                seen = set()
+                for uri in g.subjects(predicate=RDFS.label):
+                    if uri in seen:
+                        continue
+                    seen.add(uri)
+                    type_uris = [str(t) for t in g.objects(uri, RDF.type)]
+                    if SEARCH_TYPES.isdisjoint(type_uris):
+                        continue
+                    uri_str = sys.intern(str(uri))
+                    etype = search_entity_type(type_uris)
+                    for lbl in g.objects(uri, RDFS.label):
+                        label = str(lbl)
+                        index.append((label.lower(), uri_str, label, etype))
+                _label_index = index
+    return _label_index
+
+
 def get_entity_data_fuseki(uri: URIRef) -> Graph:
     """Récupère les données d'une entité depuis Fuseki."""
     fuseki = get_fuseki()
@@ -114,71 +199,95 @@ def get_entity_data(uri: URIRef) -> Graph:
     return get_entity_data_file(uri)
 
 
-def get_entity_external_links_fuseki(entity_uri: str) -> List[Dict]:
-    """Récupère les liens externes d'une entité depuis Fuseki."""
-    fuseki = get_fuseki()
-    links = []
-    seen_types = set()  # Éviter les doublons par type
+def classify_external_link(link_uri: str) -> str:
+    """Type d'un lien externe d'après son URI ("" si non reconnu)."""
+    # Ordre important : fandom avant wiki pour éviter confusion
+    if "lotr.fandom.com" in link_uri or "fandom.com/wiki" in link_uri:
+        return "fandom"
+    elif "dbpedia.org" in link_uri:
+        return "dbpedia"
+    elif "wikidata.org" in link_uri:
+        return "wikidata"
+    elif "yago-knowledge.org" in link_uri:
+        return "yago"
+    elif "wikipedia.org" in link_uri:
+        return "wikipedia"
+    elif "tolkiengateway.net" in link_uri:
+        return "tgw"  # Tolkien Gateway - on ne l'affiche pas comme externe
+    return ""
+
+
+def get_entity_external_links_bulk_fuseki(uris: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Récupère les liens externes de plusieurs entités en une seule requête Fuseki.
+    
+    Les branches UNION (plutôt que des OPTIONAL) évitent le produit cartésien
+    des liens d'une même entité; cartes METW et données CSV sont lues sur les
+    indicateurs tprop:hasMetwCard / tprop:hasCsvData (une ligne par entité).
     
+    Returns:
+        {URI de l'entité: liste de liens}, une entrée pour chaque URI demandée
+    """
+    uris = list(dict.fromkeys(uris))
+    if not uris:
+        return {}
+    
+    values = " ".join(f"<{uri}>" for uri in uris)
     query = f"""
-    SELECT ?link ?type WHERE {{
-        {{
-            <{entity_uri}> owl:sameAs ?link .
-            BIND("sameAs" AS ?type)
-        }}
+    SELECT DISTINCT ?e ?link ?type WHERE {{
+        VALUES ?e {{ {values} }}
+        {{ ?e owl:sameAs ?link . BIND("sameAs" AS ?type) }}
+        UNION
+        {{ ?e rdfs:seeAlso ?link . BIND("seeAlso" AS ?type) }}
         UNION
-        {{
-            <{entity_uri}> rdfs:seeAlso ?link .
-            BIND("seeAlso" AS ?type)
-        }}
+        {{ ?e tprop:hasMetwCard true . BIND("metw" AS ?type) }}
+        UNION
+        {{ ?e tprop:hasCsvData true . BIND("csv" AS ?type) }}
     }}
     """
     
-    results = fuseki.query(query)
+    found = {uri: ([], set()) for uri in uris}  # URI -> (liens, types vus)
+    flags = {uri: set() for uri in uris}  # URI -> {"metw", "csv"}
+    results = get_fuseki().query(query)
     if results and "results" in results:
         for binding in results["results"]["bindings"]:
+            entity_uri = binding.get('e', {}).get('value', '')
+            if entity_uri not in found:
+                continue
+            kind = binding.get('type', {}).get('value', '')
+            if kind in ("metw", "csv"):
+                flags[entity_uri].add(kind)
+                continue
             link_uri = binding.get('link', {}).get('value', '')
             if link_uri:
-                link_type = ""
-                # Ordre important : fandom avant wiki pour éviter confusion
-                if "lotr.fandom.com" in link_uri or "fandom.com/wiki" in link_uri:
-                    link_type = "fandom"
-                elif "dbpedia.org" in link_uri:
-                    link_type = "dbpedia"
-                elif "wikidata.org" in link_uri:
-                    link_type = "wikidata"
-                elif "yago-knowledge.org" in link_uri:
-                    link_type = "yago"
-                elif "wikipedia.org" in link_uri:
-                    link_type = "wikipedia"
-                elif "tolkiengateway.net" in link_uri:
-                    link_type = "tgw"  # Tolkien Gateway - on ne l'affiche pas comme externe
-                    continue
-                
+                link_type = classify_external_link(link_uri)
+                links, seen_types = found[entity_uri]
                 # Éviter les doublons (un seul lien par type)
-                if link_type and link_type not in seen_types:
+                if link_type and link_type != "tgw" and link_type not in seen_types:
                     seen_types.add(link_type)
                     links.append({'type': link_type, 'uri': link_uri})
     
-    # Vérifier si l'entité a une carte METW
-    metw_query = f"""
-    ASK {{ <{entity_uri}> tprop:metwCard ?card }}
-    """
-    metw_result = fuseki.query(metw_query)
-    if metw_result and metw_result.get('boolean', False):
-        if 'metw' not in seen_types:
+    # Carte METW puis données CSV (hairColor ou height), après les liens
+    for uri, (links, _) in found.items():
+        if "metw" in flags[uri]:
             links.append({'type': 'metw', 'uri': '#metw'})
-    
-    # Vérifier si l'entité a des données CSV (hairColor ou height)
-    csv_query = f"""
-    ASK {{ {{ <{entity_uri}> tprop:hairColor ?hc }} UNION {{ <{entity_uri}> tprop:height ?ht }} }}
-    """
-    csv_result = fuseki.query(csv_query)
-    if csv_result and csv_result.get('boolean', False):
-        if 'csv' not in seen_types:
+        if "csv" in flags[uri]:
             links.append({'type': 'csv', 'uri': '#csv'})
     
-    return links
+    return {uri: links for uri, (links, _) in found.items()}
+
+
+def get_entity_external_links_fuseki(entity_uri: str) -> List[Dict]:
+    """Récupère les liens externes d'une entité depuis Fuseki."""
+    return get_entity_external_links_bulk_fuseki([entity_uri]).get(entity_uri, [])
+
+
+def add_external_links_fuseki(entities: List[Dict]) -> List[Dict]:
+    """Renseigne 'external_links' pour chaque entité (une seule requête Fuseki)."""
+    links = get_entity_external_links_bulk_fuseki([entity['full_uri'] for entity in entities])
+    for entity in entities:
+        entity['external_links'] = links.get(entity['full_uri'], [])
+    return entities
 
 
 def get_entity_external_links_file(uri: URIRef) -> List[Dict]:
@@ -217,12 +326,13 @@ def get_entity_external_links_file(uri: URIRef) -> List[Dict]:
             links.append({'type': link_type, 'uri': ostr})
     
     # Vérifier si l'entité a une carte METW
-    if list(g.objects(uri, TOLKIEN_PROPERTY.metwCard)):
+    if next(g.objects(uri, TOLKIEN_PROPERTY.metwCard), None) is not None:
         if 'metw' not in seen_types:
             links.append({'type': 'metw', 'uri': '#metw'})
     
     # Vérifier si l'entité a des données CSV
-    has_csv = list(g.objects(uri, TOLKIEN_PROPERTY.hairColor)) or list(g.objects(uri, TOLKIEN_PROPERTY.height))
+    has_csv = (next(g.objects(uri, TOLKIEN_PROPERTY.hairColor), None) is not None
+               or next(g.objects(uri, TOLKIEN_PROPERTY.height), None) is not None)
     if has_csv:
         if 'csv' not in seen_types:
             links.append({'type': 'csv', 'uri': '#csv'})
@@ -258,6 +368,42 @@ def get_format() -> Tuple[str, str]:
     return 'turtle', 'text/turtle'
 
 
+# Types proposés par défaut sur la page d'accueil
+HOME_TYPES = [
+    ('tont:Character', 'Character'),
+    ('tont:Location', 'Location'),
+    ('tont:Artifact', 'Artifact'),
+    ('tont:Battle', 'Battle'),
+    ('tont:War', 'War')
+]
+
+
+def home_entities_query(types_to_fetch: List[Tuple[str, str]], filter_str: str = "") -> str:
+    """Requête unique de la page d'accueil: un sous-SELECT (LIMIT 50) par type."""
+    subqueries = [f"""
+                {{
+                    SELECT DISTINCT ?e ?label ("{type_label}" AS ?t)
+                    WHERE {{
+                        ?e a {type_uri} ;
+                           rdfs:label ?label .
+                        FILTER(lang(?label) = "en" || lang(?label) = "")
+                        {filter_str}
+                    }}
+                    LIMIT 50
+                }}""" for type_uri, type_label in types_to_fetch]
+    return "SELECT ?e ?label ?t WHERE {" + "\n                UNION".join(subqueries) + "\n            }"
+
+
+def prewarm_fuseki_cache():
+    """Remplit en tâche de fond le cache des requêtes de la page d'accueil sans filtre."""
+    def warm():
+        fuseki = get_fuseki()
+        fuseki.get_statistics()
+        fuseki.query(home_entities_query(HOME_TYPES))
+    
+    threading.Thread(target=warm, name="fuseki-prewarm", daemon=True).start()
+
+
 @app.route('/')
 def home():
     """Page d'accueil avec statistiques et Sample Entities filtrables."""
@@ -296,13 +442,7 @@ def home():
             types_to_fetch.append(('tont:War', 'War'))
     else:
         # Par défaut, tous les types
-        types_to_fetch = [
-            ('tont:Character', 'Character'),
-            ('tont:Location', 'Location'),
-            ('tont:Artifact', 'Artifact'),
-            ('tont:Battle', 'Battle'),
-            ('tont:War', 'War')
-        ]
+        types_to_fetch = HOME_TYPES
     
     if _use_fuseki:
         fuseki = get_fuseki()
@@ -319,11 +459,11 @@ def home():
         if filter_wikipedia:
             filter_clauses.append("EXISTS { ?e rdfs:seeAlso ?wp . FILTER(CONTAINS(STR(?wp), 'wikipedia.org')) }")
         if filter_metw:
-            filter_clauses.append("EXISTS { ?e tprop:metwCard ?card }")
+            filter_clauses.append("EXISTS { ?e tprop:hasMetwCard true }")
         if filter_fandom:
             filter_clauses.append("EXISTS { ?e rdfs:seeAlso ?fa . FILTER(CONTAINS(STR(?fa), 'fandom.com')) }")
         if filter_csv:
-            filter_clauses.append("EXISTS { { ?e tprop:hairColor ?hc } UNION { ?e tprop:height ?ht } }")
+            filter_clauses.append("EXISTS { ?e tprop:hasCsvData true }")
         
         filter_str = ""
         if filter_clauses:
@@ -331,49 +471,35 @@ def home():
         
         all_entities = []
         
-        # Requête pour chaque type sélectionné
-        for type_uri, type_label in types_to_fetch:
-            query = f"""
-                SELECT DISTINCT ?e ?label
-                WHERE {{
-                    ?e a {type_uri} ;
-                       rdfs:label ?label .
-                    FILTER(lang(?label) = "en" || lang(?label) = "")
-                    {filter_str}
-                }}
-                LIMIT 50
-            """
-            
-            results = fuseki.query(query)
-            
-            if results and "results" in results:
-                for binding in results["results"]["bindings"]:
-                    entity_uri = binding['e']['value']
-                    entity_data = {
-                        'uri': entity_uri.split('/')[-1],
-                        'full_uri': entity_uri,
-                        'label': binding['label']['value'],
-                        'type': type_label,
-                        'external_links': get_entity_external_links_fuseki(entity_uri)
-                    }
-                    all_entities.append(entity_data)
+        by_type = {type_label: [] for _, type_label in types_to_fetch}
+        results = fuseki.query(home_entities_query(types_to_fetch, filter_str))
+        if results and "results" in results:
+            for binding in results["results"]["bindings"]:
+                type_label = binding['t']['value']
+                if type_label not in by_type:
+                    continue
+                entity_uri = binding['e']['value']
+                by_type[type_label].append({
+                    'uri': entity_uri.split('/')[-1],
+                    'full_uri': entity_uri,
+                    'label': binding['label']['value'],
+                    'type': type_label
+                })
+        for type_entities in by_type.values():
+            all_entities.extend(type_entities)
         
-        # Randomiser et prendre 12
+        # Randomiser et prendre 12 (liens externes récupérés pour ces seules entités)
         if not has_filters:
             random.shuffle(all_entities)
-        entities = all_entities[:12]
+        entities = add_external_links_fuseki(all_entities[:12])
         
     else:
         g = get_graph()
-        stats = {
-            'total': len(g),
-            'Character': len(list(g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character))),
-            'Location': len(list(g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Location))),
-            'Artifact': len(list(g.subjects(RDF.type, TOLKIEN_ONTOLOGY.Artifact))),
-            'Event': len(list(g.subjects(RDF.type, SCHEMA.Event))),
-        }
+        stats = get_file_stats()
         
         all_entities = []
+        # Sans filtre de source, les liens externes ne servent qu'à l'affichage
+        filter_links = any([filter_dbpedia, filter_wikidata, filter_yago, filter_wikipedia, filter_metw, filter_fandom])
         
         # Mapping des types pour le mode fichier
         type_mapping = []
@@ -388,22 +514,24 @@ def home():
         
         for type_uri, type_label in type_mapping:
             for e in g.subjects(RDF.type, type_uri):
-                external_links = get_entity_external_links_file(e)
-                link_types = {link['type'] for link in external_links}
-                
-                # Appliquer les filtres de source
-                if filter_dbpedia and 'dbpedia' not in link_types:
-                    continue
-                if filter_wikidata and 'wikidata' not in link_types:
-                    continue
-                if filter_yago and 'yago' not in link_types:
-                    continue
-                if filter_wikipedia and 'wikipedia' not in link_types:
-                    continue
-                if filter_metw and 'metw' not in link_types:
-                    continue
-                if filter_fandom and 'fandom' not in link_types:
-                    continue
+                external_links = None
+                if filter_links:
+                    external_links = get_entity_external_links_file(e)
+                    link_types = {link['type'] for link in external_links}
+                    
+                    # Appliquer les filtres de source
+                    if filter_dbpedia and 'dbpedia' not in link_types:
+                        continue
+                    if filter_wikidata and 'wikidata' not in link_types:
+                        continue
+                    if filter_yago and 'yago' not in link_types:
+                        continue
+                    if filter_wikipedia and 'wikipedia' not in link_types:
+                        continue
+                    if filter_metw and 'metw' not in link_types:
+                        continue
+                    if filter_fandom and 'fandom' not in link_types:
+                        continue
                 
                 for lbl in g.objects(e, RDFS.label):
                     if not hasattr(lbl, 'language') or lbl.language in ['en', None, '']:
@@ -421,6 +549,9 @@ def home():
         if not has_filters:
             random.shuffle(all_entities)
         entities = all_entities[:12]
+        for entity in entities:
+            if entity['external_links'] is None:
+                entity['external_links'] = get_entity_external_links_file(URIRef(entity['full_uri']))
     
     # Passer les états des filtres au template
     filters = {
@@ -445,6 +576,31 @@ def home():
                            fuseki_url=f"{FUSEKI_URL}/{FUSEKI_DATASET}")
 
 
+def search_query_fuseki(query: str, text_index: bool = False) -> str:
+    """Requête de recherche Fuseki des entités d'un type connu dont un label contient query."""
+    prefix, text_clause = "", ""
+    if text_index:
+        # Préfiltre Lucene: labels ayant un mot qui commence par chaque mot de la
+        # recherche. Une sous-chaîne au milieu d'un mot ("dor" dans "Gondor")
+        # n'y figure pas: search() complète avec la requête sans l'index
+        prefix = TEXT_PREFIX
+        text_clause = text_query_pattern("?entity", query, TEXT_SEARCH_CANDIDATES)
+    
+    # FIX: Requête qui ne retourne que les entités avec un type connu
+    return prefix + f"""
+            SELECT DISTINCT ?entity (SAMPLE(?lbl) AS ?label) (SAMPLE(?t) AS ?type)
+            WHERE {{
+                {text_clause}
+                ?entity rdfs:label ?lbl ;
+                        a ?t .
+                FILTER(CONTAINS(LCASE(STR(?lbl)), LCASE({_sparql_string(query)})))
+                FILTER(?t IN (tont:Character, tont:Location, tont:Artifact, tont:Battle, tont:War, schema:Event, schema:Person, schema:Place))
+            }}
+            GROUP BY ?entity
+            LIMIT 100
+            """
+
+
 @app.route('/search')
 def search():
     """Recherche d'entités avec déduplication stricte."""
@@ -458,23 +614,18 @@ def search():
         if _use_fuseki:
             fuseki = get_fuseki()
             
-            # FIX: Requête qui ne retourne que les entités avec un type connu
-            search_query = f"""
-            SELECT DISTINCT ?entity (SAMPLE(?lbl) AS ?label) (SAMPLE(?t) AS ?type)
-            WHERE {{
-                ?entity rdfs:label ?lbl ;
-                        a ?t .
-                FILTER(CONTAINS(LCASE(STR(?lbl)), LCASE("{query.replace('"', '\\"')}")))
-                FILTER(?t IN (tont:Character, tont:Location, tont:Artifact, tont:Battle, tont:War, schema:Event, schema:Person, schema:Place))
-            }}
-            GROUP BY ?entity
-            LIMIT 100
-            """
+            # Index texte: ses résultats (mots commençant par la recherche) passent
+            # en tête; le parcours des labels ajoute les sous-chaînes internes à un mot
+            bindings = []
+            searches = [search_query_fuseki(query)]
+            if fuseki.text_index:
+                searches.insert(0, search_query_fuseki(query, text_index=True))
+            for sparql in searches:
+                search_results = fuseki.query(sparql)
+                bindings.extend((search_results or {}).get("results", {}).get("bindings", []))
             
-            search_results = fuseki.query(search_query)
-            
-            if search_results and "results" in search_results:
-                for binding in search_results["results"]["bindings"]:
+            if bindings:
+                for binding in bindings:
                     entity_uri = binding.get('entity', {}).get('value', '')
                     
                     # FIX: Déduplication stricte par URI
@@ -496,75 +647,123 @@ def search():
                     if type_filter and etype != type_filter:
                         continue
                     
-                    # Récupérer les liens externes pour cette entité
-                    external_links = get_entity_external_links_fuseki(entity_uri)
-                    
                     results.append({
                         'uri': entity_uri.split('/')[-1],
                         'full_uri': entity_uri,
                         'label': binding.get('label', {}).get('value', ''),
-                        'type': etype or 'other',
-                        'external_links': external_links
+                        'type': etype or 'other'
                     })
+                
+                # Liens externes des seuls résultats affichés, en une requête VALUES groupée
+                results = add_external_links_fuseki(results[:50])
         else:
-            g = get_graph()
             q_lower = query.lower()
             
-            # Types valides à rechercher
-            valid_types = {
-                str(TOLKIEN_ONTOLOGY.Character), str(TOLKIEN_ONTOLOGY.Location),
-                str(TOLKIEN_ONTOLOGY.Artifact), str(TOLKIEN_ONTOLOGY.Battle),
-                str(TOLKIEN_ONTOLOGY.War), str(SCHEMA.Event), 
-                str(SCHEMA.Person), str(SCHEMA.Place)
-            }
-            
-            for uri in g.subjects(predicate=RDFS.label):
-                uri_str = str(uri)
-                
-                # FIX: Déduplication stricte
-                if uri_str in seen_uris:
+            # Premier label correspondant de chaque entité, dans l'ordre de l'index
+            for label_lower, uri_str, label, etype in get_label_index():
+                if uri_str in seen_uris or q_lower not in label_lower:
                     continue
+                seen_uris.add(uri_str)
                 
-                # Vérifier si l'entité a un type valide
-                entity_types = list(g.objects(uri, RDF.type))
-                has_valid_type = any(str(t) in valid_types for t in entity_types)
-                
-                if not has_valid_type:
-                    continue  # Skip les entités sans type valide
+                if type_filter and etype != type_filter:
+                    continue
                 
-                for lbl in g.objects(uri, RDFS.label):
-                    if q_lower in str(lbl).lower():
-                        seen_uris.add(uri_str)
-                        
-                        etype = None
-                        for t in entity_types:
-                            ts = str(t)
-                            if "Character" in ts or "Person" in ts:
-                                etype = "character"
-                            elif "Location" in ts or "Place" in ts:
-                                etype = "location"
-                            elif "Artifact" in ts:
-                                etype = "artifact"
-                            elif "Event" in ts or "Battle" in ts or "War" in ts:
-                                etype = "event"
-                        
-                        if type_filter and etype != type_filter:
-                            break
-                        
-                        external_links = get_entity_external_links_file(uri)
-                        
-                        results.append({
-                            'uri': uri_str.split('/')[-1],
-                            'full_uri': uri_str,
-                            'label': str(lbl),
-                            'type': etype or 'other',
-                            'external_links': external_links
-                        })
-                        break
+                results.append({
+                    'uri': uri_str.split('/')[-1],
+                    'full_uri': uri_str,
+                    'label': label,
+                    'type': etype or 'other'
+                })
+                if len(results) == 50:
+                    break
+            
+            # Liens externes des seuls résultats affichés
+            for entity in results:
+                entity['external_links'] = get_entity_external_links_file(URIRef(entity['full_uri']))
     
     return render_template('search.html', query=query, type_filter=type_filter, results=results[:50])
 
 
+# Taille des blocs envoyés par stream_rdf pour les formats autres que N-Triples,
+# et nombre de blocs en attente au plus (client lent)
+RDF_STREAM_BUFFER = 64 * 1024
+RDF_STREAM_QUEUE = 8
+
+
+class _StreamCancelled(Exception):
+    """Le client de la réponse est parti: la sérialisation est abandonnée."""
+
+
+class _QueueWriter(io.RawIOBase):
+    """Flux binaire dont chaque écriture est déposée dans une queue bornée."""
+    
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self._chunks = chunks
+        self._cancelled = cancelled
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, b) -> int:
+        _put_chunk(self._chunks, bytes(b), self._cancelled)
+        return len(b)
+
+
+def _put_chunk(chunks: queue.Queue, item, cancelled: threading.Event):
+    """Dépose item dans la queue, en attendant de la place tant que le client est là."""
+    while True:
+        if cancelled.is_set():
+            raise _StreamCancelled()
+        try:
+            chunks.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def stream_rdf(graph: Graph, fmt: str):
+    """
+    Sérialisation du graphe (UTF-8) émise par blocs, au fil de l'écriture.
+    
+    Le N-Triples est produit triplet par triplet; les autres formats sont
+    sérialisés par rdflib dans un thread qui remplit une queue bornée de blocs
+    (au plus RDF_STREAM_QUEUE en mémoire) et s'arrête si le client se déconnecte.
+    """
+    if fmt == 'nt':
+        for block, _ in iter_ntriples(graph):
+            yield block
+        return
+    
+    chunks = queue.Queue(maxsize=RDF_STREAM_QUEUE)
+    cancelled = threading.Event()
+    
+    def serialize():
+        try:
+            with io.BufferedWriter(_QueueWriter(chunks, cancelled), buffer_size=RDF_STREAM_BUFFER) as out:
+                graph.serialize(destination=out, format=fmt, encoding='utf-8')
+            _put_chunk(chunks, None, cancelled)
+        except _StreamCancelled:
+            pass
+        except Exception as e:
+            try:
+                _put_chunk(chunks, e, cancelled)
+            except _StreamCancelled:
+                pass
+    
+    threading.Thread(target=serialize, name="rdf-stream", daemon=True).start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Fin normale, erreur ou déconnexion (GeneratorExit): libérer le thread
+        cancelled.set()
+
+
 @app.route('/resource/<path:name>')
 def resource(name):
     """Page d'une ressource/entité."""
@@ -719,10 +918,10 @@ def resource(name):
         )
     else:
         fmt, ctype = get_format()
-        rdf_content = data.serialize(format=fmt)
-        
         if wants_raw_rdf():
-            return Response(rdf_content, mimetype=ctype)
+            return Response(stream_with_context(stream_rdf(data, fmt)), mimetype=ctype)
+        
+        rdf_content = data.serialize(format=fmt)
         
         format_names = {'xml': 'RDF/XML', 'json-ld': 'JSON-LD', 'turtle': 'Turtle', 'nt': 'N-Triples'}
         format_keys = {'xml': 'rdfxml', 'json-ld': 'jsonld', 'turtle': 'turtle', 'nt': 'ntriples'}
@@ -742,16 +941,52 @@ def resource(name):
         )
 
 
+# L'ontologie est fixe pour un processus: sérialisée une fois par format
+ONTOLOGY_MAX_AGE = 3600
+
+
+@lru_cache(maxsize=None)
+def ontology_document(fmt: str) -> Tuple[bytes, str]:
+    """Ontologie sérialisée dans le format demandé (UTF-8) et son ETag."""
+    data = create_ontology().serialize(format=fmt, encoding='utf-8')
+    return data, hashlib.md5(data).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def ontology_page() -> Tuple[str, str]:
+    """Page HTML de l'ontologie (rendue à la première requête) et son ETag."""
+    html = render_template('ontology.html', turtle=ontology_document('turtle')[0].decode('utf-8'))
+    return html, hashlib.md5(html.encode('utf-8')).hexdigest()
+
+
+def reset_ontology_cache():
+    """Oublie les sérialisations de l'ontologie (recalculées à la prochaine requête)."""
+    ontology_document.cache_clear()
+    ontology_page.cache_clear()
+
+
 @app.route('/ontology')
 def ontology():
     """Page de l'ontologie."""
-    onto = create_ontology()
-    
     if wants_html():
-        return render_template('ontology.html', turtle=onto.serialize(format='turtle'))
+        body, etag = ontology_page()
+        response = Response(body, mimetype='text/html')
     else:
         fmt, ctype = get_format()
-        return Response(onto.serialize(format=fmt), mimetype=ctype)
+        body, etag = ontology_document(fmt)
+        response = Response(body, mimetype=ctype)
+    
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = ONTOLOGY_MAX_AGE
+    response.vary.add('Accept')
+    return response.make_conditional(request)
+
+
+@app.route('/ontology/reload', methods=['POST'])
+def ontology_reload():
+    reset_ontology_cache()
+    return {'status': 'success', 'message': 'Ontology cache cleared'}
 
 
 @app.route('/sparql', methods=['GET', 'POST'])
@@ -782,7 +1017,8 @@ LIMIT 20'''
     try:
         if _use_fuseki:
             fuseki = get_fuseki()
-            results = fuseki.query(query)
+            # Requêtes libres de la console: taille et déterminisme inconnus
+            results = fuseki.query(query, cache=False)
             
             if results:
                 accept = request.headers.get('Accept', '')
@@ -914,7 +1150,9 @@ def build_start():
             fuseki_success = False
             if _use_fuseki:
                 fuseki = get_fuseki()
-                fuseki_success = fuseki.load_graph(builder.graph, clear_first=True)
+                fuseki_success = fuseki.load_graph_parallel(builder.graph, clear_first=True)
+                if fuseki_success:
+                    fuseki.materialize_link_flags()
             
             reload_graph()
             
@@ -1024,6 +1262,7 @@ def fuseki_load():
     if os.path.exists(GRAPH_FILE):
         success = fuseki.load_file(GRAPH_FILE, clear_first=True)
         if success:
+            fuseki.materialize_link_flags()
             return {'status': 'success', 'message': f'Loaded {GRAPH_FILE} into Fuseki'}
         return {'error': 'Failed to load file into Fuseki'}, 500
     return {'error': f'Graph file not found: {GRAPH_FILE}'}, 404
@@ -1104,7 +1343,8 @@ def run(host='0.0.0.0', port=5000, debug=True):
     print(f"\n{'='*60}")
     print("TOLKIEN KNOWLEDGE GRAPH SERVER")
     print(f"{'='*60}")
-    check_fuseki_available()
+    if check_fuseki_available():
+        prewarm_fuseki_cache()
     print(f"\nStarting server on http://{host}:{port}")
     print(f"Storage mode: {'Fuseki triplestore' if _use_fuseki else 'File-based'}")
     print(f"{'='*60}\n")
@@ -27,163 +27,169 @@ def create_extended_shacl_shapes() -> Graph:
         shapes.bind(prefix, ns)
     shapes.bind("sh", SH)
     
+    # Triplets accumulés puis ajoutés en un seul addN
+    triples = []
+    add = triples.append
+    one = Literal(1, datatype=XSD.integer)
+    
     # character shape (basé sur Infobox character)
     cs = TOLKIEN_ONTOLOGY.CharacterShape
-    shapes.add((cs, RDF.type, SH.NodeShape))
-    shapes.add((cs, SH.targetClass, TOLKIEN_ONTOLOGY.Character))
-    shapes.add((cs, RDFS.label, Literal("Validation shape for Tolkien Characters")))
-    shapes.add((cs, RDFS.comment, Literal("Derived from Tolkien Gateway Infobox character template")))
+    add((cs, RDF.type, SH.NodeShape))
+    add((cs, SH.targetClass, TOLKIEN_ONTOLOGY.Character))
+    add((cs, RDFS.label, Literal("Validation shape for Tolkien Characters")))
+    add((cs, RDFS.comment, Literal("Derived from Tolkien Gateway Infobox character template")))
     
     # Propriété rdfs:label (obligatoire)
     cs_label = URIRef(str(cs) + "_label")
-    shapes.add((cs, SH.property, cs_label))
-    shapes.add((cs_label, SH.path, RDFS.label))
-    shapes.add((cs_label, SH.minCount, Literal(1, datatype=XSD.integer)))
-    shapes.add((cs_label, SH.datatype, RDF.langString))
-    shapes.add((cs_label, SH.name, Literal("Label")))
-    shapes.add((cs_label, SH.description, Literal("Character must have at least one label")))
+    add((cs, SH.property, cs_label))
+    add((cs_label, SH.path, RDFS.label))
+    add((cs_label, SH.minCount, one))
+    add((cs_label, SH.datatype, RDF.langString))
+    add((cs_label, SH.name, Literal("Label")))
+    add((cs_label, SH.description, Literal("Character must have at least one label")))
     
     # Propriété schema:name (optionnel)
     cs_name = URIRef(str(cs) + "_name")
-    shapes.add((cs, SH.property, cs_name))
-    shapes.add((cs_name, SH.path, SCHEMA.name))
-    shapes.add((cs_name, SH.maxCount, Literal(1, datatype=XSD.integer)))
-    shapes.add((cs_name, SH.datatype, RDF.langString))
+    add((cs, SH.property, cs_name))
+    add((cs_name, SH.path, SCHEMA.name))
+    add((cs_name, SH.maxCount, one))
+    add((cs_name, SH.datatype, RDF.langString))
     
     # Propriété schema:gender (optionnel, valeurs limitées)
     cs_gender = URIRef(str(cs) + "_gender")
-    shapes.add((cs, SH.property, cs_gender))
-    shapes.add((cs_gender, SH.path, SCHEMA.gender))
-    shapes.add((cs_gender, SH.maxCount, Literal(1, datatype=XSD.integer)))
-    shapes.add((cs_gender, SH["in"], URIRef(str(cs) + "_gender_values")))
+    add((cs, SH.property, cs_gender))
+    add((cs_gender, SH.path, SCHEMA.gender))
+    add((cs_gender, SH.maxCount, one))
+    add((cs_gender, SH["in"], URIRef(str(cs) + "_gender_values")))
     
     # Liste des valeurs autorisées pour gender
     gender_list = URIRef(str(cs) + "_gender_values")
-    shapes.add((gender_list, RDF.first, Literal("male")))
-    shapes.add((gender_list, RDF.rest, URIRef(str(cs) + "_gender_values_2")))
-    shapes.add((URIRef(str(cs) + "_gender_values_2"), RDF.first, Literal("female")))
-    shapes.add((URIRef(str(cs) + "_gender_values_2"), RDF.rest, RDF.nil))
+    add((gender_list, RDF.first, Literal("male")))
+    add((gender_list, RDF.rest, URIRef(str(cs) + "_gender_values_2")))
+    add((URIRef(str(cs) + "_gender_values_2"), RDF.first, Literal("female")))
+    add((URIRef(str(cs) + "_gender_values_2"), RDF.rest, RDF.nil))
     
     # Propriété tont:race (optionnel, doit être une URI)
     cs_race = URIRef(str(cs) + "_race")
-    shapes.add((cs, SH.property, cs_race))
-    shapes.add((cs_race, SH.path, TOLKIEN_ONTOLOGY.race))
-    shapes.add((cs_race, SH.nodeKind, SH.IRI))
+    add((cs, SH.property, cs_race))
+    add((cs_race, SH.path, TOLKIEN_ONTOLOGY.race))
+    add((cs_race, SH.nodeKind, SH.IRI))
     
     # Propriété schema:birthDate (optionnel)
     cs_birth = URIRef(str(cs) + "_birthDate")
-    shapes.add((cs, SH.property, cs_birth))
-    shapes.add((cs_birth, SH.path, SCHEMA.birthDate))
-    shapes.add((cs_birth, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((cs, SH.property, cs_birth))
+    add((cs_birth, SH.path, SCHEMA.birthDate))
+    add((cs_birth, SH.maxCount, one))
     
     # Propriété schema:deathDate (optionnel)
     cs_death = URIRef(str(cs) + "_deathDate")
-    shapes.add((cs, SH.property, cs_death))
-    shapes.add((cs_death, SH.path, SCHEMA.deathDate))
-    shapes.add((cs_death, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((cs, SH.property, cs_death))
+    add((cs_death, SH.path, SCHEMA.deathDate))
+    add((cs_death, SH.maxCount, one))
     
     # =========================================================================
     # LOCATION SHAPE (basé sur Infobox location)
     # =========================================================================
     ls = TOLKIEN_ONTOLOGY.LocationShape
-    shapes.add((ls, RDF.type, SH.NodeShape))
-    shapes.add((ls, SH.targetClass, TOLKIEN_ONTOLOGY.Location))
-    shapes.add((ls, RDFS.label, Literal("Validation shape for Tolkien Locations")))
+    add((ls, RDF.type, SH.NodeShape))
+    add((ls, SH.targetClass, TOLKIEN_ONTOLOGY.Location))
+    add((ls, RDFS.label, Literal("Validation shape for Tolkien Locations")))
     
     # Label obligatoire
     ls_label = URIRef(str(ls) + "_label")
-    shapes.add((ls, SH.property, ls_label))
-    shapes.add((ls_label, SH.path, RDFS.label))
-    shapes.add((ls_label, SH.minCount, Literal(1, datatype=XSD.integer)))
+    add((ls, SH.property, ls_label))
+    add((ls_label, SH.path, RDFS.label))
+    add((ls_label, SH.minCount, one))
     
     # Propriété schema:containedInPlace (optionnel, URI)
     ls_contained = URIRef(str(ls) + "_containedIn")
-    shapes.add((ls, SH.property, ls_contained))
-    shapes.add((ls_contained, SH.path, SCHEMA.containedInPlace))
-    shapes.add((ls_contained, SH.nodeKind, SH.IRI))
+    add((ls, SH.property, ls_contained))
+    add((ls_contained, SH.path, SCHEMA.containedInPlace))
+    add((ls_contained, SH.nodeKind, SH.IRI))
     
     # Propriété tprop:realm (optionnel, URI)
     ls_realm = URIRef(str(ls) + "_realm")
-    shapes.add((ls, SH.property, ls_realm))
-    shapes.add((ls_realm, SH.path, TOLKIEN_PROPERTY.realm))
-    shapes.add((ls_realm, SH.nodeKind, SH.IRI))
+    add((ls, SH.property, ls_realm))
+    add((ls_realm, SH.path, TOLKIEN_PROPERTY.realm))
+    add((ls_realm, SH.nodeKind, SH.IRI))
     
     # =========================================================================
     # ARTIFACT SHAPE (basé sur Infobox object)
     # =========================================================================
     as_ = TOLKIEN_ONTOLOGY.ArtifactShape
-    shapes.add((as_, RDF.type, SH.NodeShape))
-    shapes.add((as_, SH.targetClass, TOLKIEN_ONTOLOGY.Artifact))
-    shapes.add((as_, RDFS.label, Literal("Validation shape for Tolkien Artifacts")))
+    add((as_, RDF.type, SH.NodeShape))
+    add((as_, SH.targetClass, TOLKIEN_ONTOLOGY.Artifact))
+    add((as_, RDFS.label, Literal("Validation shape for Tolkien Artifacts")))
     
     # Label obligatoire
     as_label = URIRef(str(as_) + "_label")
-    shapes.add((as_, SH.property, as_label))
-    shapes.add((as_label, SH.path, RDFS.label))
-    shapes.add((as_label, SH.minCount, Literal(1, datatype=XSD.integer)))
+    add((as_, SH.property, as_label))
+    add((as_label, SH.path, RDFS.label))
+    add((as_label, SH.minCount, one))
     
     # Propriété tprop:objectType (optionnel)
     as_type = URIRef(str(as_) + "_objectType")
-    shapes.add((as_, SH.property, as_type))
-    shapes.add((as_type, SH.path, TOLKIEN_PROPERTY.objectType))
-    shapes.add((as_type, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((as_, SH.property, as_type))
+    add((as_type, SH.path, TOLKIEN_PROPERTY.objectType))
+    add((as_type, SH.maxCount, one))
     
     # Propriété schema:creator (optionnel, URI)
     as_creator = URIRef(str(as_) + "_creator")
-    shapes.add((as_, SH.property, as_creator))
-    shapes.add((as_creator, SH.path, SCHEMA.creator))
-    shapes.add((as_creator, SH.nodeKind, SH.IRI))
+    add((as_, SH.property, as_creator))
+    add((as_creator, SH.path, SCHEMA.creator))
+    add((as_creator, SH.nodeKind, SH.IRI))
     
     # EVENT SHAPE (basé sur Infobox battle/war)
     es = TOLKIEN_ONTOLOGY.EventShape
-    shapes.add((es, RDF.type, SH.NodeShape))
-    shapes.add((es, SH.targetClass, SCHEMA.Event))
-    shapes.add((es, RDFS.label, Literal("Validation shape for Events")))
+    add((es, RDF.type, SH.NodeShape))
+    add((es, SH.targetClass, SCHEMA.Event))
+    add((es, RDFS.label, Literal("Validation shape for Events")))
     
     # Label obligatoire
     es_label = URIRef(str(es) + "_label")
-    shapes.add((es, SH.property, es_label))
-    shapes.add((es_label, SH.path, RDFS.label))
-    shapes.add((es_label, SH.minCount, Literal(1, datatype=XSD.integer)))
+    add((es, SH.property, es_label))
+    add((es_label, SH.path, RDFS.label))
+    add((es_label, SH.minCount, one))
     
     # Propriété schema:startDate (optionnel)
     es_date = URIRef(str(es) + "_startDate")
-    shapes.add((es, SH.property, es_date))
-    shapes.add((es_date, SH.path, SCHEMA.startDate))
-    shapes.add((es_date, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((es, SH.property, es_date))
+    add((es_date, SH.path, SCHEMA.startDate))
+    add((es_date, SH.maxCount, one))
     
     # Propriété schema:location (optionnel, URI)
     es_location = URIRef(str(es) + "_location")
-    shapes.add((es, SH.property, es_location))
-    shapes.add((es_location, SH.path, SCHEMA.location))
-    shapes.add((es_location, SH.nodeKind, SH.IRI))
+    add((es, SH.property, es_location))
+    add((es_location, SH.path, SCHEMA.location))
+    add((es_location, SH.nodeKind, SH.IRI))
     
     # METW CARD SHAPE
     ms = TOLKIEN_ONTOLOGY.METWCardShape
-    shapes.add((ms, RDF.type, SH.NodeShape))
-    shapes.add((ms, SH.targetClass, TOLKIEN_ONTOLOGY.METWCard))
-    shapes.add((ms, RDFS.label, Literal("Validation shape for METW Cards")))
+    add((ms, RDF.type, SH.NodeShape))
+    add((ms, SH.targetClass, TOLKIEN_ONTOLOGY.METWCard))
+    add((ms, RDFS.label, Literal("Validation shape for METW Cards")))
     
     # Label obligatoire
     ms_label = URIRef(str(ms) + "_label")
-    shapes.add((ms, SH.property, ms_label))
-    shapes.add((ms_label, SH.path, RDFS.label))
-    shapes.add((ms_label, SH.minCount, Literal(1, datatype=XSD.integer)))
+    add((ms, SH.property, ms_label))
+    add((ms_label, SH.path, RDFS.label))
+    add((ms_label, SH.minCount, one))
     
     # Propriété tprop:prowess (optionnel, integer)
     ms_prowess = URIRef(str(ms) + "_prowess")
-    shapes.add((ms, SH.property, ms_prowess))
-    shapes.add((ms_prowess, SH.path, TOLKIEN_PROPERTY.prowess))
-    shapes.add((ms_prowess, SH.datatype, XSD.integer))
-    shapes.add((ms_prowess, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((ms, SH.property, ms_prowess))
+    add((ms_prowess, SH.path, TOLKIEN_PROPERTY.prowess))
+    add((ms_prowess, SH.datatype, XSD.integer))
+    add((ms_prowess, SH.maxCount, one))
     
     # Propriété tprop:body (optionnel, integer)
     ms_body = URIRef(str(ms) + "_body")
-    shapes.add((ms, SH.property, ms_body))
-    shapes.add((ms_body, SH.path, TOLKIEN_PROPERTY.body))
-    shapes.add((ms_body, SH.datatype, XSD.integer))
-    shapes.add((ms_body, SH.maxCount, Literal(1, datatype=XSD.integer)))
+    add((ms, SH.property, ms_body))
+    add((ms_body, SH.path, TOLKIEN_PROPERTY.body))
+    add((ms_body, SH.datatype, XSD.integer))
+    add((ms_body, SH.maxCount, one))
     
+    shapes.addN((s, p, o, shapes) for s, p, o in triples)
     return shapes
 
 
@@ -202,8 +208,7 @@ def validate_graph_simple(data_graph: Graph, shapes_graph: Graph = None) -> Tupl
     
     # Vérifier que chaque Character a un label
     for char in data_graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Character):
-        labels = list(data_graph.objects(char, RDFS.label))
-        if not labels:
+        if next(data_graph.objects(char, RDFS.label), None) is None:
             violations.append({
                 'entity': str(char),
                 'type': 'Character',
@@ -213,8 +218,7 @@ def validate_graph_simple(data_graph: Graph, shapes_graph: Graph = None) -> Tupl
     
     # Vérifier que chaque Location a un label
     for loc in data_graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Location):
-        labels = list(data_graph.objects(loc, RDFS.label))
-        if not labels:
+        if next(data_graph.objects(loc, RDFS.label), None) is None:
             violations.append({
                 'entity': str(loc),
                 'type': 'Location',
@@ -224,8 +228,7 @@ def validate_graph_simple(data_graph: Graph, shapes_graph: Graph = None) -> Tupl
     
     # Vérifier que chaque Artifact a un label
     for art in data_graph.subjects(RDF.type, TOLKIEN_ONTOLOGY.Artifact):
-        labels = list(data_graph.objects(art, RDFS.label))
-        if not labels:
+        if next(data_graph.objects(art, RDFS.label), None) is None:
             violations.append({
                 'entity': str(art),
                 'type': 'Artifact',
@@ -2,49 +2,77 @@
 Client MediaWiki et utilitaires de parsing wikitext.
 """
 
+import os
 import re
 import time
+import hashlib
 import logging
-from typing import Optional, Dict, List
+import threading
+from typing import Optional, Dict, Iterator, List, Union
 from urllib.parse import quote
 
 import requests
 import mwparserfromhell
+from mwparserfromhell.wikicode import Wikicode
 
-from config import TOLKIEN_GATEWAY_API, HTTP_HEADERS, REQUEST_TIMEOUT
+from cache import SQLiteCache
+from ratelimit import TokenBucket
+from config import (
+    TOLKIEN_GATEWAY_API, HTTP_HEADERS, REQUEST_TIMEOUT, OUTPUT_DIR,
+    WIKI_CACHE_ENABLED, WIKI_CACHE_FILE, WIKI_CACHE_EXPIRE, IMAGE_CACHE_FILE, IMAGE_CACHE_EXPIRE
+)
+
+try:
+    import requests_cache
+    REQUESTS_CACHE_AVAILABLE = True
+except ImportError:
+    REQUESTS_CACHE_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
-REQUEST_DELAY = 1.0  # 1 seconde entre chaque requete
+REQUEST_DELAY = 1.0  # 1 seconde entre chaque requete (en moyenne)
+REQUEST_BURST = 4  # Requetes pouvant partir d'affilee apres une pause
 MAX_RETRIES = 3
+MAX_TITLES_PER_QUERY = 50  # Limite de l'API MediaWiki pour titles=A|B|C
+
+
+_FOOTNOTE_RE = re.compile(r'\[\d+\]')
+_TAG_RE = re.compile(r'<[^>]+>')
+_SPACES_RE = re.compile(r'\s+')
+
+# Espaces de noms exclus des liens internes (préfixe du titre en minuscules)
+_EXCLUDED_LINK_PREFIXES = ('category:', 'file:', 'image:', 'template:', 'wikipedia:', 'help:', 'special:',
+                           'talk:', 'user:', 'portal:')
 
 
-def clean_wikitext(text: str) -> str:
+def clean_wikitext(text: Union[str, Wikicode]) -> str:
     if not text:
         return ""
     try:
+        # Un Wikicode déjà parsé (valeur d'infobox) est utilisé tel quel
         wikicode = mwparserfromhell.parse(text)
         plain_text = wikicode.strip_code()
     except Exception:
-        plain_text = text
-    plain_text = re.sub(r'\[\d+\]', '', plain_text)
-    plain_text = re.sub(r'<[^>]+>', '', plain_text)
-    plain_text = re.sub(r'\s+', ' ', plain_text).strip()
+        plain_text = str(text)
+    plain_text = _FOOTNOTE_RE.sub('', plain_text)
+    plain_text = _TAG_RE.sub('', plain_text)
+    plain_text = _SPACES_RE.sub(' ', plain_text).strip()
     return plain_text.strip('"\'')
 
 
+_NON_NAME_CHARS_RE = re.compile(r'[^\w\-_]')
+_UNDERSCORES_RE = re.compile(r'_+')
+
+
 def clean_entity_name(name: str) -> str:
     if not name:
         return ""
-    name = name.replace('(', '_').replace(')', '_')
-    name = name.replace("'", "").replace("'", "")
-    name = name.replace(' ', '_')
-    name = re.sub(r'[^\w\-_]', '', name)
-    name = re.sub(r'_+', '_', name)
-    return name.strip('_')
+    name = name.replace('(', '_').replace(')', '_').replace(' ', '_').replace("'", "")
+    name = _NON_NAME_CHARS_RE.sub('', name)
+    return _UNDERSCORES_RE.sub('_', name).strip('_')
 
 
-def extract_internal_links(text: str) -> List[str]:
+def extract_internal_links(text: Union[str, Wikicode]) -> List[str]:
     if not text:
         return []
     try:
@@ -53,10 +81,9 @@ def extract_internal_links(text: str) -> List[str]:
     except Exception:
         return []
     result = []
-    excluded = ['category:', 'file:', 'image:', 'template:', 'wikipedia:', 'help:', 'special:', 'talk:', 'user:', 'portal:']
     for link in links:
         title = str(link.title).strip()
-        if any(title.lower().startswith(p) for p in excluded) or '#' in title:
+        if title.lower().startswith(_EXCLUDED_LINK_PREFIXES) or '#' in title:
             continue
         result.append(title)
     return result
@@ -69,33 +96,40 @@ def split_on_br(text: str) -> List[str]:
     return [p.strip() for p in text.split('|||') if p.strip()]
 
 
-def clean_date_field(text: str) -> str:
+# Motifs des champs de date, compilés une fois
+_DATE_ERAS = frozenset(['FA', 'SA', 'TA', 'FoA', 'YT', 'YS', 'VY'])
+_BRACKETS_RE = re.compile(r'\[.*?\]')
+_REF_RE = re.compile(r'<ref[^>]*>.*?</ref>', re.DOTALL)
+# Caractères qui peuvent introduire du balisage wiki (sinon le parsing est inutile)
+_WIKI_MARKUP_RE = re.compile(r"[{}\[\]<>&'=*#:;|~_\n-]")
+_INVALID_DATE_RE = re.compile(r'^(?:[,.\s]*|c\.|around|unknown|late.*age|early.*age)$', re.IGNORECASE)
+
+
+def clean_date_field(text: Union[str, Wikicode]) -> str:
     if not text:
         return ""
+    if isinstance(text, str) and not _WIKI_MARKUP_RE.search(text):
+        return text.strip()
     try:
         wikicode = mwparserfromhell.parse(text)
         for template in wikicode.filter_templates():
             tname = str(template.name).strip()
-            if tname in ['FA', 'SA', 'TA', 'FoA', 'YT', 'YS', 'VY'] and template.params:
+            if tname in _DATE_ERAS and template.params:
                 year = str(template.params[0].value).strip()
-                year = re.sub(r'\[.*?\]', '', year)
-                year = re.sub(r'<ref[^>]*>.*?</ref>', '', year, flags=re.DOTALL)
+                year = _BRACKETS_RE.sub('', year)
+                year = _REF_RE.sub('', year)
                 return f"{tname} {year}".strip()
         plain = wikicode.strip_code()
-        plain = re.sub(r'<ref[^>]*>.*?</ref>', '', plain, flags=re.DOTALL)
-        return re.sub(r'\[.*?\]', '', plain).strip()
+        plain = _REF_RE.sub('', plain)
+        return _BRACKETS_RE.sub('', plain).strip()
     except Exception:
-        return text.strip()
+        return str(text).strip()
 
 
 def is_valid_date(date_str: str) -> bool:
     if not date_str:
         return False
-    invalid = [r'^[,.\s]*$', r'^c\.$', r'^around$', r'^unknown$', r'^late.*age$', r'^early.*age$']
-    for pattern in invalid:
-        if re.match(pattern, date_str.lower().strip(), re.IGNORECASE):
-            return False
-    return True
+    return not _INVALID_DATE_RE.match(date_str.lower().strip())
 
 
 def build_image_url(filename: str) -> str:
@@ -114,6 +148,22 @@ def build_image_url(filename: str) -> str:
     return f"https://tolkiengateway.net/wiki/File:{quote(filename.strip())}"
 
 
+def _image_filename(filename: str) -> str:
+    """Nom de fichier sans préfixe File:/Image:."""
+    filename = filename.strip()
+    for prefix in ['File:', 'Image:', 'file:', 'image:']:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+    return filename
+
+
+def _guess_image_url(filename: str) -> str:
+    # construire une URL probable basée sur le hash MD5
+    # Format MediaWiki: /images/a/ab/filename
+    md5 = hashlib.md5(filename.encode('utf-8')).hexdigest()
+    return f"https://tolkiengateway.net/w/images/{md5[0]}/{md5[:2]}/{quote(filename)}"
+
+
 def get_image_direct_url(filename: str, wiki_client=None) -> str:
     """
     Récupère l'URL directe de l'image depuis l'API MediaWiki.
@@ -122,14 +172,11 @@ def get_image_direct_url(filename: str, wiki_client=None) -> str:
         return None
     
     # Nettoyer le nom de fichier
-    filename = filename.strip()
-    for prefix in ['File:', 'Image:', 'file:', 'image:']:
-        if filename.startswith(prefix):
-            filename = filename[len(prefix):]
+    filename = _image_filename(filename)
     
     try:
         if wiki_client is None:
-            wiki_client = WikiClient()
+            wiki_client = get_wiki_client()
         
         params = {
             "action": "query",
@@ -150,26 +197,111 @@ def get_image_direct_url(filename: str, wiki_client=None) -> str:
     except Exception as e:
         logger.debug(f"Error getting image URL for {filename}: {e}")
     
-    # construire une URL probable basée sur le hash MD5
-    # Format MediaWiki: /images/a/ab/filename
-    import hashlib
-    md5 = hashlib.md5(filename.encode('utf-8')).hexdigest()
-    return f"https://tolkiengateway.net/w/images/{md5[0]}/{md5[:2]}/{quote(filename)}"
+    return _guess_image_url(filename)
+
+
+_image_cache = SQLiteCache(
+    IMAGE_CACHE_FILE if WIKI_CACHE_ENABLED else ":memory:",
+    table="image_urls", ttl=IMAGE_CACHE_EXPIRE, commit_every=MAX_TITLES_PER_QUERY
+)
+
+
+def get_image_direct_urls(filenames: List[str], wiki_client=None) -> Dict[str, str]:
+    """
+    URLs directes de plusieurs images, par lots de 50 fichiers par requête
+    imageinfo, avec le même repli que get_image_direct_url.
+    Les réponses de l'API sont gardées dans un cache disque.
+    
+    Returns:
+        {nom de fichier demandé: URL}
+    """
+    result = {}
+    todo = {}
+    for name in dict.fromkeys(filenames):
+        if not name:
+            continue
+        cached = _image_cache.get(name)
+        if cached is not None:
+            result[name] = cached
+        else:
+            todo.setdefault(f"File:{_image_filename(name)}", []).append(name)
+    if not todo:
+        return result
+    
+    if wiki_client is None:
+        wiki_client = get_wiki_client()
+    titles = list(todo)
+    for start in range(0, len(titles), MAX_TITLES_PER_QUERY):
+        chunk = titles[start:start + MAX_TITLES_PER_QUERY]
+        try:
+            data = wiki_client._request({
+                "action": "query",
+                "titles": "|".join(chunk),
+                "prop": "imageinfo",
+                "iiprop": "url",
+            })
+        except Exception as e:
+            logger.debug(f"Error getting image URLs: {e}")
+            data = None
+        if not data or "query" not in data:
+            # Pas de réponse: URL probable, non mise en cache
+            for title in chunk:
+                for name in todo[title]:
+                    result[name] = _guess_image_url(_image_filename(name))
+            continue
+        
+        # Le titre renvoyé peut être normalisé (ex: espaces, premiere lettre)
+        requested = {t: t for t in chunk}
+        for n in data["query"].get("normalized", []):
+            if n.get("from") in requested:
+                requested[n["to"]] = requested.pop(n["from"])
+        urls = {}
+        for page in data["query"].get("pages", {}).values():
+            imageinfo = page.get("imageinfo")
+            title = requested.get(page.get("title"))
+            if imageinfo and title is not None and imageinfo[0].get("url"):
+                urls[title] = imageinfo[0]["url"]
+        for title in chunk:
+            for name in todo[title]:
+                url = urls.get(title) or _guess_image_url(_image_filename(name))
+                result[name] = url
+                _image_cache.put(name, url)
+        # Une transaction par lot, validée avant la requête suivante
+        _image_cache.flush()
+    return result
 
 
 class WikiClient:
     def __init__(self, api_url: str = TOLKIEN_GATEWAY_API):
         self.api_url = api_url
-        self.session = requests.Session()
+        if REQUESTS_CACHE_AVAILABLE and WIKI_CACHE_ENABLED:
+            # Cache SQLite: les rebuilds relisent les réponses (revalidées par ETag si expirées)
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            self.session = requests_cache.CachedSession(
+                cache_name=WIKI_CACHE_FILE, backend="sqlite", expire_after=WIKI_CACHE_EXPIRE
+            )
+        else:
+            self.session = requests.Session()
         self.session.headers.update(HTTP_HEADERS)
-        self.last_request = 0
+        # Le client est partage entre les threads du build
+        self._bucket = TokenBucket(rate=1 / REQUEST_DELAY if REQUEST_DELAY > 0 else None,
+                                   capacity=REQUEST_BURST)
+
+    def _is_cached(self, params: Dict) -> bool:
+        cache = getattr(self.session, "cache", None)
+        if cache is None:
+            return False
+        try:
+            prepared = self.session.prepare_request(requests.Request("GET", self.api_url, params=params))
+            return cache.contains(request=prepared)
+        except Exception:
+            return False
 
     def _request(self, params: Dict) -> Optional[Dict]:
-        elapsed = time.time() - self.last_request
-        if elapsed < REQUEST_DELAY:
-            time.sleep(REQUEST_DELAY - elapsed)
-        self.last_request = time.time()
         params["format"] = "json"
+        # Pas d'attente pour une réponse déjà en cache
+        if not self._is_cached(params):
+            self._bucket.acquire()
         
         for attempt in range(MAX_RETRIES):
             try:
@@ -197,27 +329,75 @@ class WikiClient:
             return data["parse"]["wikitext"]["*"]
         return None
 
-    def get_category_members(self, category: str, limit: int = 500) -> List[str]:
-        members = []
+    def get_pages_wikitext(self, titles: List[str]) -> Dict[str, str]:
+        """
+        Récupère le wikitext de plusieurs pages, par lots de 50 titres par requête.
+        Retourne {titre demandé: wikitext}; les pages manquantes sont absentes.
+        """
+        result = {}
+        for start in range(0, len(titles), MAX_TITLES_PER_QUERY):
+            chunk = titles[start:start + MAX_TITLES_PER_QUERY]
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "rvprop": "content",
+                "rvslots": "main",
+                "titles": "|".join(chunk),
+            }
+            # Le titre renvoyé peut être normalisé (ex: premiere lettre en majuscule)
+            requested = {t: t for t in chunk}
+            cont = None
+            while True:
+                if cont:
+                    params.update(cont)
+                data = self._request(dict(params))
+                if not data or "query" not in data:
+                    break
+                for n in data["query"].get("normalized", []):
+                    if n.get("from") in requested:
+                        requested[n["to"]] = requested.pop(n["from"])
+                for page in data["query"].get("pages", {}).values():
+                    revisions = page.get("revisions")
+                    title = requested.get(page.get("title"))
+                    if not revisions or title is None:
+                        continue
+                    slot = revisions[0].get("slots", {}).get("main", revisions[0])
+                    if "*" in slot:
+                        result[title] = slot["*"]
+                # Les gros lots peuvent être renvoyés en plusieurs fois
+                if "continue" not in data:
+                    break
+                cont = data["continue"]
+        return result
+
+    def iter_category_members(self, category: str, limit: int = 500) -> Iterator[str]:
+        """Produit les titres d'une catégorie au fil des réponses de l'API (continuation)."""
+        count = 0
         cont = None
-        while len(members) < limit:
+        while count < limit:
             params = {
                 "action": "query",
                 "list": "categorymembers",
                 "cmtitle": f"Category:{category}",
-                "cmlimit": min(500, limit - len(members)),
+                "cmlimit": min(500, limit - count),
                 "cmnamespace": 0,
             }
             if cont:
                 params.update(cont)
             data = self._request(params)
             if not data or "query" not in data:
-                break
-            members.extend([m["title"] for m in data["query"].get("categorymembers", [])])
+                return
+            for m in data["query"].get("categorymembers", []):
+                if count >= limit:
+                    return
+                count += 1
+                yield m["title"]
             if "continue" not in data:
-                break
+                return
             cont = data["continue"]
-        return members[:limit]
+
+    def get_category_members(self, category: str, limit: int = 500) -> List[str]:
+        return list(self.iter_category_members(category, limit=limit))
 
     def get_external_links(self, title: str) -> List[str]:
         data = self._request({"action": "parse", "page": title, "prop": "externallinks"})
@@ -230,3 +410,17 @@ class WikiClient:
         if data and "query" in data:
             return data["query"].get("search", [])
         return []
+
+
+# Client partagé par le processus (session HTTP en cache et débit communs)
+_wiki_client: Optional[WikiClient] = None
+_wiki_client_lock = threading.Lock()
+
+
+def get_wiki_client() -> WikiClient:
+    """Retourne le client Tolkien Gateway du processus (créé au premier appel)."""
+    global _wiki_client
+    with _wiki_client_lock:
+        if _wiki_client is None:
+            _wiki_client = WikiClient()
+        return _wiki_client